@@ -11,10 +11,17 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps and modules shared by the projects in this repository (perfmon,
+# taskqueue, blobstore, avatars) live in shared/ at the repository root.
+SHARED_APPS_DIR = BASE_DIR.parent.parent / 'shared'
+if str(SHARED_APPS_DIR) not in sys.path:
+    sys.path.append(str(SHARED_APPS_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -43,14 +50,19 @@ INSTALLED_APPS = [
     'relationship_app',
 
     'accounts',  # ✅ Add your accounts app for custom user model
+    'perfmon',
+    'taskqueue',
+    'blobstore',
 ]
 
 MIDDLEWARE = [
+    'perfmon.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'relationship_app.middleware.AccessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -142,3 +154,48 @@ AUTH_USER_MODEL = 'accounts.CustomUser'  # ✅ Set your custom user model
 # Login / Logout redirects
 LOGIN_REDIRECT_URL = 'list_books'  # Redirect after successful login
 LOGOUT_REDIRECT_URL = 'login'      # Redirect after logout
+
+
+# Request instrumentation (perfmon app)
+# Requests over these budgets are logged to the 'perfmon' logger; per-URL
+# histograms are served at /__perf__/ (staff only when DEBUG is off).
+PERFMON = {
+    'QUERY_BUDGET': 50,
+    'LATENCY_BUDGET_MS': 500,
+    'SERVER_TIMING': True,
+}
+
+# Background tasks (taskqueue app): queued in the database, run by
+# `python manage.py run_tasks` workers. A task whose worker dies is retried
+# after LEASE_SECONDS; failures back off from RETRY_DELAY seconds.
+TASKQUEUE = {
+    'LEASE_SECONDS': 300,
+    'POLL_INTERVAL': 1,
+    'BATCH_SIZE': 10,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,
+}
+
+# Uploads are stored once per distinct content (blobstore app) and reference
+# counted. Run `python manage.py gc_blobs` periodically (with --recount now and
+# then) to delete files that stayed unreferenced for GC_GRACE_HOURS.
+STORAGES = {
+    'default': {'BACKEND': 'blobstore.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+BLOBSTORE = {
+    'DIRECTORY': 'blobs',
+    'GC_GRACE_HOURS': 24,
+}
+
+# Roles and permissions are read once per user and cached (relationship_app
+# access cache) for TIMEOUT seconds; profile, group and permission changes
+# invalidate them. ModelBackend stays listed so sessions that it created
+# remain valid.
+AUTHENTICATION_BACKENDS = [
+    'relationship_app.backends.CachedAccessBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+ACCESS_CACHE = {
+    'TIMEOUT': 300,
+}
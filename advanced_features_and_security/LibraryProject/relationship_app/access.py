@@ -0,0 +1,130 @@
+"""
+Cached roles and permissions.
+
+`load` reads everything the access checks need for one user: the user
+with their `UserProfile` joined in, then their groups and permissions in
+one UNION query. A UNION keeps the rows to one per permission; joining
+groups and direct permissions side by side would multiply them. The
+result is an `Access` snapshot, stored in the default Django cache for
+ACCESS_CACHE['TIMEOUT'] seconds under `access:user:<id>`.
+
+relationship_app/signals.py drops a user's snapshot when the user, their
+profile, their groups or their own permissions change. Changing a group's
+permissions, or changing or deleting a group or a permission, can affect
+any number of users. Those changes bump a generation token instead, and
+snapshots taken under an older generation are ignored. Queryset
+`update()` calls send no signals and are only picked up when entries
+expire.
+
+Hits and misses are counted in perfmon's registry under 'auth.access_cache'.
+"""
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.db.models import CharField, Value
+
+from perfmon.stats import registry
+
+DEFAULTS = {
+    'TIMEOUT': 300,
+}
+
+STATS_NAME = 'auth.access_cache'
+GENERATION_KEY = 'access:generation'
+
+
+def get_setting(name):
+    return getattr(settings, 'ACCESS_CACHE', {}).get(name, DEFAULTS[name])
+
+
+def user_key(user_id):
+    return f'access:user:{user_id}'
+
+
+class Access:
+    """What a user may do: their role, group names and permission strings."""
+
+    def __init__(self, user, role, groups, user_permissions, group_permissions, generation):
+        self.user = user
+        self.role = role
+        self.groups = groups
+        self.user_permissions = user_permissions
+        self.group_permissions = group_permissions
+        self.generation = generation
+
+    @property
+    def permissions(self):
+        return self.user_permissions | self.group_permissions
+
+
+def load(user_id, generation):
+    """Build the `Access` of `user_id` from the database, or None if there is no such user."""
+    user = get_user_model().objects.select_related('userprofile').filter(pk=user_id).first()
+    if user is None:
+        return None
+    no_group = Value('', output_field=CharField())
+    direct = Permission.objects.all() if user.is_superuser else Permission.objects.filter(user=user_id)
+    rows = direct.order_by().values_list(no_group, 'content_type__app_label', 'codename').union(
+        Group.objects.filter(user=user_id).order_by().values_list('name', 'permissions__content_type__app_label', 'permissions__codename'),
+        all=True,
+    )
+    groups, user_permissions, group_permissions = set(), set(), set()
+    for group, app_label, codename in rows:
+        if group:
+            groups.add(group)
+        if codename is None:
+            continue  # a group without permissions
+        (group_permissions if group else user_permissions).add(f'{app_label}.{codename}')
+    if user.is_superuser:
+        # as ModelBackend does: a superuser holds every permission either way
+        group_permissions = user_permissions
+    profile = getattr(user, 'userprofile', None)
+    return Access(
+        user, profile.role if profile else None, frozenset(groups),
+        frozenset(user_permissions), frozenset(group_permissions), generation,
+    )
+
+
+def bump_generation():
+    """Invalidate every snapshot at once."""
+    generation = time.time_ns()
+    cache.set(GENERATION_KEY, generation, None)
+    return generation
+
+
+def get(user_id):
+    """The `Access` of `user_id`, from the cache when it is current; None for unknown users."""
+    found = cache.get_many([GENERATION_KEY, user_key(user_id)])
+    generation = found.get(GENERATION_KEY)
+    access = found.get(user_key(user_id))
+    if access is not None and generation is not None and access.generation == generation:
+        registry.count(STATS_NAME, 'hit')
+        return access
+    registry.count(STATS_NAME, 'miss')
+    access = load(user_id, generation if generation is not None else bump_generation())
+    if access is not None:
+        cache.set(user_key(user_id), access, get_setting('TIMEOUT'))
+    return access
+
+
+def invalidate(*user_ids):
+    cache.delete_many([user_key(user_id) for user_id in user_ids])
+
+
+def attach(user, access):
+    """Give `user` the snapshot, priming ModelBackend's permission caches so checks skip the database."""
+    user.access = access
+    user._user_perm_cache = set(access.user_permissions)
+    user._group_perm_cache = set(access.group_permissions)
+    user._perm_cache = set(access.permissions)
+    return user
+
+
+def access_of(user):
+    """The `Access` of an authenticated `user`, loaded at most once per user object."""
+    if 'access' not in user.__dict__:
+        attach(user, get(user.pk) or Access(user, None, frozenset(), frozenset(), frozenset(), None))
+    return user.access
@@ -1,7 +1,8 @@
 from django.contrib import admin
-from .models import Author, Book, Library, Librarian
+from .models import Author, Book, CatalogImport, Library, Librarian
 
 admin.site.register(Author)
 admin.site.register(Book)
 admin.site.register(Library)
 admin.site.register(Librarian)
+admin.site.register(CatalogImport)
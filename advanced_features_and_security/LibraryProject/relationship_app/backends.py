@@ -0,0 +1,17 @@
+from django.contrib.auth.backends import ModelBackend
+
+from . import access
+
+
+class CachedAccessBackend(ModelBackend):
+    """
+    ModelBackend whose users come from the access cache (see
+    relationship_app/access.py) with their profile, groups and permissions
+    already loaded, so role and permission checks need no queries.
+    """
+
+    def get_user(self, user_id):
+        snapshot = access.get(user_id)
+        if snapshot is None or not self.user_can_authenticate(snapshot.user):
+            return None
+        return access.attach(snapshot.user, snapshot)
@@ -0,0 +1,122 @@
+"""Benchmark data and endpoints: a large book catalogue spread over libraries."""
+from django.db.models import Max
+from django.http import HttpResponse
+
+from perfmon.bench import benchmark, seeder
+
+from . import query_samples
+from .models import Author, Book, Librarian, Library
+
+AUTHORS = 1000
+BOOKS = 20000
+LIBRARIES = 20
+# names looked up per batched call, written in lower case to exercise case-insensitive matching
+LOOKUPS = 50
+BOOKS_PER_LIBRARY = 1000
+BATCH_SIZE = 5000
+
+
+@seeder
+def catalogue(suite):
+    rng = suite.rng
+    Author.objects.bulk_create(
+        (Author(name=f'Author {i}') for i in range(suite.size(AUTHORS))),
+        batch_size=BATCH_SIZE,
+    )
+    author_ids = list(Author.objects.values_list('pk', flat=True))
+    Book.objects.bulk_create(
+        (Book(title=f'Book {i}', author_id=rng.choice(author_ids)) for i in range(suite.size(BOOKS))),
+        batch_size=BATCH_SIZE,
+    )
+    book_ids = list(Book.objects.values_list('pk', flat=True))
+
+    Library.objects.bulk_create(Library(name=f'Library {i}') for i in range(suite.size(LIBRARIES)))
+    Holding = Library.books.through
+    per_library = min(len(book_ids), BOOKS_PER_LIBRARY)
+    Holding.objects.bulk_create(
+        (
+            Holding(library_id=library_id, book_id=book_id)
+            for library_id in Library.objects.values_list('pk', flat=True)
+            for book_id in rng.sample(book_ids, per_library)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    suite.data['library_id'] = Library.objects.aggregate(last=Max('pk'))['last']
+    Librarian.objects.bulk_create(
+        Librarian(name=f'Librarian {library_id}', library_id=library_id)
+        for library_id in Library.objects.values_list('pk', flat=True)
+    )
+    authors = suite.size(AUTHORS)
+    suite.data['author_names'] = [f'author {i}' for i in rng.sample(range(authors), min(authors, LOOKUPS))]
+    libraries = suite.size(LIBRARIES)
+    suite.data['library_names'] = [f'library {i}' for i in rng.sample(range(libraries), min(libraries, LOOKUPS))]
+
+
+@benchmark('list_books')
+def list_books(client, suite):
+    return client.get('/relationship_app/books/')
+
+
+@benchmark('library_detail')
+def library_detail(client, suite):
+    return client.get(f"/relationship_app/library/{suite.data['library_id']}/")
+
+
+@benchmark('list_books_stream')
+def list_books_stream(client, suite):
+    response = client.get('/relationship_app/books/?stream=1')
+    b''.join(response.streaming_content)
+    return response
+
+
+@benchmark('library_detail_stream')
+def library_detail_stream(client, suite):
+    response = client.get(f"/relationship_app/library/{suite.data['library_id']}/?stream=1")
+    b''.join(response.streaming_content)
+    return response
+
+
+# Query helpers, timed without a request. The harness expects a response,
+# so these return an empty one once the query has run.
+
+@benchmark('query_books_by_author')
+def query_books_by_author(client, suite):
+    list(query_samples.books_by_author(suite.data['author_names'][0]))
+    return HttpResponse()
+
+
+@benchmark('query_books_in_library')
+def query_books_in_library(client, suite):
+    list(query_samples.books_in_library(suite.data['library_names'][0]))
+    return HttpResponse()
+
+
+@benchmark('query_librarian_for_library')
+def query_librarian_for_library(client, suite):
+    query_samples.librarian_for_library(suite.data['library_names'][0])
+    return HttpResponse()
+
+
+@benchmark('query_books_by_author_each')
+def query_books_by_author_each(client, suite):
+    for name in suite.data['author_names']:
+        list(query_samples.books_by_author(name))
+    return HttpResponse()
+
+
+@benchmark('query_books_by_authors')
+def query_books_by_authors(client, suite):
+    query_samples.books_by_authors(suite.data['author_names'])
+    return HttpResponse()
+
+
+@benchmark('query_books_in_libraries')
+def query_books_in_libraries(client, suite):
+    query_samples.books_in_libraries(suite.data['library_names'])
+    return HttpResponse()
+
+
+@benchmark('query_librarians_for_libraries')
+def query_librarians_for_libraries(client, suite):
+    query_samples.librarians_for_libraries(suite.data['library_names'])
+    return HttpResponse()
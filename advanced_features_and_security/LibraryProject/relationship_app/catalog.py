@@ -0,0 +1,232 @@
+"""
+Streaming catalogue import.
+
+A catalogue is a sequence of records, each a book title, its author's name
+and the names of the libraries holding it. Three formats are read, one
+record at a time:
+
+- `csv`: a header row naming `title`, `author` and optionally `libraries`,
+  with several libraries separated by `|`;
+- `jsonl`: one JSON object per line with the same keys, `libraries` a list
+  or a single name;
+- `marc`: MARC records in the mnemonic text form (`=LDR`, `=245  10$a...`),
+  one blank line between records. The title comes from 245 $a (and $b),
+  the author from 100 $a (else 110 or 700), and the libraries from
+  852 $a.
+
+`Importer` works through the records in chunks of CHUNK_SIZE, one
+transaction each. Authors and libraries are resolved through in-memory
+name-to-id maps, loaded once and grown as rows are inserted. Books that
+already exist are found with one query per chunk. New books and
+`Library.books` rows are written with `bulk_create`, so a chunk costs a
+handful of queries however many records it holds.
+
+Re-running an import creates nothing new. A book is the same book when its
+title and author match. Holdings that already exist are skipped.
+"""
+import csv
+import json
+import os
+import re
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Author, Book, Library
+
+CHUNK_SIZE = 2000
+FORMATS = ('csv', 'jsonl', 'marc')
+EXTENSIONS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.mrk': 'marc', '.marc': 'marc', '.txt': 'marc'}
+LIBRARY_SEPARATOR = '|'
+TITLE_LENGTH = Book._meta.get_field('title').max_length
+NAME_LENGTH = Author._meta.get_field('name').max_length
+
+
+class CatalogFormatError(ValueError):
+    def __init__(self, line, message):
+        super().__init__(f'line {line}: {message}')
+        self.line = line
+
+
+def guess_format(filename):
+    return EXTENSIONS.get(os.path.splitext(filename)[1].lower())
+
+
+def _libraries(value):
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(LIBRARY_SEPARATOR)
+    return [str(name).strip()[:NAME_LENGTH] for name in value if name and str(name).strip()]
+
+
+def read_csv(lines):
+    reader = csv.DictReader(lines)
+    if reader.fieldnames is None or not {'title', 'author'} <= set(reader.fieldnames):
+        raise CatalogFormatError(1, 'the header must name the title and author columns')
+    for row in reader:
+        yield row['title'], row['author'], _libraries(row.get('libraries'))
+
+
+def read_jsonl(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            raise CatalogFormatError(number, f'invalid JSON ({e})') from None
+        if not isinstance(row, dict):
+            raise CatalogFormatError(number, 'expected a JSON object')
+        yield row.get('title'), row.get('author'), _libraries(row.get('libraries'))
+
+
+MARC_FIELD = re.compile(r'^=(\w{3})  ?(.*)$')
+# ISBD punctuation MARC leaves at the end of subfields ("Title /", "Name,")
+ISBD_TRAILING = ' /:;,.='
+
+
+def _subfields(data):
+    """{code: [values]} of a MARC variable field, indicators stripped."""
+    subfields = {}
+    for part in data.split('$')[1:]:
+        if part:
+            subfields.setdefault(part[0], []).append(part[1:].strip().rstrip(ISBD_TRAILING).strip())
+    return subfields
+
+
+def _marc_record(fields):
+    title = fields.get('245', [{}])[0]
+    title = ' : '.join(title.get('a', []) + title.get('b', []))
+    author = None
+    for tag in ('100', '110', '700'):
+        if tag in fields:
+            author = next(iter(fields[tag][0].get('a', [])), None)
+            break
+    libraries = [name for holding in fields.get('852', []) for name in holding.get('a', [])]
+    return title, author, libraries
+
+
+def read_marc(lines):
+    fields = {}
+    for number, line in enumerate(lines, 1):
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            if fields:
+                yield _marc_record(fields)
+                fields = {}
+            continue
+        match = MARC_FIELD.match(line)
+        if match is None:
+            raise CatalogFormatError(number, 'expected a MARC field such as "=245  10$aTitle"')
+        tag, data = match.groups()
+        if tag.isdigit() and int(tag) >= 10:
+            fields.setdefault(tag, []).append(_subfields(data))
+    if fields:
+        yield _marc_record(fields)
+
+
+READERS = {'csv': read_csv, 'jsonl': read_jsonl, 'marc': read_marc}
+
+
+def read(lines, catalog_format):
+    """Records (title, author, [library names]) read from the text `lines`."""
+    return READERS[catalog_format](lines)
+
+
+class Importer:
+    """
+    Imports records into the catalogue. `stats` counts the records read,
+    the rows created and the records skipped for lacking a title or author.
+    `progress(stats)` is called after each chunk.
+    """
+
+    def __init__(self, chunk_size=CHUNK_SIZE, progress=None):
+        self.chunk_size = chunk_size
+        self.progress = progress
+        self.stats = {'records': 0, 'skipped': 0, 'authors': 0, 'books': 0, 'libraries': 0, 'holdings': 0}
+        self.authors = None
+        self.libraries = None
+
+    @staticmethod
+    def _name_map(model):
+        names = {}
+        # several rows may share a name; the oldest one wins
+        for name, pk in model.objects.order_by('-pk').values_list('name', 'pk').iterator(chunk_size=10000):
+            names[name] = pk
+        return names
+
+    def run(self, records):
+        if self.authors is None:
+            self.authors = self._name_map(Author)
+            self.libraries = self._name_map(Library)
+        records = iter(records)
+        while chunk := list(islice(records, self.chunk_size)):
+            with transaction.atomic():
+                self.import_chunk(chunk)
+            if self.progress:
+                self.progress(self.stats)
+        return self.stats
+
+    def _resolve(self, model, names, ids, stat):
+        new = [name for name in dict.fromkeys(names) if name not in ids]
+        if not new:
+            return
+        created = model.objects.bulk_create([model(name=name) for name in new])
+        if any(obj.pk is None for obj in created):
+            # backends that cannot return ids from a bulk insert
+            created = model.objects.filter(name__in=new).order_by('-pk')
+        for obj in created:
+            ids[obj.name] = obj.pk
+        self.stats[stat] += len(new)
+
+    def import_chunk(self, chunk):
+        records = []
+        for title, author, libraries in chunk:
+            self.stats['records'] += 1
+            # names longer than the columns are cut rather than failing the chunk
+            title, author = str(title or '').strip()[:TITLE_LENGTH], str(author or '').strip()[:NAME_LENGTH]
+            if not title or not author:
+                self.stats['skipped'] += 1
+                continue
+            records.append((title, author, libraries))
+
+        self._resolve(Author, (author for _, author, _ in records), self.authors, 'authors')
+        self._resolve(Library, (name for *_, libraries in records for name in libraries), self.libraries, 'libraries')
+
+        # a dict keeps the file's order, so books get ids in that order
+        keys = dict.fromkeys((self.authors[author], title) for title, author, _ in records)
+        books = {
+            (author_id, title): pk
+            for author_id, title, pk in Book.objects.filter(
+                author_id__in={author_id for author_id, _ in keys}, title__in={title for _, title in keys},
+            ).order_by('-pk').values_list('author_id', 'title', 'pk')
+        }
+        existing = {key: books[key] for key in keys if key in books}
+        new = [Book(author_id=author_id, title=title) for author_id, title in keys if (author_id, title) not in books]
+        created = Book.objects.bulk_create(new)
+        if any(book.pk is None for book in created):
+            created = Book.objects.filter(author_id__in={book.author_id for book in new}, title__in={book.title for book in new})
+        books.update({(book.author_id, book.title): book.pk for book in created})
+        self.stats['books'] += len(new)
+
+        Holding = Library.books.through
+        held = set(
+            Holding.objects.filter(book_id__in=existing.values()).values_list('library_id', 'book_id')
+        ) if existing else set()
+        holdings = [
+            holding for holding in dict.fromkeys(
+                (self.libraries[name], books[(self.authors[author], title)])
+                for title, author, libraries in records for name in libraries
+            ) if holding not in held
+        ]
+        # ignore_conflicts: an import running alongside may have added the same holding
+        Holding.objects.bulk_create(
+            [Holding(library_id=library_id, book_id=book_id) for library_id, book_id in holdings], ignore_conflicts=True,
+        )
+        self.stats['holdings'] += len(holdings)
+
+
+def import_catalog(lines, catalog_format, chunk_size=CHUNK_SIZE, progress=None):
+    """Import the catalogue in the text `lines`; returns the `Importer` stats."""
+    return Importer(chunk_size, progress).run(read(lines, catalog_format))
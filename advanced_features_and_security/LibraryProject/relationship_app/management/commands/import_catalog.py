@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from relationship_app import catalog
+
+
+class Command(BaseCommand):
+    help = 'Import books, authors and library holdings from a CSV, JSON Lines or MARC (mnemonic text) file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import, or - for stdin.')
+        parser.add_argument('--format', dest='catalog_format', choices=catalog.FORMATS,
+                            help='Default: guessed from the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=catalog.CHUNK_SIZE)
+
+    def handle(self, *args, path, catalog_format, chunk_size, **options):
+        catalog_format = catalog_format or catalog.guess_format(path)
+        if catalog_format is None:
+            raise CommandError('Cannot tell the format from the file name; pass --format.')
+
+        def progress(stats):
+            self.stderr.write(f"{stats['records']} records read, {stats['books']} books created")
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            stats = catalog.import_catalog(stream, catalog_format, chunk_size, progress)
+        except catalog.CatalogFormatError as e:
+            raise CommandError(f'{path}: {e}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        self.stdout.write(
+            'Imported {records} records: {books} new books, {authors} new authors, {libraries} new libraries, '
+            '{holdings} new holdings, {skipped} skipped.'.format(**stats)
+        )
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from relationship_app.models import UserProfile
+from relationship_app.profiles import BATCH_SIZE, provision
+
+
+class Command(BaseCommand):
+    help = 'Create the missing profiles of users created without one, e.g. by bulk imports.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--role', default='', choices=[''] + [role for role, _ in UserProfile.ROLE_CHOICES])
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, role, batch_size, **options):
+        created = provision(batch_size=batch_size, role=role)
+        self.stdout.write(f'Created {created} profiles.')
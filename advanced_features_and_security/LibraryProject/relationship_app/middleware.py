@@ -0,0 +1,19 @@
+from django.utils.functional import SimpleLazyObject
+
+from .access import access_of
+
+
+class AccessMiddleware:
+    """
+    Sets `request.access`, the cached roles and permissions of
+    `request.user`, loaded on first use. Users that another backend
+    authenticated get the same snapshot, so their checks are cached too.
+    Must come after AuthenticationMiddleware.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.access = SimpleLazyObject(lambda: access_of(request.user) if request.user.is_authenticated else None)
+        return self.get_response(request)
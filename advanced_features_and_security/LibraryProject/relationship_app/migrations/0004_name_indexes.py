@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 06:10
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relationship_app', '0003_catalogimport'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(fields=['name'], name='author_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='author',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='author_name_lower_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='library',
+            index=models.Index(fields=['name'], name='library_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='library',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='library_name_lower_idx'),
+        ),
+    ]
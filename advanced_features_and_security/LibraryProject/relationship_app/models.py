@@ -1,7 +1,8 @@
 from django.db import models
 from django.conf import settings
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.functions import Lower
+
+from avatars import pick
 
 # -----------------------------
 # Author model
@@ -12,13 +13,28 @@ class Author(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='author_name_idx'),
+            # case-insensitive lookups (query_samples) filter on LOWER(name)
+            models.Index(Lower('name'), name='author_name_lower_idx'),
+        ]
+
 # -----------------------------
 # Book model with custom permissions
 # -----------------------------
+class BookQuerySet(models.QuerySet):
+    def with_author(self):
+        """Books with their author joined in, for listings that show `book.author.name`."""
+        return self.select_related('author')
+
+
 class Book(models.Model):
     title = models.CharField(max_length=200)
     author = models.ForeignKey(Author, on_delete=models.CASCADE)
 
+    objects = BookQuerySet.as_manager()
+
     def __str__(self):
         return self.title
 
@@ -39,6 +55,12 @@ class Library(models.Model):
     def __str__(self):
         return self.name
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='library_name_idx'),
+            models.Index(Lower('name'), name='library_name_lower_idx'),
+        ]
+
 # -----------------------------
 # Librarian model
 # -----------------------------
@@ -64,18 +86,46 @@ class UserProfile(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     bio = models.TextField(blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    # {size: {extension: storage path}} of the resized copies avatars.py
+    # renders off the request path; empty until they exist
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return f"{self.user.username} - {self.role}"
 
+    def avatar_url(self, size=256):
+        """URL of the WebP variant nearest `size`, or of the upload until variants exist."""
+        if not self.avatar:
+            return None
+        path = pick(self.avatar_variants, size)
+        return self.avatar.storage.url(path) if path else self.avatar.url
+
+
 # -----------------------------
-# Signals to auto-create and save UserProfile
+# Catalogue imports (see catalog.py)
 # -----------------------------
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def create_user_profile(sender, instance, created, **kwargs):
-    if created:
-        UserProfile.objects.create(user=instance)
-
-@receiver(post_save, sender=settings.AUTH_USER_MODEL)
-def save_user_profile(sender, instance, **kwargs):
-    instance.userprofile.save()
+class CatalogImport(models.Model):
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('jsonl', 'JSON Lines'),
+        ('marc', 'MARC (mnemonic text)'),
+    )
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    source = models.FileField(upload_to='imports/')
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    # Importer.stats, updated after every chunk
+    stats = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.source.name} ({self.status})"
@@ -0,0 +1,66 @@
+"""
+Profile provisioning.
+
+Users do not get a `UserProfile` when they are created, and saving a user
+never writes to their profile. A user without a profile has no role.
+`get_profile` creates the profile the first time code needs one to write
+to. Imports that create users with `bulk_create` call `provision` to
+create the missing profiles in batches; `python manage.py
+provision_profiles` does the same for every user still without one.
+"""
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+
+from . import access
+from .models import UserProfile
+
+BATCH_SIZE = 1000
+
+
+def get_profile(user, **defaults):
+    """`user`'s profile, created with `defaults` if they have none yet."""
+    try:
+        return user.userprofile
+    except UserProfile.DoesNotExist:
+        pass
+    profile, _ = UserProfile.objects.get_or_create(user=user, defaults=defaults)
+    user.userprofile = profile
+    return profile
+
+
+def _batches(user_ids, batch_size):
+    while batch := list(islice(user_ids, batch_size)):
+        yield batch
+
+
+def _unprovisioned(batch_size):
+    # keyset batches: the next query starts after the last id, so the
+    # profiles created in between do not shift the window
+    users = get_user_model().objects.filter(userprofile__isnull=True).order_by('pk').values_list('pk', flat=True)
+    last = 0
+    while batch := list(users.filter(pk__gt=last)[:batch_size]):
+        last = batch[-1]
+        yield batch
+
+
+def provision(user_ids=None, batch_size=BATCH_SIZE, **defaults):
+    """
+    Create profiles with `defaults` for the users in `user_ids` (every user,
+    if None) that have none. Returns how many were created; existing
+    profiles are left as they are.
+    """
+    batches = _batches(iter(user_ids), batch_size) if user_ids is not None else _unprovisioned(batch_size)
+    created = 0
+    for batch in batches:
+        missing = set(batch) - set(UserProfile.objects.filter(user_id__in=batch).values_list('user_id', flat=True))
+        if not missing:
+            continue
+        # ignore_conflicts: a profile created meanwhile by get_profile wins
+        UserProfile.objects.bulk_create(
+            [UserProfile(user_id=user_id, **defaults) for user_id in missing], ignore_conflicts=True,
+        )
+        # bulk_create sends no post_save, so drop cached roles here
+        access.invalidate(*missing)
+        created += len(missing)
+    return created
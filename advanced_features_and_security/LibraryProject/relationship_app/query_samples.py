@@ -1,25 +1,65 @@
-from relationship_app.models import Author, Book, Library, Librarian
+"""
+Catalogue lookups by author and library name.
+
+Names match case-insensitively: both sides are compared through LOWER(),
+which the `*_name_lower_idx` functional indexes on Author and Library
+cover. Each helper is a single joined query. The plural variants take many
+names and answer for all of them in one query, returning a dict keyed by
+the names as given; names that match nothing map to an empty list (or
+None).
+"""
+from django.db.models import F, Value
+from django.db.models.functions import Lower
+
+from relationship_app.models import Book, Library, Librarian
+
+
+def _name_matches(queryset, field, names):
+    """`queryset` filtered to rows whose `field` equals one of `names`, ignoring case."""
+    return queryset.alias(name_key=Lower(field)).filter(name_key__in=[Lower(Value(name)) for name in names])
+
+
+def _group(names, rows, name_of):
+    """{name: [rows]} for each of `names`, matching `name_of(row)` case-insensitively."""
+    by_key = {}
+    for row in rows:
+        by_key.setdefault(name_of(row).lower(), []).append(row)
+    return {name: by_key.get(name.lower(), []) for name in names}
+
 
 # 1. Query all books by a specific author
 def books_by_author(author_name):
-    try:
-        author = Author.objects.get(name=author_name)
-        return Book.objects.filter(author=author)
-    except Author.DoesNotExist:
-        return []
+    return _name_matches(Book.objects.with_author(), 'author__name', [author_name]).order_by('pk')
+
+
+def books_by_authors(author_names):
+    """{author name: [books]}; the books come with their authors."""
+    books = _name_matches(Book.objects.with_author(), 'author__name', author_names).order_by('pk')
+    return _group(author_names, books, lambda book: book.author.name)
+
 
 # 2. List all books in a library
 def books_in_library(library_name):
-    try:
-        library = Library.objects.get(name=library_name)
-        return library.books.all()
-    except Library.DoesNotExist:
-        return []
+    # through a subquery: a LOWER() alias across the m2m would keep its joins outer
+    libraries = _name_matches(Library.objects.all(), 'name', [library_name])
+    return Book.objects.with_author().filter(library__in=libraries).order_by('pk')
+
+
+def books_in_libraries(library_names):
+    """{library name: [books]}; the books come with their authors."""
+    libraries = _name_matches(Library.objects.all(), 'name', library_names)
+    # the annotation reuses the filter's join, so a book is listed once per matching library
+    books = Book.objects.with_author().filter(library__in=libraries).annotate(library_name=F('library__name'))
+    return _group(library_names, books.order_by('pk'), lambda book: book.library_name)
+
 
 # 3. Retrieve the librarian for a library
 def librarian_for_library(library_name):
-    try:
-        library = Library.objects.get(name=library_name)
-        return Librarian.objects.get(library=library)
-    except (Library.DoesNotExist, Librarian.DoesNotExist):
-        return None
+    return _name_matches(Librarian.objects.select_related('library'), 'library__name', [library_name]).first()
+
+
+def librarians_for_libraries(library_names):
+    """{library name: librarian or None}."""
+    librarians = _name_matches(Librarian.objects.select_related('library'), 'library__name', library_names)
+    grouped = _group(library_names, librarians.order_by('pk'), lambda librarian: librarian.library.name)
+    return {name: rows[0] if rows else None for name, rows in grouped.items()}
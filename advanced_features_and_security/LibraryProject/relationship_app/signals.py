@@ -0,0 +1,94 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+import avatars
+from blobstore import references
+
+from . import access
+from .models import UserProfile
+from .tasks import delete_files, process_avatar
+
+
+@receiver(pre_save, sender=UserProfile)
+def reset_avatar_variants(sender, instance, update_fields=None, **kwargs):
+    """A new upload (or a cleared avatar) makes the rendered variants stale."""
+    if 'avatar' not in instance.__dict__ or (update_fields and 'avatar' not in update_fields):
+        return
+    avatar = instance.avatar
+    # the field writes uploads to storage after this signal, so new ones are still uncommitted
+    instance._new_avatar = bool(avatar) and not avatar._committed
+    if avatar and not instance._new_avatar:
+        return
+    stale = instance.avatar_variants
+    if instance._new_avatar and instance.pk:
+        # the instance may predate the last render; the row has the variants to drop
+        stale = UserProfile.objects.filter(pk=instance.pk).values_list('avatar_variants', flat=True).first()
+    instance.avatar_variants = {}
+    if stale:
+        delete_files.enqueue(paths=avatars.variant_paths(stale))
+        if update_fields:
+            UserProfile.objects.filter(pk=instance.pk).update(avatar_variants={})
+
+
+@receiver(post_save, sender=UserProfile)
+def queue_avatar(sender, instance, **kwargs):
+    """New uploads get their variants rendered by a worker once this transaction commits."""
+    if instance.__dict__.pop('_new_avatar', False):
+        process_avatar.enqueue(profile_id=instance.pk, name=instance.avatar.name)
+
+
+@receiver(post_delete, sender=UserProfile)
+def release_avatar_variants(sender, instance, **kwargs):
+    if instance.avatar_variants:
+        delete_files.enqueue(paths=avatars.variant_paths(instance.avatar_variants))
+
+
+@references.register
+def avatar_variant_names():
+    variants = UserProfile.objects.exclude(avatar_variants={}).values_list('avatar_variants', flat=True)
+    for by_size in variants.iterator():
+        yield from avatars.variant_paths(by_size)
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_user_access(sender, instance, **kwargs):
+    access.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def invalidate_profile_access(sender, instance, **kwargs):
+    access.invalidate(instance.user_id)
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+@receiver(m2m_changed, sender=get_user_model().user_permissions.through)
+def invalidate_membership_access(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        access.invalidate(instance.pk)
+    elif pk_set:
+        access.invalidate(*pk_set)
+    else:
+        access.bump_generation()  # a group or permission cleared of all its users
+
+
+@receiver(m2m_changed, sender=Group.permissions.through)
+def invalidate_group_permission_access(sender, action, **kwargs):
+    if action.startswith('post_'):
+        access.bump_generation()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def invalidate_all_access(sender, created=False, **kwargs):
+    # a new group or permission is not held by anyone yet
+    if not created:
+        access.bump_generation()
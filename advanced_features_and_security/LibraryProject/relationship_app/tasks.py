@@ -0,0 +1,55 @@
+import io
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+import avatars
+from taskqueue.registry import task
+
+from . import catalog
+from .models import CatalogImport, UserProfile
+
+
+@task
+def process_avatar(profile_id, name):
+    """Swap the upload `name` for a stripped, resized copy and record its variants."""
+    profile = UserProfile.objects.filter(pk=profile_id).only('avatar', 'avatar_variants').first()
+    if profile is None or profile.avatar.name != name:
+        return  # the profile or avatar is gone, or a newer upload has its own task
+    original, variants = avatars.render(profile.avatar)
+    # update() sends no post_save, so this does not queue another run
+    updated = UserProfile.objects.filter(pk=profile_id, avatar=name).update(avatar=original, avatar_variants=variants)
+    if updated:
+        delete_files([name, *avatars.variant_paths(profile.avatar_variants)])
+    else:
+        delete_files([original, *avatars.variant_paths(variants)])
+
+
+@task
+def delete_files(paths):
+    for path in paths:
+        default_storage.delete(path)
+
+
+@task(max_attempts=1)
+def import_catalog(import_id):
+    """Run the upload of `CatalogImport` `import_id`, recording progress on the row as it goes."""
+    started = CatalogImport.objects.filter(pk=import_id, status='pending').update(status='running')
+    if not started:
+        return
+    job = CatalogImport.objects.get(pk=import_id)
+
+    def progress(stats):
+        CatalogImport.objects.filter(pk=import_id).update(stats=stats)
+
+    try:
+        with job.source.open('rb') as fh:
+            lines = io.TextIOWrapper(fh, encoding='utf-8-sig', newline='')
+            stats = catalog.import_catalog(lines, job.format, progress=progress)
+    except (catalog.CatalogFormatError, UnicodeDecodeError) as e:
+        CatalogImport.objects.filter(pk=import_id).update(status='failed', error=str(e), finished_at=timezone.now())
+        return
+    except Exception as e:
+        CatalogImport.objects.filter(pk=import_id).update(status='failed', error=repr(e), finished_at=timezone.now())
+        raise
+    CatalogImport.objects.filter(pk=import_id).update(status='done', stats=stats, finished_at=timezone.now())
@@ -1,3 +1,305 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import skipUnless
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Group, Permission
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from taskqueue.worker import Worker
+
+from . import access, catalog, query_samples
+from .models import Author, Book, CatalogImport, Librarian, Library, UserProfile
+from .profiles import get_profile, provision
+
+
+class CatalogueQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        authors = Author.objects.bulk_create(Author(name=f'Author {i}') for i in range(5))
+        cls.books = Book.objects.bulk_create(Book(title=f'Book {i}', author=authors[i % 5]) for i in range(150))
+        cls.library = Library.objects.create(name='Central')
+        cls.library.books.set(cls.books[:120])
+
+    def test_list_books_query_count_does_not_grow_with_books(self):
+        # session-less client: a count and one page of books, author joined in
+        with self.assertNumQueries(2):
+            response = self.client.get('/relationship_app/books/')
+        self.assertContains(response, 'Book 0 by Author 0')
+        self.assertNotContains(response, 'Book 100 by')
+        self.assertContains(response, 'Page 1 of 2')
+
+    def test_list_books_second_page(self):
+        response = self.client.get('/relationship_app/books/?page=2')
+        self.assertContains(response, 'Book 149 by Author 4')
+        self.assertNotContains(response, 'Book 99 by')
+
+    def test_library_detail_query_count(self):
+        # the library, a count and one page of its books
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/relationship_app/library/{self.library.pk}/')
+        self.assertContains(response, 'Library: Central')
+        self.assertContains(response, 'Book 99 by Author 4')
+        self.assertNotContains(response, 'Book 100 by')
+
+    def test_streamed_library_detail(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/relationship_app/library/{self.library.pk}/?stream=1')
+            body = b''.join(response.streaming_content).decode()
+        self.assertTrue(response.streaming)
+        self.assertIn('Book 119 by Author 4', body)
+        self.assertNotIn('Book 120 by', body)
+        self.assertNotIn('<!-- book rows -->', body)
+        self.assertTrue(body.rstrip().endswith('</html>'))
+
+    def test_streamed_list_books(self):
+        response = self.client.get('/relationship_app/books/?stream=1')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('<li>'), 150)
+
+
+class AccessCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('reader', 'reader@example.com', 'pw')
+        get_profile(cls.user, role='Admin')
+        cls.editors = Group.objects.create(name='editors')
+        cls.add_book = Permission.objects.get(codename='can_add_book')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def test_cached_dashboard_costs_only_the_session_query(self):
+        self.client.get('/relationship_app/admin-dashboard/')
+        with self.assertNumQueries(1):
+            response = self.client.get('/relationship_app/admin-dashboard/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_snapshot_loads_in_two_queries(self):
+        self.user.groups.add(self.editors)
+        self.editors.permissions.add(self.add_book)
+        with self.assertNumQueries(2):
+            snapshot = access.get(self.user.pk)
+        self.assertEqual(snapshot.role, 'Admin')
+        self.assertEqual(snapshot.groups, {'editors'})
+        self.assertEqual(snapshot.permissions, {'relationship_app.can_add_book'})
+
+    def test_profile_change_invalidates(self):
+        self.client.get('/relationship_app/admin-dashboard/')
+        profile = get_profile(self.user)
+        profile.role = 'Member'
+        profile.save()
+        self.assertEqual(self.client.get('/relationship_app/admin-dashboard/').status_code, 302)
+        self.assertEqual(self.client.get('/relationship_app/member-dashboard/').status_code, 200)
+
+    def test_group_permission_change_invalidates(self):
+        self.user.groups.add(self.editors)
+        self.assertEqual(self.client.get('/relationship_app/add_book/').status_code, 302)
+        self.editors.permissions.add(self.add_book)
+        self.assertEqual(self.client.get('/relationship_app/add_book/').status_code, 200)
+        self.editors.permissions.clear()
+        self.assertEqual(self.client.get('/relationship_app/add_book/').status_code, 302)
+
+    def test_permission_change_invalidates(self):
+        self.user.user_permissions.add(self.add_book)
+        self.assertEqual(access.get(self.user.pk).permissions, {'relationship_app.can_add_book'})
+        self.add_book.codename = 'can_add_books'
+        self.add_book.save()
+        self.assertEqual(access.get(self.user.pk).permissions, {'relationship_app.can_add_books'})
+
+    def test_group_membership_change_invalidates(self):
+        self.editors.permissions.add(self.add_book)
+        self.assertEqual(self.client.get('/relationship_app/add_book/').status_code, 302)
+        self.editors.user_set.add(self.user)
+        self.assertEqual(self.client.get('/relationship_app/add_book/').status_code, 200)
+
+
+class ProfileProvisioningTests(TestCase):
+    def test_user_saves_do_not_touch_profiles(self):
+        user = get_user_model().objects.create_user('reader', 'reader@example.com', 'pw')
+        self.assertFalse(UserProfile.objects.exists())
+        with self.assertNumQueries(1):
+            user.save(update_fields=['last_login'])
+
+    def test_get_profile_creates_once(self):
+        user = get_user_model().objects.create_user('reader', 'reader@example.com', 'pw')
+        profile = get_profile(user, role='Librarian')
+        self.assertEqual(profile.role, 'Librarian')
+        with self.assertNumQueries(0):
+            self.assertEqual(get_profile(user, role='Member'), profile)
+        user = get_user_model().objects.get(pk=user.pk)
+        self.assertEqual(get_profile(user).role, 'Librarian')
+
+    def test_provision_creates_missing_profiles_in_batches(self):
+        User = get_user_model()
+        users = User.objects.bulk_create(User(username=f'user{i}', email=f'user{i}@example.com') for i in range(25))
+        get_profile(users[0], role='Admin')
+        with self.assertNumQueries(10):
+            # per batch of 10: the ids, their existing profiles, one insert; then the empty batch
+            self.assertEqual(provision(batch_size=10, role='Member'), 24)
+        self.assertEqual(UserProfile.objects.filter(role='Member').count(), 24)
+        self.assertEqual(UserProfile.objects.get(user=users[0]).role, 'Admin')
+        self.assertEqual(provision([user.pk for user in users]), 0)
+
+    def test_register_creates_profile(self):
+        resp = self.client.post('/relationship_app/register/', {
+            'username': 'newbie', 'password1': 'S3cure-pass-123', 'password2': 'S3cure-pass-123',
+        })
+        self.assertRedirects(resp, '/relationship_app/books/', fetch_redirect_response=False)
+        profile = UserProfile.objects.get(user__username='newbie')
+        self.assertEqual(profile.role, '')
+        self.assertEqual(self.client.get('/relationship_app/member-dashboard/').status_code, 302)
+
+    def test_provision_profiles_command(self):
+        User = get_user_model()
+        User.objects.bulk_create(User(username=f'user{i}', email=f'user{i}@example.com') for i in range(3))
+        out = StringIO()
+        call_command('provision_profiles', role='Member', stdout=out)
+        self.assertIn('Created 3 profiles.', out.getvalue())
+        self.assertFalse(User.objects.filter(userprofile__isnull=True).exists())
+
+
+CATALOG_CSV = """title,author,libraries
+Dune,Frank Herbert,Central|East
+Emma,Jane Austen,Central
+Dune,Frank Herbert,West
+,Nobody,Central
+Persuasion,Jane Austen,
+"""
+
+CATALOG_MARC = """=LDR  00000nam  2200000 a 4500
+=001  0001
+=100  1\\$aAusten, Jane,$d1775-1817.
+=245  10$aEmma /$cJane Austen.
+=852  \\$aCentral$bStacks
+
+=LDR  00000nam  2200000 a 4500
+=110  2\\$aRoyal Society.
+=245  10$aPhilosophical transactions :$bgiving some account.
+=852  \\$aEast
+=852  \\$aWest
+"""
+
+
+class CatalogImportTests(TestCase):
+    def holdings(self):
+        return set(Library.books.through.objects.values_list('library__name', 'book__title'))
+
+    def test_csv_import_is_idempotent(self):
+        Author.objects.create(name='Jane Austen')
+        reports = []
+        stats = catalog.import_catalog(io.StringIO(CATALOG_CSV), 'csv', chunk_size=2, progress=lambda s: reports.append(dict(s)))
+        self.assertEqual(stats, {'records': 5, 'skipped': 1, 'authors': 1, 'books': 3, 'libraries': 3, 'holdings': 4})
+        self.assertEqual([r['records'] for r in reports], [2, 4, 5])
+        self.assertEqual(Author.objects.filter(name='Jane Austen').count(), 1)
+        self.assertEqual(self.holdings(), {('Central', 'Dune'), ('East', 'Dune'), ('West', 'Dune'), ('Central', 'Emma')})
+
+        again = catalog.import_catalog(io.StringIO(CATALOG_CSV), 'csv')
+        self.assertEqual(again, {'records': 5, 'skipped': 1, 'authors': 0, 'books': 0, 'libraries': 0, 'holdings': 0})
+        self.assertEqual(Book.objects.count(), 3)
+
+    def test_chunk_query_count_does_not_grow_with_records(self):
+        Author.objects.create(name='Someone')
+        Library.objects.create(name='Central')
+        lines = ['{"title": "Book %d", "author": "Someone", "libraries": ["Central"]}' % i for i in range(400)]
+        # the two name maps, then per chunk: a savepoint pair, the book lookup, two inserts
+        with self.assertNumQueries(7):
+            stats = catalog.import_catalog(lines, 'jsonl', chunk_size=1000)
+        self.assertEqual(stats['books'], 400)
+        self.assertEqual(Library.objects.get(name='Central').books.count(), 400)
+        self.assertEqual(Book.objects.order_by('pk').first().title, 'Book 0')
+
+    def test_marc_records(self):
+        self.assertEqual(list(catalog.read(io.StringIO(CATALOG_MARC), 'marc')), [
+            ('Emma', 'Austen, Jane', ['Central']),
+            ('Philosophical transactions : giving some account', 'Royal Society', ['East', 'West']),
+        ])
+
+    def test_format_errors_name_the_line(self):
+        with self.assertRaisesMessage(catalog.CatalogFormatError, 'line 2: invalid JSON'):
+            catalog.import_catalog(['{"title": "A", "author": "B"}', '{oops'], 'jsonl')
+
+    def test_command(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'catalog.mrk')
+        with open(path, 'w') as fh:
+            fh.write(CATALOG_MARC)
+        out = StringIO()
+        call_command('import_catalog', path, stdout=out, stderr=StringIO())
+        self.assertIn('Imported 2 records: 2 new books', out.getvalue())
+
+    def test_upload_is_imported_by_a_worker(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        user = get_user_model().objects.create_user('librarian', 'librarian@example.com', 'pw')
+        user.user_permissions.add(Permission.objects.get(codename='can_add_book'))
+        self.client.force_login(user)
+
+        response = self.client.post('/relationship_app/import/', {
+            'source': SimpleUploadedFile('catalog.csv', CATALOG_CSV.encode()),
+        })
+        job = CatalogImport.objects.get()
+        self.assertRedirects(response, f'/relationship_app/import/{job.pk}/')
+        self.assertEqual((job.format, job.status), ('csv', 'pending'))
+
+        Worker().run(burst=True)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(job.stats['books'], 3)
+        self.assertContains(self.client.get(f'/relationship_app/import/{job.pk}/'), 'New books: 3')
+
+
+class QuerySampleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        austen, herbert = Author.objects.bulk_create([Author(name='Jane Austen'), Author(name='Frank Herbert')])
+        cls.emma, cls.dune, cls.persuasion = Book.objects.bulk_create([
+            Book(title='Emma', author=austen), Book(title='Dune', author=herbert), Book(title='Persuasion', author=austen),
+        ])
+        central, cls.east = Library.objects.bulk_create([Library(name='Central'), Library(name='East')])
+        central.books.set([cls.emma, cls.dune])
+        cls.librarian = Librarian.objects.create(name='Ann', library=central)
+
+    def test_single_lookups_take_one_query_and_ignore_case(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(list(query_samples.books_by_author('jane AUSTEN')), [self.emma, self.persuasion])
+        with self.assertNumQueries(1):
+            books = list(query_samples.books_in_library('central'))
+            self.assertEqual([book.author.name for book in books], ['Jane Austen', 'Frank Herbert'])
+        with self.assertNumQueries(1):
+            self.assertEqual(query_samples.librarian_for_library('CENTRAL'), self.librarian)
+        self.assertEqual(list(query_samples.books_by_author('Nobody')), [])
+        self.assertIsNone(query_samples.librarian_for_library('East'))
+
+    def test_batched_lookups_take_one_query(self):
+        with self.assertNumQueries(1):
+            by_author = query_samples.books_by_authors(['jane austen', 'Frank Herbert', 'Nobody'])
+        self.assertEqual(by_author, {
+            'jane austen': [self.emma, self.persuasion], 'Frank Herbert': [self.dune], 'Nobody': [],
+        })
+        with self.assertNumQueries(1):
+            by_library = query_samples.books_in_libraries(['Central', 'east'])
+            self.assertEqual([book.author.name for book in by_library['Central']], ['Jane Austen', 'Frank Herbert'])
+        self.assertEqual(by_library['east'], [])
+        with self.assertNumQueries(1):
+            librarians = query_samples.librarians_for_libraries(['central', 'East'])
+        self.assertEqual(librarians, {'central': self.librarian, 'East': None})
+
+    @skipUnless(connection.vendor == 'sqlite', 'other planners may prefer a scan on tables this small')
+    def test_name_lookups_use_the_functional_indexes(self):
+        plan = query_samples.books_by_author('Jane Austen').explain()
+        self.assertIn('author_name_lower_idx', plan)
+        plan = query_samples.books_in_library('Central').explain()
+        self.assertIn('library_name_lower_idx', plan)
@@ -22,6 +22,10 @@ urlpatterns = [
     path('edit_book/<int:book_id>/', views.edit_book, name='edit_book'),
     path('delete_book/<int:book_id>/', views.delete_book, name='delete_book'),
 
+    # Bulk catalogue import
+    path('import/', views.import_catalog, name='import_catalog'),
+    path('import/<int:pk>/', views.import_status, name='import_status'),
+
     # Optional: you can keep the old ones too if you want
     # path('books/add/', views.add_book, name='add_book_alt'),
     # path('books/edit/<int:pk>/', views.edit_book, name='edit_book_alt'),
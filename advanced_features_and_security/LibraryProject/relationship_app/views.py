@@ -1,6 +1,6 @@
 from django.contrib.auth.decorators import permission_required
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import login
+from django.contrib.auth import get_user_model, login
 from django.urls import reverse_lazy
 from django.views import View
 from django.views.generic.detail import DetailView
@@ -10,14 +10,54 @@ from django.contrib.auth.decorators import permission_required
 from django.contrib.auth.decorators import user_passes_test
 from django.utils.decorators import method_decorator
 from django.views.decorators.csrf import csrf_exempt
+from django.core.paginator import Paginator
+from django.http import StreamingHttpResponse
+from django.template.loader import render_to_string
+from itertools import islice
 
-from .models import Book, Library, Author
+from .access import access_of
+from .models import Book, Library, Author, CatalogImport
+from .profiles import get_profile
+from . import catalog
+from .tasks import import_catalog as import_catalog_task
+
+BOOKS_PER_PAGE = 100
+# books rendered per chunk of a streamed page
+STREAM_CHUNK_SIZE = 2000
+# where a page template rendered with `streaming` leaves room for the rows
+ROWS_MARKER = '<!-- book rows -->'
+
+
+def book_page(request, books):
+    """One page of `books` (two queries: a count and the page itself)."""
+    return Paginator(books, BOOKS_PER_PAGE).get_page(request.GET.get('page'))
+
+
+def stream_books(request, template_name, context, books):
+    """
+    Render `template_name` once with the rows left out, then stream the
+    rows into their place in chunks. Books are read with `.iterator()`, so
+    memory use does not grow with the size of the catalogue.
+    """
+    head, tail = render_to_string(template_name, {**context, 'streaming': True}, request).split(ROWS_MARKER, 1)
+
+    def content():
+        yield head
+        rows = books.iterator(chunk_size=STREAM_CHUNK_SIZE)
+        while chunk := list(islice(rows, STREAM_CHUNK_SIZE)):
+            yield render_to_string('relationship_app/book_rows.html', {'books': chunk})
+        yield tail
+
+    return StreamingHttpResponse(content())
 
 
 # ✅ Function-based view to list all books
 def list_books(request):
-    books = Book.objects.all()
-    return render(request, 'relationship_app/list_books.html', {'books': books})
+    books = Book.objects.with_author().order_by('pk')
+    if request.GET.get('stream'):
+        return stream_books(request, 'relationship_app/list_books.html', {}, books)
+    page = book_page(request, books)
+    return render(request, 'relationship_app/list_books.html', {'books': page, 'page_obj': page})
 
 
 # ✅ Class-based view to show library details
@@ -26,29 +66,49 @@ class LibraryDetailView(DetailView):
     template_name = 'relationship_app/library_detail.html'
     context_object_name = 'library'
 
+    def get_books(self):
+        return self.object.books.with_author().order_by('pk')
+
+    def get(self, request, *args, **kwargs):
+        if not request.GET.get('stream'):
+            return super().get(request, *args, **kwargs)
+        self.object = self.get_object()
+        return stream_books(request, self.template_name, {'library': self.object}, self.get_books())
+
+    def get_context_data(self, **kwargs):
+        page = book_page(self.request, self.get_books())
+        return super().get_context_data(books=page, page_obj=page, **kwargs)
+
+
+class RegisterForm(UserCreationForm):
+    class Meta(UserCreationForm.Meta):
+        model = get_user_model()
+
 
 # ✅ Function-based view for user registration
 def register(request):
     if request.method == 'POST':
-        form = UserCreationForm(request.POST)
+        form = RegisterForm(request.POST)
         if form.is_valid():
             user = form.save()
-            login(request, user)
+            # a registered user starts with a profile, without a role yet
+            get_profile(user)
+            login(request, user, backend='relationship_app.backends.CachedAccessBackend')
             return redirect('list_books')
     else:
-        form = UserCreationForm()
+        form = RegisterForm()
     return render(request, 'relationship_app/register.html', {'form': form})
 
 
-# ✅ Role check helpers
+# ✅ Role check helpers (roles come from the access cache, not a profile query)
 def is_admin(user):
-    return user.is_authenticated and user.userprofile.role == 'Admin'
+    return user.is_authenticated and access_of(user).role == 'Admin'
 
 def is_librarian(user):
-    return user.is_authenticated and user.userprofile.role == 'Librarian'
+    return user.is_authenticated and access_of(user).role == 'Librarian'
 
 def is_member(user):
-    return user.is_authenticated and user.userprofile.role == 'Member'
+    return user.is_authenticated and access_of(user).role == 'Member'
 
 
 # ✅ Role-based views
@@ -99,3 +159,29 @@ def delete_book(request, pk):
         book.delete()
         return redirect('list_books')
     return render(request, 'relationship_app/delete_book.html', {'book': book})
+
+
+# ✅ Catalogue import: the upload is stored and imported by a task queue worker
+@permission_required('relationship_app.can_add_book')
+def import_catalog(request):
+    error = None
+    if request.method == 'POST':
+        source = request.FILES.get('source')
+        catalog_format = request.POST.get('format') or (source and catalog.guess_format(source.name))
+        if source is None:
+            error = 'Choose a file to import.'
+        elif catalog_format not in catalog.FORMATS:
+            error = 'Cannot tell the format from the file name; choose one.'
+        else:
+            job = CatalogImport.objects.create(source=source, format=catalog_format, created_by=request.user)
+            import_catalog_task.enqueue(import_id=job.pk)
+            return redirect('import_status', pk=job.pk)
+    return render(request, 'relationship_app/import_catalog.html', {
+        'formats': CatalogImport.FORMAT_CHOICES, 'error': error,
+    })
+
+
+@permission_required('relationship_app.can_add_book')
+def import_status(request, pk):
+    job = get_object_or_404(CatalogImport, pk=pk)
+    return render(request, 'relationship_app/import_status.html', {'job': job})
@@ -11,10 +11,17 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps shared by every project in this repository (perfmon) live in shared/
+# at the repository root.
+SHARED_APPS_DIR = BASE_DIR.parent.parent / 'shared'
+if str(SHARED_APPS_DIR) not in sys.path:
+    sys.path.append(str(SHARED_APPS_DIR))
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
@@ -40,9 +47,11 @@ INSTALLED_APPS = [
     'library.apps.LibraryConfig',
     'bookshelf.apps.BookshelfConfig',        # ✅ for the bookshelf app
     'relationship_app',                       # ✅ new app you're working on,  # Add this line
+    'perfmon',
 ]
 
 MIDDLEWARE = [
+    'perfmon.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -129,3 +138,13 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_REDIRECT_URL = 'list_books'  # Redirect after successful login
 LOGOUT_REDIRECT_URL = 'login'      # Redirect after logout
+
+
+# Request instrumentation (perfmon app)
+# Requests over these budgets are logged to the 'perfmon' logger; per-URL
+# histograms are served at /__perf__/ (staff only when DEBUG is off).
+PERFMON = {
+    'QUERY_BUDGET': 50,
+    'LATENCY_BUDGET_MS': 500,
+    'SERVER_TIMING': True,
+}
@@ -19,4 +19,5 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls), path('relationship_app/', include('relationship_app.urls')),
+    path('__perf__/', include('perfmon.urls')),
 ]
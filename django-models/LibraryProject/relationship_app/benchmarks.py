@@ -0,0 +1,50 @@
+"""Benchmark data and endpoints: a large book catalogue spread over libraries."""
+from django.db.models import Max
+
+from perfmon.bench import benchmark, seeder
+
+from .models import Author, Book, Library
+
+AUTHORS = 1000
+BOOKS = 20000
+LIBRARIES = 20
+BOOKS_PER_LIBRARY = 1000
+BATCH_SIZE = 5000
+
+
+@seeder
+def catalogue(suite):
+    rng = suite.rng
+    Author.objects.bulk_create(
+        (Author(name=f'Author {i}') for i in range(suite.size(AUTHORS))),
+        batch_size=BATCH_SIZE,
+    )
+    author_ids = list(Author.objects.values_list('pk', flat=True))
+    Book.objects.bulk_create(
+        (Book(title=f'Book {i}', author_id=rng.choice(author_ids)) for i in range(suite.size(BOOKS))),
+        batch_size=BATCH_SIZE,
+    )
+    book_ids = list(Book.objects.values_list('pk', flat=True))
+
+    Library.objects.bulk_create(Library(name=f'Library {i}') for i in range(suite.size(LIBRARIES)))
+    Holding = Library.books.through
+    per_library = min(len(book_ids), BOOKS_PER_LIBRARY)
+    Holding.objects.bulk_create(
+        (
+            Holding(library_id=library_id, book_id=book_id)
+            for library_id in Library.objects.values_list('pk', flat=True)
+            for book_id in rng.sample(book_ids, per_library)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    suite.data['library_id'] = Library.objects.aggregate(last=Max('pk'))['last']
+
+
+@benchmark('list_books')
+def list_books(client, suite):
+    return client.get('/relationship_app/books/')
+
+
+@benchmark('library_detail')
+def library_detail(client, suite):
+    return client.get(f"/relationship_app/library/{suite.data['library_id']}/")
@@ -0,0 +1,101 @@
+"""Benchmark data and endpoints: posts with tags and comments, search and the tag cloud."""
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import Max, Min
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
+
+from perfmon.bench import benchmark, explicit_timestamps, seeder
+
+from .models import Comment, Post
+from .search import get_backend
+from .tagstats import refresh_tag_stats
+
+USERS = 200
+POSTS = 4000
+COMMENTS = 10000
+TAGS = 300
+BATCH_SIZE = 5000
+
+WORDS = (
+    'django python database index query cache template view model migration '
+    'search tag comment feed latency memory profile server request response '
+    'python async worker queue storage image thumbnail token session cookie'
+).split()
+
+
+@seeder
+def blog(suite):
+    rng = suite.rng
+    password = make_password('bench')
+    User.objects.bulk_create(
+        (User(username=f'bench{i}', password=password) for i in range(suite.size(USERS))),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    suite.data['reader'] = User.objects.get(pk=user_ids[0])
+
+    start = timezone.now() - timedelta(days=365)
+    n_posts = suite.size(POSTS)
+    step = timedelta(days=365) / n_posts
+    with explicit_timestamps(Post, 'published_date'):
+        Post.objects.bulk_create(
+            (
+                Post(author_id=rng.choice(user_ids), title=' '.join(rng.choices(WORDS, k=4)),
+                     content=' '.join(rng.choices(WORDS, k=80)), published_date=start + i * step)
+                for i in range(n_posts)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    span = Post.objects.aggregate(first=Min('pk'), last=Max('pk'))
+    suite.data['post_id'] = span['last']
+
+    Comment.objects.bulk_create(
+        (
+            Comment(post_id=rng.randint(span['first'], span['last']), author_id=rng.choice(user_ids),
+                    content=' '.join(rng.choices(WORDS, k=12)))
+            for _ in range(suite.size(COMMENTS))
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    # Tag usage is Zipf-like: a handful of tags are on most posts.
+    Tag.objects.bulk_create(Tag(name=f'tag{i}', slug=f'tag{i}') for i in range(suite.size(TAGS)))
+    tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+    popularity = list(accumulate(1 / rank for rank in range(1, len(tag_ids) + 1)))
+    content_type = ContentType.objects.get_for_model(Post)
+    items = set()
+    for post_id in range(span['first'], span['last'] + 1):
+        for tag_id in rng.choices(tag_ids, cum_weights=popularity, k=rng.randint(1, 4)):
+            items.add((post_id, tag_id))
+    TaggedItem.objects.bulk_create(
+        (TaggedItem(content_type=content_type, object_id=post_id, tag_id=tag_id) for post_id, tag_id in items),
+        batch_size=BATCH_SIZE,
+    )
+
+    refresh_tag_stats(tag_ids)
+    get_backend().rebuild()
+
+
+@benchmark('post_list', user='reader')
+def post_list(client, suite):
+    return client.get('/')
+
+
+@benchmark('post_detail', user='reader')
+def post_detail(client, suite):
+    return client.get(f"/post/{suite.data['post_id']}/")
+
+
+@benchmark('search')
+def search(client, suite):
+    return client.get('/search/', {'q': 'database index'})
+
+
+@benchmark('tag_cloud', user='reader')
+def tag_cloud(client, suite):
+    return client.get('/tags/')
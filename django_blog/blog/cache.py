@@ -0,0 +1,120 @@
+"""
+Versioned caching for blog pages and template fragments.
+
+Nothing is ever deleted from the cache. Every cached item has a version
+counter in its key instead, and blog/signals.py bumps that counter when a
+Post, its tags or its comments change, so stale entries are never read
+again and simply expire. Scopes:
+
+- ``site``: every full page; bumped by any post, tag or comment change.
+- ``post:<pk>``: the rendered body and tags of one post.
+- ``comments:<pk>``: the rendered comment section of one post.
+
+Full pages are only cached for anonymous visitors without a session, and
+are sent with ``Vary: Cookie``. Logged-in users render the page but reuse
+the cached fragments.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_vary_headers
+
+
+def page_timeout():
+    return getattr(settings, 'BLOG_PAGE_CACHE_TIMEOUT', 300)
+
+
+def fragment_timeout():
+    return getattr(settings, 'BLOG_FRAGMENT_CACHE_TIMEOUT', 3600)
+
+
+def _version_key(scope):
+    return f'blog:version:{scope}'
+
+
+def _initial_version():
+    # Seed counters from the clock: if a counter is evicted and re-created it
+    # must not collide with keys written under its previous values.
+    return int(time.time() * 1000)
+
+
+def get_versions(*scopes):
+    """Return {scope: version} for the given scopes in one cache round trip."""
+    keys = {_version_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    missing = {key: _initial_version() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def bump(*scopes):
+    for scope in scopes:
+        key = _version_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _initial_version(), None)
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def comments_scope(post_id):
+    return f'comments:{post_id}'
+
+
+def fragment_versions(post_id):
+    """Template context for the `{% cache %}` fragments of one post."""
+    versions = get_versions(post_scope(post_id), comments_scope(post_id))
+    return {
+        'fragment_timeout': fragment_timeout(),
+        'post_version': versions[post_scope(post_id)],
+        'comments_version': versions[comments_scope(post_id)],
+    }
+
+
+def is_page_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and settings.SESSION_COOKIE_NAME not in request.COOKIES
+        and not request.user.is_authenticated
+    )
+
+
+def page_key(request):
+    version = get_versions('site')['site']
+    url = hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    return f'blog:page:{version}:{url}'
+
+
+def cache_anonymous_page(view):
+    """Serve anonymous GETs of `view` from a full-page cache keyed by site version."""
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if not is_page_cacheable(request):
+            response = view(request, *args, **kwargs)
+            patch_vary_headers(response, ('Cookie',))
+            return response
+
+        key = page_key(request)
+        response = cache.get(key)
+        if response is not None:
+            return response
+
+        response = view(request, *args, **kwargs)
+        patch_vary_headers(response, ('Cookie',))
+        if response.status_code == 200 and not response.cookies:
+            def store(rendered):
+                cache.set(key, rendered, page_timeout())
+            if hasattr(response, 'render') and callable(response.render):
+                response.add_post_render_callback(store)
+            else:
+                store(response)
+        return response
+    return wrapped
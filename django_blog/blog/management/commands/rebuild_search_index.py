@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from blog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Drop and rebuild the full-text search index for all blog posts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default')
+
+    def handle(self, *args, database, **options):
+        backend = get_backend(database)
+        total = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} posts with {type(backend).__name__}.'))
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from blog.search import get_backend
+    get_backend(schema_editor.connection.alias).install()
+
+
+def uninstall_search_index(apps, schema_editor):
+    from blog.search import get_backend
+    get_backend(schema_editor.connection.alias).uninstall()
+
+
+class Migration(migrations.Migration):
+    """
+    Create the full-text index used by blog.search for the current database
+    vendor. Existing posts are indexed by `manage.py rebuild_search_index`.
+    """
+
+    dependencies = [
+        ('blog', '0003_post_tags'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_tag_stats(apps, schema_editor):
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    TaggedItem = apps.get_model('taggit', 'TaggedItem')
+    Post = apps.get_model('blog', 'Post')
+    TagStat = apps.get_model('blog', 'TagStat')
+
+    post_type = ContentType.objects.filter(app_label='blog', model='post').first()
+    if post_type is None:
+        return
+    dates = dict(Post.objects.values_list('pk', 'published_date'))
+    stats = {}
+    for tag_id, object_id in TaggedItem.objects.filter(content_type=post_type).values_list('tag_id', 'object_id'):
+        if object_id not in dates:
+            continue
+        count, latest = stats.get(tag_id, (0, None))
+        date = dates[object_id]
+        stats[tag_id] = (count + 1, date if latest is None or date > latest else latest)
+    TagStat.objects.bulk_create(
+        TagStat(tag_id=tag_id, post_count=count, latest_post_date=latest)
+        for tag_id, (count, latest) in stats.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_search_index'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TagStat',
+            fields=[
+                ('tag', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stat', serialize=False, to='taggit.tag')),
+                ('post_count', models.PositiveIntegerField(default=0)),
+                ('latest_post_date', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-post_count'], name='tagstat_post_count_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_tag_stats, migrations.RunPython.noop),
+    ]
@@ -26,3 +26,18 @@ class Comment(models.Model):
 
     def __str__(self):
         return f'Comment by {self.author.username} on {self.post.title}'
+
+
+class TagStat(models.Model):
+    """Materialized per-tag counts for the tag cloud, refreshed by blog/signals.py."""
+    tag = models.OneToOneField('taggit.Tag', on_delete=models.CASCADE, primary_key=True, related_name='stat')
+    post_count = models.PositiveIntegerField(default=0)
+    latest_post_date = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-post_count'], name='tagstat_post_count_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag}: {self.post_count}'
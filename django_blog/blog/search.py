@@ -0,0 +1,218 @@
+"""
+Pluggable full-text search for blog posts.
+
+Each backend keeps its own index of post title, content and tag names and
+answers queries with a ranked `Post` queryset:
+
+- `SQLiteFTSBackend`: an FTS5 virtual table ranked with bm25().
+- `PostgresSearchBackend`: a weighted tsvector table with a GIN index,
+  ranked with ts_rank_cd().
+- `SimpleSearchBackend`: the original icontains filter, for databases
+  without full-text support. It needs no index.
+
+The index is kept current by blog/signals.py and can be rebuilt with
+`python manage.py rebuild_search_index`. Set `BLOG_SEARCH_BACKEND` to a
+dotted path to force a backend; by default one is picked from the database
+vendor.
+"""
+import re
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Post
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def post_documents(post_ids):
+    """Yield (post_id, title, content, tags) for the given posts."""
+    posts = Post.objects.filter(pk__in=post_ids).prefetch_related('tags')
+    for post in posts:
+        tags = ' '.join(tag.name for tag in post.tags.all())
+        yield post.pk, post.title, post.content, tags
+
+
+class BaseSearchBackend:
+    batch_size = 500
+
+    def __init__(self, using='default'):
+        self.using = using
+
+    @property
+    def connection(self):
+        return connections[self.using]
+
+    def install(self):
+        """Create the index structures. Safe to call more than once."""
+
+    def uninstall(self):
+        """Drop the index structures."""
+
+    def update(self, post_ids):
+        """(Re)index the given posts."""
+
+    def remove(self, post_ids):
+        """Drop the given posts from the index."""
+
+    def search(self, query):
+        """Return matching posts annotated with `rank`, best first."""
+        raise NotImplementedError
+
+    def rebuild(self):
+        """Reindex every post in batches; returns the number indexed."""
+        self.uninstall()
+        self.install()
+        total = 0
+        ids = Post.objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for pk in ids.iterator(chunk_size=self.batch_size):
+            batch.append(pk)
+            if len(batch) == self.batch_size:
+                self.update(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self.update(batch)
+            total += len(batch)
+        return total
+
+
+class SimpleSearchBackend(BaseSearchBackend):
+    """Unindexed LIKE matching; correct everywhere but scans every post."""
+
+    def search(self, query):
+        return Post.objects.filter(
+            Q(title__icontains=query) |
+            Q(content__icontains=query) |
+            Q(tags__name__icontains=query)
+        ).distinct().annotate(rank=Value(0.0, output_field=FloatField())).order_by('-published_date')
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    table = 'blog_post_fts'
+    # bm25() column weights for title, content, tags
+    weights = (10.0, 1.0, 5.0)
+
+    def install(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+                "USING fts5(title, content, tags, tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def update(self, post_ids):
+        rows = list(post_documents(post_ids))
+        with self.connection.cursor() as cursor:
+            self._delete(cursor, post_ids)
+            cursor.executemany(f'INSERT INTO {self.table} (rowid, title, content, tags) VALUES (%s, %s, %s, %s)', rows)
+
+    def remove(self, post_ids):
+        with self.connection.cursor() as cursor:
+            self._delete(cursor, post_ids)
+
+    def _delete(self, cursor, post_ids):
+        cursor.executemany(f'DELETE FROM {self.table} WHERE rowid = %s', [(pk,) for pk in post_ids])
+
+    def match_expression(self, query):
+        # Quote every word so user input cannot inject FTS5 operators, and
+        # make the words prefix matches so partial words still hit.
+        return ' '.join(f'"{word}"*' for word in WORD_RE.findall(query))
+
+    def search(self, query):
+        match = self.match_expression(query)
+        if not match:
+            return Post.objects.none()
+        post_table = self.connection.ops.quote_name(Post._meta.db_table)
+        weights = ', '.join(str(w) for w in self.weights)
+        # FTS5 cannot look up a single rowid under MATCH: a rank subquery
+        # correlated on the FTS table would re-run the full-text query for
+        # every matching post. The hits are ranked once in a materialized
+        # CTE and each post looks its rank up there.
+        materialized = 'MATERIALIZED ' if self.connection.Database.sqlite_version_info >= (3, 35) else ''
+        rank = RawSQL(
+            f'WITH hits AS {materialized}(SELECT rowid, -bm25({self.table}, {weights}) AS rank '
+            f'FROM {self.table} WHERE {self.table} MATCH %s) '
+            f'SELECT rank FROM hits WHERE hits.rowid = {post_table}.id',
+            (match,),
+            output_field=FloatField(),
+        )
+        hits = RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', (match,))
+        return Post.objects.filter(pk__in=hits).annotate(rank=rank).order_by('-rank', '-published_date')
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    table = 'blog_post_search'
+    config = 'english'
+
+    def install(self):
+        post_table = self.connection.ops.quote_name(Post._meta.db_table)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {self.table} ('
+                f'post_id bigint PRIMARY KEY REFERENCES {post_table} (id) ON DELETE CASCADE, '
+                'document tsvector NOT NULL)'
+            )
+            cursor.execute(f'CREATE INDEX IF NOT EXISTS {self.table}_document_gin ON {self.table} USING gin (document)')
+
+    def uninstall(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {self.table}')
+
+    def update(self, post_ids):
+        rows = [(pk, self.config, title, self.config, tags, self.config, content)
+                for pk, title, content, tags in post_documents(post_ids)]
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {self.table} (post_id, document) VALUES (%s, '
+                "setweight(to_tsvector(%s::regconfig, %s), 'A') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'B') || "
+                "setweight(to_tsvector(%s::regconfig, %s), 'C')) "
+                'ON CONFLICT (post_id) DO UPDATE SET document = EXCLUDED.document',
+                rows,
+            )
+
+    def remove(self, post_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE post_id = ANY(%s)', (list(post_ids),))
+
+    def search(self, query):
+        if not WORD_RE.search(query):
+            return Post.objects.none()
+        post_table = self.connection.ops.quote_name(Post._meta.db_table)
+        tsquery = 'websearch_to_tsquery(%s::regconfig, %s)'
+        rank = RawSQL(
+            f'SELECT ts_rank_cd(document, {tsquery}) FROM {self.table} WHERE post_id = {post_table}.id',
+            (self.config, query),
+            output_field=FloatField(),
+        )
+        hits = RawSQL(f'SELECT post_id FROM {self.table} WHERE document @@ {tsquery}', (self.config, query))
+        return Post.objects.filter(pk__in=hits).annotate(rank=rank).order_by('-rank', '-published_date')
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backends = {}
+
+
+def backend_class(connection):
+    path = getattr(settings, 'BLOG_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)
+    return VENDOR_BACKENDS.get(connection.vendor, SimpleSearchBackend)
+
+
+def get_backend(using='default'):
+    if using not in _backends:
+        _backends[using] = backend_class(connections[using])(using)
+    return _backends[using]
@@ -0,0 +1,52 @@
+from django.core.signals import setting_changed
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import cache, search
+from .models import Comment, Post
+from .tagstats import refresh_tag_stats
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.get_backend().update([instance.pk])
+    cache.bump('site', cache.post_scope(instance.pk))
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleted_post_tags(sender, instance, **kwargs):
+    instance._deleted_tag_ids = list(instance.tags.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.get_backend().remove([instance.pk])
+    refresh_tag_stats(instance.__dict__.pop('_deleted_tag_ids', []))
+    cache.bump('site', cache.post_scope(instance.pk))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def reindex_post_tags(sender, instance, action, pk_set, **kwargs):
+    # taggit sends the post as `instance` and tag ids as `pk_set` when tags
+    # are added or removed; clear() sends no ids, so collect them up front.
+    if not isinstance(instance, Post):
+        return
+    if action == 'pre_clear':
+        instance._cleared_tag_ids = list(instance.tags.values_list('id', flat=True))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        search.get_backend().update([instance.pk])
+        tag_ids = pk_set if action != 'post_clear' else instance.__dict__.pop('_cleared_tag_ids', [])
+        refresh_tag_stats(tag_ids or [])
+        cache.bump('site', cache.post_scope(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def expire_comment_fragments(sender, instance, **kwargs):
+    cache.bump('site', cache.comments_scope(instance.post_id))
+
+
+@receiver(setting_changed)
+def reset_search_backend(setting, **kwargs):
+    if setting == 'BLOG_SEARCH_BACKEND':
+        search._backends.clear()
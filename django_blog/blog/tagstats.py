@@ -0,0 +1,48 @@
+"""
+Maintenance of the materialized `TagStat` table behind the tag cloud.
+
+Counts are recomputed for just the tags touched by a change, with one
+aggregate query and one upsert, so they cannot drift the way +1/-1
+bookkeeping can when taggit's add/set/clear paths overlap.
+"""
+import math
+
+from django.db.models import Count, Max
+
+from .models import Post, TagStat
+
+
+def refresh_tag_stats(tag_ids):
+    tag_ids = set(tag_ids)
+    if not tag_ids:
+        return
+    rows = (
+        Post.objects.filter(tags__id__in=tag_ids)
+        .values('tags__id')
+        .annotate(post_count=Count('id'), latest_post_date=Max('published_date'))
+        .order_by()
+    )
+    stats = [
+        TagStat(tag_id=row['tags__id'], post_count=row['post_count'], latest_post_date=row['latest_post_date'])
+        for row in rows
+    ]
+    TagStat.objects.bulk_create(
+        stats,
+        update_conflicts=True,
+        unique_fields=['tag'],
+        update_fields=['post_count', 'latest_post_date'],
+    )
+    TagStat.objects.filter(tag_id__in=tag_ids - {stat.tag_id for stat in stats}).delete()
+
+
+def cloud_weights(stats, steps=5):
+    """Attach a 1..`steps` `weight` to each stat on a log scale of post_count."""
+    stats = list(stats)
+    if not stats:
+        return stats
+    low = math.log(min(stat.post_count for stat in stats))
+    high = math.log(max(stat.post_count for stat in stats))
+    spread = (high - low) or 1
+    for stat in stats:
+        stat.weight = 1 + round((math.log(stat.post_count) - low) / spread * (steps - 1))
+    return stats
@@ -1,9 +1,17 @@
-from django.test import TestCase
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from .models import Post
+from .models import Comment, Post, TagStat
+from .search import get_backend
 
 class TagSearchTests(TestCase):
     def setUp(self):
+        cache.clear()
         u = User.objects.create_user('bob', password='pw')
         p1 = Post.objects.create(title='Django tips', content='content', author=u)
         p1.tags.add('django', 'tips')
@@ -22,3 +30,138 @@ class TagSearchTests(TestCase):
         resp = self.client.get('/tags/django/')
         self.assertContains(resp, 'Django tips')
         self.assertNotContains(resp, 'Flask stuff')
+
+    def test_search_ranks_title_matches_first(self):
+        u = User.objects.get(username='bob')
+        Post.objects.create(title='Unrelated', content='a django mention', author=u)
+        resp = self.client.get('/search/?q=django')
+        titles = [p.title for p in resp.context['posts']]
+        self.assertEqual(titles, ['Django tips', 'Unrelated'])
+
+    def test_search_ignores_query_syntax(self):
+        resp = self.client.get('/search/?q=django"(*')
+        self.assertContains(resp, 'Django tips')
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.get(title='Flask stuff')
+        post.title = 'Bottle stuff'
+        post.save()
+        self.assertContains(self.client.get('/search/?q=bottle'), 'Bottle stuff')
+        post.tags.add('microframework')
+        self.assertContains(self.client.get('/search/?q=microframework'), 'Bottle stuff')
+        post.delete()
+        self.assertNotContains(self.client.get('/search/?q=bottle'), 'Bottle stuff')
+
+
+class SearchBackendTests(TestCase):
+    def test_rebuild_command_reindexes_everything(self):
+        u = User.objects.create_user('amy', password='pw')
+        Post.objects.create(title='Rebuilt', content='content', author=u)
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+        self.assertIn('Indexed 1 posts', out.getvalue())
+        self.assertEqual([p.title for p in get_backend().search('rebuilt')], ['Rebuilt'])
+
+    @override_settings(BLOG_SEARCH_BACKEND='blog.search.SimpleSearchBackend')
+    def test_simple_backend_fallback(self):
+        u = User.objects.create_user('amy', password='pw')
+        Post.objects.create(title='Substring', content='content', author=u)
+        self.assertEqual([p.title for p in get_backend().search('bstr')], ['Substring'])
+
+
+class TagStatTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('tess', password='pw')
+        self.p1 = Post.objects.create(title='One', content='c', author=self.user)
+        self.p2 = Post.objects.create(title='Two', content='c', author=self.user)
+        self.p1.tags.add('python', 'web')
+        self.p2.tags.add('python')
+
+    def stats(self):
+        return {s.tag.name: s.post_count for s in TagStat.objects.select_related('tag')}
+
+    def test_counts_follow_tag_changes(self):
+        self.assertEqual(self.stats(), {'python': 2, 'web': 1})
+        self.p1.tags.remove('web')
+        self.p2.tags.clear()
+        self.assertEqual(self.stats(), {'python': 1})
+        self.p1.delete()
+        self.assertEqual(self.stats(), {})
+
+    def test_latest_post_date(self):
+        stat = TagStat.objects.get(tag__name='python')
+        self.assertEqual(stat.latest_post_date, self.p2.published_date)
+
+    def test_tag_cloud_page(self):
+        resp = self.client.get('/tags/')
+        self.assertContains(resp, 'tag-weight-5')
+        self.assertContains(resp, '/tags/web/')
+
+    def test_list_pages_prefetch_tags(self):
+        for i in range(5):
+            Post.objects.create(title=f'extra {i}', content='c', author=self.user).tags.add('python', f't{i}')
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/tags/python/')
+        Post.objects.create(title='more', content='c', author=self.user).tags.add('python', 'another')
+        with self.assertNumQueries(len(few)):
+            resp = self.client.get('/tags/python/')
+        self.assertContains(resp, 'another')
+        with self.assertNumQueries(len(few) - 1):  # no Tag lookup by slug
+            self.client.get('/')
+
+
+class CachingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('cara', password='pw')
+        self.post = Post.objects.create(title='Cached', content='first line\n\nsecond', author=self.user)
+
+    def test_anonymous_pages_served_from_cache(self):
+        first = self.client.get(f'/post/{self.post.pk}/')
+        self.assertIn('Cookie', first['Vary'])
+        with self.assertNumQueries(0):
+            again = self.client.get(f'/post/{self.post.pk}/')
+        self.assertEqual(first.content, again.content)
+        self.client.get('/')
+        with self.assertNumQueries(0):
+            self.client.get('/')
+
+    def test_comment_invalidates_page_and_fragment(self):
+        self.client.get(f'/post/{self.post.pk}/')
+        Comment.objects.create(post=self.post, author=self.user, content='fresh comment')
+        self.assertContains(self.client.get(f'/post/{self.post.pk}/'), 'fresh comment')
+
+    def test_post_edit_invalidates_body_fragment(self):
+        self.client.get(f'/post/{self.post.pk}/')
+        self.post.content = 'rewritten'
+        self.post.save()
+        resp = self.client.get(f'/post/{self.post.pk}/')
+        self.assertContains(resp, 'rewritten')
+        self.assertNotContains(resp, 'first line')
+
+    def test_logged_in_users_reuse_fragments_not_pages(self):
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as cold:
+            self.client.get(f'/post/{self.post.pk}/')
+        with CaptureQueriesContext(connection) as warm:
+            resp = self.client.get(f'/post/{self.post.pk}/')
+        self.assertLess(len(warm), len(cold))
+        self.assertContains(resp, 'Add a Comment')
+
+    def test_comment_fragment_shared_between_users(self):
+        mine = Comment.objects.create(post=self.post, author=self.user, content='mine')
+        edit_link = f'/comment/{mine.pk}/update/'
+        self.client.force_login(User.objects.create_user('dan', password='pw'))
+        self.client.get(f'/post/{self.post.pk}/')
+        self.client.force_login(User.objects.create_user('eve', password='pw'))
+        with CaptureQueriesContext(connection) as queries:
+            resp = self.client.get(f'/post/{self.post.pk}/')
+        # only the check for eve's own comments; the list comes from the fragment
+        self.assertEqual(sum('blog_comment' in q['sql'] for q in queries), 1)
+        self.assertContains(resp, 'mine')
+        self.assertNotContains(resp, edit_link)
+        self.client.logout()
+        self.assertNotContains(self.client.get(f'/post/{self.post.pk}/'), edit_link)
+        self.client.force_login(self.user)
+        self.assertContains(self.client.get(f'/post/{self.post.pk}/'), edit_link)
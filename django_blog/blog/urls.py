@@ -2,7 +2,6 @@ from django.urls import path
 from . import views
 from .views import (
     SearchResultsView,
-    PostsByTagView,
     CommentCreateView,
     CommentUpdateView,
     CommentDeleteView,
@@ -40,6 +39,9 @@ urlpatterns = [
     # SEARCH: Display search results
     path('search/', SearchResultsView.as_view(), name='search'),
 
+    # TAGS: Tag cloud of all tags in use
+    path('tags/', views.TagCloudView.as_view(), name='tag-cloud'),
+
     # TAGS: Display posts filtered by a tag
     path('tags/<slug:tag_slug>/', views.PostByTagListView.as_view(), name='posts-by-tag'),
 
@@ -5,6 +5,7 @@ from django.contrib.auth.forms import AuthenticationForm
 from django.contrib import messages
 from django.urls import reverse_lazy, reverse  # reverse is needed for comment redirects
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.utils.decorators import method_decorator
 from django.views.generic import (
     ListView,
     DetailView,
@@ -13,11 +14,15 @@ from django.views.generic import (
     DeleteView,
     View  # Needed for CommentCreateView POST handling
 )
-from django.db.models import Q  # ✅ Added for search queries
 
 # Import all required items from models and forms
-from .models import Post, Comment
+from taggit.models import Tag
+
+from .cache import cache_anonymous_page, fragment_versions
+from .models import Post, Comment, TagStat
 from .forms import CustomUserCreationForm, PostForm, CommentForm
+from .search import get_backend
+from .tagstats import cloud_weights
 
 
 # -------------------------------------
@@ -75,22 +80,43 @@ def profile_view(request):
 # BLOG POST CRUD VIEWS (Class-Based)
 # -------------------------------------
 
+@method_decorator(cache_anonymous_page, name='dispatch')
 class PostListView(ListView):
     model = Post
     template_name = 'blog/index.html'
     context_object_name = 'posts'
+    paginate_by = 10
     ordering = ['-published_date']
 
+    def get_queryset(self):
+        # all tags for the whole page arrive in one prefetch query
+        return super().get_queryset().select_related('author').prefetch_related('tags')
+
 
+@method_decorator(cache_anonymous_page, name='dispatch')
 class PostDetailView(DetailView):
     model = Post
     template_name = 'blog/post_detail.html'
     context_object_name = 'post'
 
+    def get_queryset(self):
+        return Post.objects.select_related('author')
+
     def get_context_data(self, **kwargs):
-        """Includes the comment form in the detail view context."""
+        """Includes the comment form and fragment cache versions in the context.
+
+        Tags and comments are left as lazy querysets so they only run when
+        their cached fragment has to be re-rendered. Viewers who wrote a
+        comment on the post get their own comments fragment, holding the
+        edit links for their comments; everyone else shares one without any.
+        """
         context = super().get_context_data(**kwargs)
         context['comment_form'] = CommentForm()
+        context['comments'] = self.object.comments.select_related('author').order_by('created_at')
+        user = self.request.user
+        owns_comments = user.is_authenticated and self.object.comments.filter(author=user).exists()
+        context['comment_owner'] = user.pk if owns_comments else None
+        context.update(fragment_versions(self.object.pk))
         return context
 
 
@@ -182,22 +208,17 @@ class CommentDeleteView(LoginRequiredMixin, UserPassesTestMixin, DeleteView):
 # -------------------------------------
 
 class SearchResultsView(ListView):
-    """Displays search results filtered by query across title, content, and tags."""
+    """Displays ranked full-text search results across title, content, and tags."""
     model = Post
     template_name = 'blog/search_results.html'
     context_object_name = 'posts'
     paginate_by = 10
-    ordering = ['-published_date']
 
     def get_queryset(self):
         q = self.request.GET.get('q', '').strip()
         if not q:
             return Post.objects.none()
-        return Post.objects.filter(
-            Q(title__icontains=q) |
-            Q(content__icontains=q) |
-            Q(tags__name__icontains=q)
-        ).distinct()
+        return get_backend().search(q).select_related('author').prefetch_related('tags')
 
 
 class PostByTagListView(ListView):
@@ -209,10 +230,33 @@ class PostByTagListView(ListView):
     ordering = ['-published_date']
 
     def get_queryset(self):
-        tag_slug = self.kwargs.get('tag_slug')
-        return Post.objects.filter(tags__slug=tag_slug).distinct()
+        self.tag = get_object_or_404(Tag, slug=self.kwargs.get('tag_slug'))
+        # a post carries a tag at most once, so no DISTINCT is needed
+        return (
+            Post.objects.filter(tags=self.tag)
+            .select_related('author')
+            .prefetch_related('tags')
+            .order_by('-published_date')
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['tag_slug'] = self.tag.slug
+        context['tag_name'] = self.tag.name
+        return context
+
+
+@method_decorator(cache_anonymous_page, name='dispatch')
+class TagCloudView(ListView):
+    """Displays every tag in use, sized by how many posts carry it."""
+    model = TagStat
+    template_name = 'blog/tag_cloud.html'
+    context_object_name = 'tags'
+
+    def get_queryset(self):
+        return TagStat.objects.filter(post_count__gt=0).select_related('tag').order_by('tag__name')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['tag_slug'] = self.kwargs.get('tag_slug')
+        context['tags'] = cloud_weights(context['tags'])
         return context
@@ -5,10 +5,17 @@ Generated by 'django-admin startproject' using Django 5.0.6.
 """
 
 from pathlib import Path
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps shared by every project in this repository (perfmon) live in shared/
+# at the repository root.
+SHARED_APPS_DIR = BASE_DIR.parent / 'shared'
+if str(SHARED_APPS_DIR) not in sys.path:
+    sys.path.append(str(SHARED_APPS_DIR))
+
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = 'django-insecure-t#$!n_c^&k=j9(a&560^x)w$98w&!+yq8y-v4(43s7z39+z0'
@@ -30,11 +37,16 @@ INSTALLED_APPS = [
     'django.contrib.messages',
     'django.contrib.staticfiles',
 
+    # Third-party apps
+    'taggit',
+
     # Custom applications
     'blog.apps.BlogConfig', # Ensure this matches the AppConfig name in blog/apps.py
+    'perfmon',
 ]
 
 MIDDLEWARE = [
+    'perfmon.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -130,3 +142,35 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 LOGIN_REDIRECT_URL = 'post_list' # Redirect to the blog homepage after login
 LOGOUT_REDIRECT_URL = 'post_list' # Redirect to the blog homepage after logout
 LOGIN_URL = 'login' # Name of the URL pattern for the login page
+
+
+# Full-text search
+# Dotted path to a blog.search backend; None picks one for the database
+# (SQLite FTS5 or PostgreSQL tsvector/GIN). Rebuild with
+# `python manage.py rebuild_search_index`.
+BLOG_SEARCH_BACKEND = None
+
+
+# Caching
+# Local-memory cache for development; point this at Redis or Memcached in
+# production so all workers share pages, fragments and version counters.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'django-blog',
+    }
+}
+# Seconds anonymous full pages and rendered post/comment fragments are kept.
+# Both are invalidated early through versioned keys (see blog/cache.py).
+BLOG_PAGE_CACHE_TIMEOUT = 300
+BLOG_FRAGMENT_CACHE_TIMEOUT = 3600
+
+
+# Request instrumentation (perfmon app)
+# Requests over these budgets are logged to the 'perfmon' logger; per-URL
+# histograms are served at /__perf__/ (staff only when DEBUG is off).
+PERFMON = {
+    'QUERY_BUDGET': 50,
+    'LATENCY_BUDGET_MS': 500,
+    'SERVER_TIMING': True,
+}
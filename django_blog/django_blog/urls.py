@@ -3,5 +3,6 @@ from django.urls import path, include
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('__perf__/', include('perfmon.urls')),
     path('', include('blog.urls')),
 ]
@@ -0,0 +1,88 @@
+"""
+Avatar and profile picture derivatives.
+
+Uploads are stored exactly as sent. That can be a multi-megabyte camera
+JPEG with EXIF, GPS position included. `render` runs on the task queue
+once the upload has committed (see each project's tasks module) and
+writes:
+
+- a replacement for the original, no more than ORIGINAL_MAX pixels on its
+  long side, in the upload's format when that is a web format;
+- a square crop per size in SIZES, in both WebP and JPEG.
+
+Every file is re-encoded from pixels, so no metadata survives. EXIF
+orientation is applied before it is dropped.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+SIZES = (64, 256)
+DEFAULT_SIZE = 256
+ORIGINAL_MAX = 1024
+QUALITY = 85
+# (extension, Pillow format) of each variant
+VARIANT_FORMATS = (('webp', 'WEBP'), ('jpg', 'JPEG'))
+# formats an original may keep; anything else is re-encoded as JPEG
+WEB_FORMATS = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp', 'GIF': 'gif'}
+
+
+def _open(field_file):
+    with field_file.open('rb') as fh:
+        image = Image.open(fh)
+        source_format = image.format
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image, source_format
+
+
+def _encode(image, image_format):
+    if image_format == 'JPEG':
+        if image.mode in ('RGBA', 'LA', 'P'):
+            # JPEG has no alpha: flatten onto white rather than black
+            rgba = image.convert('RGBA')
+            image = Image.new('RGB', rgba.size, 'white')
+            image.paste(rgba, mask=rgba.getchannel('A'))
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+    elif image_format == 'WEBP' and image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def render(field_file):
+    """Write `field_file`'s derivatives next to it; returns (new original path, variants)."""
+    storage = field_file.storage
+    image, source_format = _open(field_file)
+    stem = os.path.splitext(field_file.name)[0]
+
+    original_format = source_format if source_format in WEB_FORMATS else 'JPEG'
+    original = image.copy()
+    original.thumbnail((ORIGINAL_MAX, ORIGINAL_MAX), Image.LANCZOS)
+    original_path = storage.save(f'{stem}_full.{WEB_FORMATS[original_format]}', _encode(original, original_format))
+
+    variants = {}
+    for size in SIZES:
+        thumbnail = ImageOps.fit(image, (size, size), Image.LANCZOS)
+        variants[str(size)] = {
+            extension: storage.save(f'{stem}_{size}.{extension}', _encode(thumbnail, image_format))
+            for extension, image_format in VARIANT_FORMATS
+        }
+    return original_path, variants
+
+
+def variant_paths(variants):
+    return [path for by_format in variants.values() for path in by_format.values()]
+
+
+def pick(variants, size, extension='webp'):
+    """Path of the smallest variant at least `size` pixels wide (else the largest), or None."""
+    if not variants:
+        return None
+    sizes = sorted(int(s) for s in variants)
+    chosen = next((s for s in sizes if s >= size), sizes[-1])
+    return variants[str(chosen)].get(extension)
@@ -0,0 +1,10 @@
+from django.contrib import admin
+
+from .models import Blob
+
+
+@admin.register(Blob)
+class BlobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'size', 'refs', 'created_at', 'updated_at')
+    search_fields = ('name',)
+    readonly_fields = ('name', 'size', 'refs', 'created_at', 'updated_at')
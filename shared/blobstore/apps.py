@@ -0,0 +1,17 @@
+from django.apps import AppConfig, apps
+from django.db.models.signals import post_delete
+
+
+class BlobstoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'blobstore'
+
+    def ready(self):
+        from .references import blob_fields
+        from .signals import release_deleted_files
+
+        # per model rather than for every sender: a global post_delete
+        # receiver would stop Django fast-deleting unrelated rows
+        for model in apps.get_models():
+            if blob_fields(model):
+                post_delete.connect(release_deleted_files, sender=model, dispatch_uid=f'blobstore:{model._meta.label}')
@@ -0,0 +1,90 @@
+"""
+Garbage collection for ContentAddressedStorage.
+
+`sweep` removes blobs whose reference count has stayed at zero for the
+grace period. It also removes files with no `Blob` row, which come from
+rolled-back saves, and spool files from interrupted uploads.
+
+Counts can drift up, because Django does not delete a file when a
+FileField gets a new one. `recount` repairs that by counting the names
+models actually hold (see blobstore/references.py). It only touches
+blobs idle for the grace period, so no save still in flight is missed.
+
+A blob is removed by moving its file aside and then deleting its row,
+but only while the count is still zero. If a save has just referenced
+the content again, the file is moved back.
+"""
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import Blob
+from .references import stored_names
+from .storage import get_setting
+
+BATCH_SIZE = 1000
+
+
+def recount(before):
+    """Set idle blobs' counts to the number of holders; returns how many changed."""
+    counts = Counter(stored_names())
+    changed = 0
+    for blob in Blob.objects.filter(updated_at__lt=before).only('pk', 'name', 'refs').iterator(chunk_size=BATCH_SIZE):
+        refs = counts.get(blob.name, 0)
+        if blob.refs != refs:
+            changed += Blob.objects.filter(pk=blob.pk, updated_at__lt=before).update(refs=refs)
+    return changed
+
+
+def _collect(storage, blob):
+    path = storage.path(blob.name)
+    aside = os.path.join(storage.path(os.path.join(get_setting('DIRECTORY'), 'tmp')), f'{blob.pk}.gc')
+    os.makedirs(os.path.dirname(aside), exist_ok=True)
+    try:
+        os.replace(path, aside)
+    except FileNotFoundError:
+        aside = None
+    if Blob.objects.filter(pk=blob.pk, refs=0).delete()[0]:
+        if aside:
+            os.unlink(aside)
+        return True
+    if aside:
+        os.replace(aside, path)
+    return False
+
+
+def _orphans(storage, before):
+    """Files under the blob directory older than `before` (a timestamp) with no row."""
+    root = storage.path(get_setting('DIRECTORY'))
+    for dirpath, dirnames, filenames in os.walk(root):
+        stale = [f for f in filenames if os.path.getmtime(os.path.join(dirpath, f)) < before]
+        if not stale:
+            continue
+        if os.path.relpath(dirpath, root) == 'tmp':
+            yield from (os.path.join(dirpath, f) for f in stale)
+            continue
+        prefix = os.path.relpath(dirpath, storage.location).replace(os.sep, '/') + '/'
+        known = set(Blob.objects.filter(name__in=[prefix + f for f in stale]).values_list('name', flat=True))
+        yield from (os.path.join(dirpath, f) for f in stale if prefix + f not in known)
+
+
+def sweep(storage, before):
+    """Remove garbage older than `before` (a datetime); returns (files removed, bytes freed)."""
+    removed = freed = 0
+    for blob in Blob.objects.garbage(before).iterator(chunk_size=BATCH_SIZE):
+        if _collect(storage, blob):
+            removed += 1
+            freed += blob.size
+    for path in _orphans(storage, before.timestamp()):
+        size = os.path.getsize(path)
+        os.unlink(path)
+        removed += 1
+        freed += size
+    return removed, freed
+
+
+def grace_cutoff(hours=None):
+    hours = get_setting('GC_GRACE_HOURS') if hours is None else hours
+    return timezone.now() - timedelta(hours=hours)
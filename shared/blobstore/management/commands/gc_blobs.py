@@ -0,0 +1,25 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+
+from blobstore import gc
+from blobstore.storage import ContentAddressedStorage
+
+
+class Command(BaseCommand):
+    help = 'Delete stored files that nothing has referenced for the grace period.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--grace-hours', type=float, help='Default BLOBSTORE["GC_GRACE_HOURS"].')
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='First recount references from the models, to reclaim files of replaced uploads.',
+        )
+
+    def handle(self, *args, grace_hours, recount, **options):
+        if not isinstance(default_storage, ContentAddressedStorage):
+            raise CommandError('The default storage is not blobstore.storage.ContentAddressedStorage.')
+        before = gc.grace_cutoff(grace_hours)
+        if recount:
+            self.stdout.write(f'Recounted {gc.recount(before)} blobs.')
+        removed, freed = gc.sweep(default_storage, before)
+        self.stdout.write(f'Removed {removed} files, {freed / 2**20:.1f} MiB freed.')
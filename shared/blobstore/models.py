@@ -0,0 +1,42 @@
+from django.db import models
+from django.db.models import F
+from django.db.models.functions import Now
+
+
+class BlobQuerySet(models.QuerySet):
+    def reference(self, name, size):
+        """Count one more reference to `name`, creating its row on first use."""
+        if not self.filter(name=name).update(refs=F('refs') + 1, updated_at=Now()):
+            blob, created = self.get_or_create(name=name, defaults={'size': size, 'refs': 1})
+            if not created:
+                self.filter(pk=blob.pk).update(refs=F('refs') + 1, updated_at=Now())
+
+    def release(self, name):
+        return self.filter(name=name, refs__gt=0).update(refs=F('refs') - 1, updated_at=Now())
+
+    def garbage(self, before):
+        """Unreferenced blobs untouched since `before`."""
+        return self.filter(refs=0, updated_at__lt=before)
+
+
+class Blob(models.Model):
+    """
+    One stored file of ContentAddressedStorage (see blobstore/storage.py).
+    `refs` counts the saves of this content minus the deletes. `gc_blobs`
+    removes blobs whose count has stayed at zero for a while.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    size = models.PositiveBigIntegerField()
+    refs = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = BlobQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['refs', 'updated_at'], name='blob_refs_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.refs} refs)'
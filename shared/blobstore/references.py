@@ -0,0 +1,35 @@
+"""
+Where stored names live, for `gc_blobs --recount`.
+
+Values of FileFields backed by ContentAddressedStorage are found
+automatically. Apps that keep names elsewhere, in a JSONField for
+instance, register a function that yields them.
+"""
+from django.apps import apps
+from django.db import models
+
+from .storage import ContentAddressedStorage
+
+_providers = []
+
+
+def register(provider):
+    _providers.append(provider)
+    return provider
+
+
+def blob_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, models.FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def stored_names():
+    """Every name currently held by a model, once per holder."""
+    for model in apps.get_models():
+        for field in blob_fields(model):
+            names = model._base_manager.exclude(**{f'{field.attname}__isnull': True}).exclude(**{field.attname: ''})
+            yield from names.values_list(field.attname, flat=True).iterator()
+    for provider in _providers:
+        yield from provider()
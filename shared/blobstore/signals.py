@@ -0,0 +1,9 @@
+from .references import blob_fields
+
+
+def release_deleted_files(sender, instance, **kwargs):
+    """A deleted row no longer references its files."""
+    for field in blob_fields(sender):
+        file = getattr(instance, field.attname)
+        if file:
+            file.storage.delete(file.name)
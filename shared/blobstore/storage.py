@@ -0,0 +1,93 @@
+"""
+Content-addressed file storage.
+
+`ContentAddressedStorage` is a FileSystemStorage that names each file
+after the SHA-256 of its bytes:
+`<BLOBSTORE['DIRECTORY']>/ab/cd/abcd….jpg`. It ignores the requested name
+and keeps only its extension. Saving content that is already stored
+writes nothing new and adds a reference to the existing `Blob`.
+
+Uploads are streamed chunk by chunk into a temporary file in the blob
+directory and hashed on the way, so memory use does not grow with file
+size. Once hashed, the temporary file is moved into place atomically.
+
+`delete()` only drops a reference; `gc_blobs` removes the files later
+(see blobstore/gc.py). Files saved under other names, from before this
+storage was configured, are still read and deleted as usual.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+
+from .models import Blob
+
+DEFAULTS = {
+    'DIRECTORY': 'blobs',
+    'GC_GRACE_HOURS': 24,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'BLOBSTORE', {}).get(name, DEFAULTS[name])
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def blob_name(self, digest, extension):
+        return '/'.join([get_setting('DIRECTORY'), digest[:2], digest[2:4], digest + extension])
+
+    def is_blob(self, name):
+        return name.startswith(get_setting('DIRECTORY') + '/')
+
+    def get_available_name(self, name, max_length=None):
+        # the final name comes from the content; there is nothing to probe for
+        return name
+
+    def _spool(self, content):
+        """Copy `content` to a temporary file, hashing as it goes; returns (path, digest, size)."""
+        spool_dir = self.path(os.path.join(get_setting('DIRECTORY'), 'tmp'))
+        os.makedirs(spool_dir, exist_ok=True)
+        sha256 = hashlib.sha256()
+        size = 0
+        with tempfile.NamedTemporaryFile(dir=spool_dir, delete=False) as spool:
+            try:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode()
+                    sha256.update(chunk)
+                    spool.write(chunk)
+                    size += len(chunk)
+            except BaseException:
+                os.unlink(spool.name)
+                raise
+        return spool.name, sha256.hexdigest(), size
+
+    def _save(self, name, content):
+        spool, digest, size = self._spool(content)
+        blob = self.blob_name(digest, os.path.splitext(name)[1].lower())
+        path = self.path(blob)
+        try:
+            # count the reference before looking for the file, so gc_blobs
+            # never removes a file a save has just decided to reuse
+            Blob.objects.reference(blob, size)
+            if os.path.exists(path):
+                os.unlink(spool)
+            else:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.chmod(spool, self.file_permissions_mode or 0o644)
+                os.replace(spool, path)
+        except BaseException:
+            if os.path.exists(spool):
+                os.unlink(spool)
+            raise
+        return blob
+
+    def delete(self, name):
+        if not name:
+            raise ValueError('The name must be given to delete().')
+        if self.is_blob(name):
+            Blob.objects.release(name)
+        else:
+            super().delete(name)
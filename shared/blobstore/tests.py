@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import gc, references
+from .models import Blob
+
+User = get_user_model()
+# the project's user model holds its picture in a blob-backed FileField
+PICTURE = references.blob_fields(User)[0].name
+
+
+class ContentAddressedStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def age(self, *names, hours=48):
+        Blob.objects.filter(name__in=names).update(updated_at=timezone.now() - timedelta(hours=hours))
+
+    def test_identical_content_is_stored_once(self):
+        first = default_storage.save('pictures/a.JPG', ContentFile(b'same bytes'))
+        second = default_storage.save('avatars/b.jpg', ContentFile(b'same bytes'))
+        other = default_storage.save('avatars/c.jpg', ContentFile(b'other bytes'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        self.assertTrue(first.startswith('blobs/') and first.endswith('.jpg'))
+        self.assertEqual(Blob.objects.get(name=first).refs, 2)
+        with default_storage.open(first) as fh:
+            self.assertEqual(fh.read(), b'same bytes')
+        self.assertEqual(os.listdir(default_storage.path('blobs/tmp')), [])
+
+    def test_delete_releases_and_gc_removes_after_grace(self):
+        name = default_storage.save('a.png', ContentFile(b'x' * 1000))
+        default_storage.save('b.png', ContentFile(b'x' * 1000))
+        default_storage.delete(name)
+        self.assertEqual(gc.sweep(default_storage, gc.grace_cutoff()), (0, 0))
+
+        default_storage.delete(name)
+        self.assertEqual(gc.sweep(default_storage, gc.grace_cutoff()), (0, 0))
+        self.age(name)
+        self.assertEqual(gc.sweep(default_storage, gc.grace_cutoff()), (1, 1000))
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(Blob.objects.exists())
+
+    def upload(self, user, name, content):
+        picture = getattr(user, PICTURE)
+        picture.save(name, ContentFile(content))
+        return picture.name
+
+    def test_deleting_a_row_releases_its_files(self):
+        user = User.objects.create_user(username='alice', email='alice@example.com', password='p')
+        name = self.upload(user, 'me.jpg', b'not really a jpeg')
+        user.delete()
+        self.assertEqual(Blob.objects.get(name=name).refs, 0)
+
+    def test_recount_reclaims_replaced_uploads(self):
+        user = User.objects.create_user(username='alice', email='alice@example.com', password='p')
+        replaced = self.upload(user, 'one.jpg', b'one')
+        current = self.upload(user, 'two.jpg', b'two')
+        self.age(replaced, current)
+
+        self.assertEqual(gc.recount(gc.grace_cutoff()), 1)
+        self.assertEqual(gc.sweep(default_storage, gc.grace_cutoff()), (1, 3))
+        self.assertTrue(default_storage.exists(current))
+
+    def test_files_without_rows_are_swept(self):
+        name = default_storage.save('a.txt', ContentFile(b'abc'))
+        Blob.objects.all().delete()  # as if the saving transaction rolled back
+        old = (timezone.now() - timedelta(hours=48)).timestamp()
+        os.utime(default_storage.path(name), (old, old))
+        self.assertEqual(gc.sweep(default_storage, gc.grace_cutoff()), (1, 3))
@@ -0,0 +1,14 @@
+from django.apps import AppConfig
+
+
+class PerfmonConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'perfmon'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from .db import install_query_timer
+        from .instrument import install
+        install()
+        connection_created.connect(install_query_timer, dispatch_uid='perfmon.query_timer')
@@ -0,0 +1,193 @@
+"""
+Benchmark harness.
+
+Apps describe their workload in a ``benchmarks.py`` module, discovered the
+same way as ``admin.py``:
+
+- ``@seeder`` functions fill the database. They are called in
+  INSTALLED_APPS order with a `Suite`, whose `scale` multiplies every
+  dataset size and whose `rng` is seeded so runs are repeatable. Seeders
+  store whatever later code needs (ids, users) in `suite.data`.
+- ``@benchmark(name)`` functions issue one request with the test client
+  and return the response. With ``user='key'`` the client is logged in as
+  ``suite.data['key']`` first.
+
+`run` times every benchmark and reports query count, p50/p99 latency and
+peak Python memory. `compare` checks a run against a stored baseline and
+lists the regressions. The `bench` management command ties it together.
+"""
+import math
+import platform
+import random
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+from django.db import connection
+from django.test import Client
+from django.utils.module_loading import autodiscover_modules
+
+_seeders = []
+_benchmarks = {}
+
+# Latencies below this many ms of difference are treated as noise.
+LATENCY_SLACK_MS = 2.0
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Suite:
+    def __init__(self, scale=1, seed=0):
+        self.scale = scale
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.data = {}
+
+    def size(self, base):
+        """`base` rows scaled, never less than one."""
+        return max(1, int(base * self.scale))
+
+
+def seeder(func):
+    _seeders.append(func)
+    return func
+
+
+def benchmark(name, user=None):
+    def register(func):
+        func.bench_user = user
+        _benchmarks[name] = func
+        return func
+    return register
+
+
+@contextmanager
+def explicit_timestamps(model, *field_names):
+    """Let bulk_create keep the given auto_now/auto_now_add values, so seeded
+    rows can be spread over time instead of all sharing one timestamp."""
+    fields = [model._meta.get_field(name) for name in field_names]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+def autodiscover():
+    autodiscover_modules('benchmarks')
+
+
+def benchmarks():
+    return dict(_benchmarks)
+
+
+def seed(suite):
+    for func in _seeders:
+        func(suite)
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of `samples`."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class QueryCounter:
+    """`execute_wrapper` hook counting queries. Unlike CaptureQueriesContext
+    it keeps no query log, so there is no cap and no logging overhead."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def measure(func, client, suite, repeat=20, warmup=2):
+    for _ in range(warmup):
+        func(client, suite)
+
+    timings, queries = [], []
+    for _ in range(repeat):
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            response = func(client, suite)
+            timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            raise BenchmarkError(f'{func.__name__} returned {response.status_code}')
+        queries.append(counter.count)
+
+    # tracemalloc slows everything down, so memory gets a pass of its own
+    tracemalloc.start()
+    try:
+        func(client, suite)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'queries': max(queries),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+def run(suite, names=None, repeat=20, warmup=2):
+    results = {}
+    for name, func in sorted(_benchmarks.items()):
+        if names and name not in names:
+            continue
+        client = Client()
+        if func.bench_user:
+            client.force_login(suite.data[func.bench_user])
+        results[name] = measure(func, client, suite, repeat, warmup)
+    return {
+        'meta': {
+            'scale': suite.scale,
+            'seed': suite.seed,
+            'vendor': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, report, tolerance=0.25):
+    """
+    Return a list of regressions of `report` against `baseline`. Query
+    counts may not grow at all; latency and memory may grow by
+    `tolerance` (a fraction) before they count.
+    """
+    regressions = []
+    for name, current in report['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            continue
+        if current['queries'] > before['queries']:
+            regressions.append(f"{name}: queries {before['queries']} -> {current['queries']}")
+        for metric in ('p50_ms', 'p99_ms'):
+            limit = max(before[metric] * (1 + tolerance), before[metric] + LATENCY_SLACK_MS)
+            if current[metric] > limit:
+                regressions.append(f'{name}: {metric} {before[metric]} -> {current[metric]}')
+        if current['peak_kb'] > before['peak_kb'] * (1 + tolerance):
+            regressions.append(f"{name}: peak_kb {before['peak_kb']} -> {current['peak_kb']}")
+    return regressions
+
+
+def mismatched_meta(baseline, report):
+    """Baseline settings that differ from this run, which makes timings incomparable."""
+    return [
+        key for key in ('scale', 'seed', 'vendor')
+        if baseline.get('meta', {}).get(key) != report['meta'][key]
+    ]
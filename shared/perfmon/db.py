@@ -0,0 +1,32 @@
+"""
+SQL timing.
+
+`query_timer` is installed on every database connection when it connects
+(see PerfmonConfig.ready), not around each request. Connections are per
+thread, and async views run their ORM calls on asgiref's sync thread, not
+on the event loop thread the middleware runs on. The timer finds the
+request through the `current` context variable, which sync_to_async
+carries over to that thread.
+"""
+import time
+
+from .stats import current
+
+
+def query_timer(execute, sql, params, many, context):
+    """`connection.execute_wrapper` hook adding each query to the current request."""
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_count += 1
+        metrics.sql_ms += (time.perf_counter() - start) * 1000
+
+
+def install_query_timer(connection, **kwargs):
+    """`connection_created` receiver; a reconnecting wrapper keeps its one timer."""
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
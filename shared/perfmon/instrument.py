@@ -0,0 +1,44 @@
+"""
+Timing hooks for template rendering and DRF serialization.
+
+Both are installed once at startup by wrapping the top-level entry points:
+the Django template backend's `Template.render` (includes go through the
+engine's own Template, so they are not double counted) and
+`BaseSerializer.data` when Django REST framework is installed.
+"""
+import time
+from functools import wraps
+
+from .stats import current
+
+_installed = False
+
+
+def _timed(func, attr):
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        metrics = current.get()
+        if metrics is None:
+            return func(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            setattr(metrics, attr, getattr(metrics, attr) + (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def install():
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    from django.template.backends.django import Template
+    Template.render = _timed(Template.render, 'template_ms')
+
+    try:
+        from rest_framework.serializers import BaseSerializer
+    except ImportError:
+        return
+    BaseSerializer.data = property(_timed(BaseSerializer.data.fget, 'serializer_ms'))
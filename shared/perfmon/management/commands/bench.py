@@ -0,0 +1,74 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from perfmon import bench
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database, time every benchmark declared in the apps\' '
+        'benchmarks.py and compare the results with a stored baseline.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only run these benchmarks.')
+        parser.add_argument('--scale', type=float, default=1, help='Multiplier for every dataset size.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--baseline', default=str(Path(settings.BASE_DIR) / 'perf_baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline.')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative growth of latency and memory.')
+        parser.add_argument('--output', help='Also write the results to this file.')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the seeded test database.')
+
+    def handle(self, *args, names, scale, seed, repeat, warmup, baseline, save_baseline,
+               tolerance, output, keepdb, verbosity, **options):
+        bench.autodiscover()
+        unknown = set(names) - set(bench.benchmarks())
+        if unknown:
+            raise CommandError(f"Unknown benchmarks: {', '.join(sorted(unknown))}")
+
+        suite = bench.Suite(scale=scale, seed=seed)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=keepdb)
+        try:
+            self.stdout.write(f'Seeding at scale {scale}...')
+            bench.seed(suite)
+            report = bench.run(suite, names, repeat, warmup)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
+            teardown_test_environment()
+
+        for name, result in report['results'].items():
+            self.stdout.write(
+                f"{name:30} {result['queries']:4d} queries  p50 {result['p50_ms']:9.2f} ms  "
+                f"p99 {result['p99_ms']:9.2f} ms  peak {result['peak_kb']:9.1f} KiB"
+            )
+        if output:
+            Path(output).write_text(json.dumps(report, indent=2) + '\n')
+        if save_baseline:
+            Path(baseline).write_text(json.dumps(report, indent=2) + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline}'))
+            return
+
+        if not Path(baseline).exists():
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline}; run with --save-baseline.'))
+            return
+        stored = json.loads(Path(baseline).read_text())
+        mismatched = bench.mismatched_meta(stored, report)
+        if mismatched:
+            self.stdout.write(self.style.WARNING(
+                f"Baseline was recorded with different {', '.join(mismatched)}; not comparing."
+            ))
+            return
+        regressions = bench.compare(stored, report, tolerance)
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('No regressions against the baseline.'))
@@ -0,0 +1,90 @@
+import logging
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .stats import RequestMetrics, current, registry
+
+logger = logging.getLogger('perfmon')
+
+DEFAULTS = {
+    'QUERY_BUDGET': 50,
+    'LATENCY_BUDGET_MS': 500,
+    'SERVER_TIMING': True,
+}
+
+
+def get_setting(name):
+    return getattr(settings, 'PERFMON', {}).get(name, DEFAULTS[name])
+
+
+class PerfMiddleware:
+    """
+    Measure each request: wall time, SQL query count and time, template
+    render time and serializer time. Results are recorded per URL name in
+    `perfmon.stats.registry`, sent back in a `Server-Timing` header, and
+    logged as a warning when a request exceeds PERFMON['QUERY_BUDGET'] or
+    PERFMON['LATENCY_BUDGET_MS'].
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # stay async under ASGI so async views are not pushed onto a thread
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with self.measure(request) as finish:
+            response = self.get_response(request)
+        return finish(response)
+
+    async def __acall__(self, request):
+        with self.measure(request) as finish:
+            response = await self.get_response(request)
+        return finish(response)
+
+    @contextmanager
+    def measure(self, request):
+        """Collect metrics for the body of the block; yields the function
+        that records them and decorates the response."""
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        start = time.perf_counter()
+        try:
+            # queries are counted by perfmon.db.query_timer, on whichever
+            # thread runs them
+            yield lambda response: self.finish(request, response, metrics, start)
+        finally:
+            current.reset(token)
+
+    def finish(self, request, response, metrics, start):
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        name = (match.view_name if match else None) or 'unresolved'
+        over_budget = (
+            metrics.sql_count > get_setting('QUERY_BUDGET')
+            or elapsed_ms > get_setting('LATENCY_BUDGET_MS')
+        )
+        registry.record(name, elapsed_ms, metrics, over_budget)
+
+        if over_budget:
+            logger.warning(
+                'Request over budget: %s %s (%s) took %.1f ms with %d queries (%.1f ms SQL)',
+                request.method, request.path, name, elapsed_ms, metrics.sql_count, metrics.sql_ms,
+            )
+        if get_setting('SERVER_TIMING'):
+            response['Server-Timing'] = ', '.join([
+                f'sql;dur={metrics.sql_ms:.1f};desc="{metrics.sql_count} queries"',
+                f'tpl;dur={metrics.template_ms:.1f}',
+                f'ser;dur={metrics.serializer_ms:.1f}',
+                f'total;dur={elapsed_ms:.1f}',
+            ])
+        return response
@@ -0,0 +1,131 @@
+"""
+In-process request metrics.
+
+`RequestMetrics` collects SQL, template and serializer timings for the
+request being served (held in a context variable so threads and async
+tasks don't mix). When the response is done, `registry` folds them into
+fixed-bucket histograms per URL name. Components can also keep plain event
+counters there (cache hits and misses, say). The numbers are per process,
+so each worker reports its own.
+"""
+import bisect
+import contextvars
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+# upper bounds (ms, or queries) of histogram buckets; the last bucket is open
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+
+@dataclass
+class RequestMetrics:
+    sql_count: int = 0
+    sql_ms: float = 0.0
+    template_ms: float = 0.0
+    serializer_ms: float = 0.0
+
+
+current = contextvars.ContextVar('perfmon_request_metrics', default=None)
+
+
+class Histogram:
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (max for the open bucket)."""
+        if not self.total:
+            return None
+        rank = q / 100 * self.total
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return self.bounds[i] if i < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self):
+        return {
+            'count': self.total,
+            'mean': round(self.sum / self.total, 3) if self.total else None,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'max': round(self.max, 3),
+        }
+
+
+@dataclass
+class EndpointStats:
+    latency_ms: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    sql_count: Histogram = field(default_factory=lambda: Histogram(COUNT_BUCKETS))
+    sql_ms: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    template_ms: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    serializer_ms: Histogram = field(default_factory=lambda: Histogram(LATENCY_BUCKETS))
+    over_budget: int = 0
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._counters = {}
+
+    def record(self, name, latency_ms, metrics, over_budget=False):
+        with self._lock:
+            stats = self._endpoints.setdefault(name, EndpointStats())
+            stats.latency_ms.observe(latency_ms)
+            stats.sql_count.observe(metrics.sql_count)
+            stats.sql_ms.observe(metrics.sql_ms)
+            stats.template_ms.observe(metrics.template_ms)
+            stats.serializer_ms.observe(metrics.serializer_ms)
+            stats.over_budget += over_budget
+
+    def observe(self, name, metric, value):
+        """Record a single named measurement outside the request cycle."""
+        with self._lock:
+            stats = self._endpoints.setdefault(name, EndpointStats())
+            getattr(stats, metric).observe(value)
+
+    def count(self, name, event, n=1):
+        """Add `n` to the `event` counter of component `name`."""
+        with self._lock:
+            self._counters.setdefault(name, Counter())[event] += n
+
+    def counters(self):
+        with self._lock:
+            return {name: dict(counter) for name, counter in sorted(self._counters.items())}
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {
+                    'latency_ms': stats.latency_ms.snapshot(),
+                    'sql_count': stats.sql_count.snapshot(),
+                    'sql_ms': stats.sql_ms.snapshot(),
+                    'template_ms': stats.template_ms.snapshot(),
+                    'serializer_ms': stats.serializer_ms.snapshot(),
+                    'over_budget': stats.over_budget,
+                }
+                for name, stats in sorted(self._endpoints.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._endpoints.clear()
+            self._counters.clear()
+
+
+registry = Registry()
@@ -0,0 +1,99 @@
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
+from django.http import Http404, HttpResponse
+from django.template import engines
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import path
+
+from . import bench
+from .middleware import PerfMiddleware
+from .stats import Histogram, registry
+from .views import perf_report
+
+
+def view_with_work(request):
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.execute('SELECT 2')
+    return HttpResponse(engines['django'].from_string('{{ n }}').render({'n': 1}))
+
+
+async def async_view_with_work(request):
+    # as async ORM calls do: the queries run on asgiref's sync thread
+    return await sync_to_async(view_with_work)(request)
+
+
+urlpatterns = [path('async-work/', async_view_with_work)]
+
+
+class HistogramTests(SimpleTestCase):
+    def test_percentiles(self):
+        h = Histogram((1, 10, 100))
+        for value in [0.5] * 50 + [5] * 40 + [50] * 9 + [500]:
+            h.observe(value)
+        self.assertEqual(h.percentile(50), 1)
+        self.assertEqual(h.percentile(90), 10)
+        self.assertEqual(h.percentile(99), 100)
+        self.assertEqual(h.percentile(100), 500)
+
+
+class BenchCompareTests(SimpleTestCase):
+    def report(self, **result):
+        base = {'queries': 3, 'p50_ms': 10.0, 'p99_ms': 20.0, 'peak_kb': 100.0}
+        return {'meta': {}, 'results': {'post_list': dict(base, **result)}}
+
+    def test_percentile_is_nearest_rank(self):
+        samples = list(range(1, 101))
+        self.assertEqual(bench.percentile(samples, 50), 50)
+        self.assertEqual(bench.percentile(samples, 99), 99)
+        self.assertEqual(bench.percentile([7], 99), 7)
+
+    def test_noise_within_tolerance_passes(self):
+        self.assertEqual(bench.compare(self.report(), self.report(p50_ms=11.5, peak_kb=110.0)), [])
+
+    def test_extra_query_or_slowdown_is_a_regression(self):
+        regressions = bench.compare(self.report(), self.report(queries=4, p99_ms=40.0))
+        self.assertEqual(regressions, ['post_list: queries 3 -> 4', 'post_list: p99_ms 20.0 -> 40.0'])
+
+
+class PerfMiddlewareTests(TestCase):
+    def setUp(self):
+        registry.reset()
+        self.factory = RequestFactory()
+
+    def test_records_queries_and_sets_server_timing(self):
+        response = PerfMiddleware(view_with_work)(self.factory.get('/x/'))
+        self.assertIn('sql;dur=', response['Server-Timing'])
+        self.assertIn('"2 queries"', response['Server-Timing'])
+        stats = registry.snapshot()['unresolved']
+        self.assertEqual(stats['latency_ms']['count'], 1)
+        self.assertEqual(stats['sql_count']['max'], 2)
+        self.assertGreater(stats['template_ms']['max'], 0)
+
+    async def test_async_view_stays_async(self):
+        async def view(request):
+            return HttpResponse('ok')
+        middleware = PerfMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        response = await middleware(self.factory.get('/x/'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(ROOT_URLCONF='perfmon.tests', MIDDLEWARE=['perfmon.middleware.PerfMiddleware'])
+    async def test_counts_queries_of_async_views(self):
+        response = await self.async_client.get('/async-work/')
+        self.assertIn('"2 queries"', response['Server-Timing'])
+
+    @override_settings(PERFMON={'QUERY_BUDGET': 1})
+    def test_logs_requests_over_budget(self):
+        with self.assertLogs('perfmon', 'WARNING') as logs:
+            PerfMiddleware(view_with_work)(self.factory.get('/x/'))
+        self.assertIn('2 queries', logs.output[0])
+        self.assertEqual(registry.snapshot()['unresolved']['over_budget'], 1)
+
+    @override_settings(DEBUG=False)
+    def test_report_hidden_from_non_staff(self):
+        request = self.factory.get('/__perf__/')
+        request.user = AnonymousUser()
+        with self.assertRaises(Http404):
+            perf_report(request)
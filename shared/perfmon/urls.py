@@ -0,0 +1,7 @@
+from django.urls import path
+
+from .views import perf_report
+
+urlpatterns = [
+    path('', perf_report, name='perf_report'),
+]
@@ -0,0 +1,11 @@
+from django.conf import settings
+from django.http import Http404, JsonResponse
+
+from .stats import registry
+
+
+def perf_report(request):
+    """Per-URL-name histograms and counters for this process; staff only outside DEBUG."""
+    if not (settings.DEBUG or request.user.is_staff):
+        raise Http404
+    return JsonResponse({'endpoints': registry.snapshot(), 'counters': registry.counters()})
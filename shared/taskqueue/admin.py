@@ -0,0 +1,16 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Task
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'max_attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('attempts', 'locked_until', 'last_error', 'created_at')
+    actions = ['retry']
+
+    @admin.action(description='Retry selected tasks')
+    def retry(self, request, queryset):
+        queryset.update(status=Task.PENDING, attempts=0, locked_until=None, run_after=timezone.now())
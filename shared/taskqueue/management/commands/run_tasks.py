@@ -0,0 +1,22 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from taskqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks. Start as many workers as needed; they coordinate through the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--burst', action='store_true', help='Exit once no task is due.')
+        parser.add_argument('--batch-size', type=int, help='Tasks claimed at a time (default TASKQUEUE["BATCH_SIZE"]).')
+        parser.add_argument('--poll-interval', type=float, help='Seconds to sleep when idle (default TASKQUEUE["POLL_INTERVAL"]).')
+
+    def handle(self, *args, burst, batch_size, poll_interval, **options):
+        worker = Worker(batch_size=batch_size)
+        # finish the task at hand, then exit
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        processed = worker.run(burst=burst, poll_interval=poll_interval)
+        self.stdout.write(f'Processed {processed} tasks.')
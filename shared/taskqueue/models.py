@@ -0,0 +1,54 @@
+from datetime import timedelta
+
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class TaskQuerySet(models.QuerySet):
+    def due(self, now=None):
+        """Pending tasks whose time has come, plus running ones whose lease ran out."""
+        now = now or timezone.now()
+        return self.filter(
+            Q(status=Task.PENDING, run_after__lte=now) | Q(status=Task.RUNNING, locked_until__lte=now)
+        )
+
+
+class Task(models.Model):
+    """
+    A queued call of a registered task function (see taskqueue/registry.py).
+    Rows are deleted once the task succeeds; failed ones stay for inspection.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    # a worker owns a running task until then; afterwards it is up for grabs again
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = TaskQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_due_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
+
+    def retry_at(self, base_delay, now=None):
+        """Exponential backoff: base_delay seconds after the first failure, doubling after each."""
+        return (now or timezone.now()) + timedelta(seconds=base_delay * 2 ** max(self.attempts - 1, 0))
@@ -0,0 +1,62 @@
+"""
+Task registration and enqueueing.
+
+A task is a plain function decorated with `@task`. Apps keep theirs in a
+`tasks` module, which TaskqueueConfig imports at startup. Arguments are
+keyword-only and must be JSON serializable.
+
+`enqueue` inserts a `Task` row in the caller's transaction. If the request
+rolls back, the task goes with it, and a worker never sees a task before
+the data it refers to is committed.
+"""
+from django.conf import settings
+
+from .models import Task
+
+DEFAULTS = {
+    'LEASE_SECONDS': 300,
+    'POLL_INTERVAL': 1,
+    'BATCH_SIZE': 10,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,
+}
+
+_tasks = {}
+
+
+def get_setting(name):
+    return getattr(settings, 'TASKQUEUE', {}).get(name, DEFAULTS[name])
+
+
+def task(fn=None, *, name=None, max_attempts=None):
+    """Register `fn` under `name` (default `module.function`) and give it `fn.enqueue(**kwargs)`."""
+    def register(fn):
+        task_name = name or f'{fn.__module__}.{fn.__name__}'
+        if _tasks.get(task_name, fn) is not fn:
+            raise ValueError(f'A different task is already registered as {task_name!r}.')
+        _tasks[task_name] = fn
+
+        def enqueue_task(*, delay=None, **kwargs):
+            return enqueue(task_name, kwargs, delay=delay, max_attempts=max_attempts)
+
+        fn.task_name = task_name
+        fn.enqueue = enqueue_task
+        return fn
+
+    return register(fn) if fn is not None else register
+
+
+def get_task(name):
+    return _tasks.get(name)
+
+
+def enqueue(name, kwargs=None, *, delay=None, max_attempts=None):
+    """Queue a call of the task registered as `name`; `delay` is a timedelta."""
+    if name not in _tasks:
+        raise LookupError(f'No task registered as {name!r}.')
+    fields = {'name': name, 'kwargs': kwargs or {}, 'max_attempts': max_attempts or get_setting('MAX_ATTEMPTS')}
+    task = Task(**fields)
+    if delay:
+        task.run_after = task.run_after + delay
+    task.save()
+    return task
@@ -0,0 +1,75 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from .models import Task
+from .registry import enqueue, task
+from .worker import Worker
+
+calls = []
+
+
+@task(name='taskqueue.tests.record')
+def record(value):
+    calls.append(value)
+
+
+@task(name='taskqueue.tests.explode', max_attempts=2)
+def explode():
+    raise RuntimeError('boom')
+
+
+class WorkerTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def test_runs_due_tasks_in_order_and_deletes_them(self):
+        record.enqueue(value=1)
+        record.enqueue(value=2)
+        record.enqueue(value=3, delay=timedelta(hours=1))
+        self.assertEqual(Worker().run(burst=True), 2)
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(list(Task.objects.values_list('kwargs', flat=True)), [{'value': 3}])
+
+    def test_rolled_back_enqueue_leaves_nothing(self):
+        try:
+            with transaction.atomic():
+                record.enqueue(value=1)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(Task.objects.exists())
+
+    def test_claim_is_exclusive(self):
+        record.enqueue(value=1)
+        first, second = Worker(), Worker()
+        self.assertEqual(len(first.claim()), 1)
+        self.assertEqual(second.claim(), [])
+
+    def test_expired_lease_is_reclaimed(self):
+        queued = record.enqueue(value=1)
+        Worker().claim()
+        Task.objects.filter(pk=queued.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(Worker().run(burst=True), 1)
+        self.assertEqual(calls, [1])
+
+    def test_failures_back_off_then_stop(self):
+        queued = explode.enqueue()
+        worker = Worker()
+        self.assertEqual(worker.run(burst=True), 1)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.PENDING, 1))
+        self.assertGreater(queued.run_after, timezone.now())
+        self.assertIn('boom', queued.last_error)
+
+        Task.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+        worker.run(burst=True)
+        queued.refresh_from_db()
+        self.assertEqual((queued.status, queued.attempts), (Task.FAILED, 2))
+        self.assertEqual(worker.run(burst=True), 0)
+
+    def test_unknown_task_names_are_refused(self):
+        with self.assertRaises(LookupError):
+            enqueue('taskqueue.tests.missing')
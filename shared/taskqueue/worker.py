@@ -0,0 +1,109 @@
+"""
+The worker loop behind `manage.py run_tasks`.
+
+Workers share nothing but the `Task` table. A worker claims a task with a
+conditional UPDATE that only matches while the task is still due, so when
+two workers race for the same row exactly one update hits it. That works
+on every database, SQLite included, with no row locks. A claim is a lease
+of TASKQUEUE['LEASE_SECONDS']: if the worker dies mid-task, the task
+becomes due again once the lease runs out. Tasks therefore run at least
+once and should be safe to repeat.
+
+A task that raises is retried with exponential backoff until it has made
+`max_attempts` attempts. After that it is marked failed and kept.
+Successful tasks are deleted.
+
+Outcomes are counted in perfmon's registry under 'taskqueue', and each
+task's run time is recorded as 'taskqueue.<task name>'.
+"""
+import logging
+import time
+import traceback
+from datetime import timedelta
+
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+
+from perfmon.stats import registry
+
+from .models import Task
+from .registry import get_setting, get_task
+
+logger = logging.getLogger('taskqueue')
+
+STATS_NAME = 'taskqueue'
+
+
+class Worker:
+    def __init__(self, batch_size=None, lease_seconds=None):
+        self.batch_size = batch_size or get_setting('BATCH_SIZE')
+        self.lease = timedelta(seconds=lease_seconds or get_setting('LEASE_SECONDS'))
+        self.stopping = False
+
+    def claim(self):
+        """Take up to `batch_size` due tasks, oldest first."""
+        now = timezone.now()
+        candidates = Task.objects.due(now).order_by('run_after', 'pk').values_list('pk', flat=True)
+        claimed = [
+            pk for pk in candidates[:self.batch_size]
+            if Task.objects.due(now).filter(pk=pk).update(
+                status=Task.RUNNING, locked_until=now + self.lease, attempts=F('attempts') + 1,
+            )
+        ]
+        return list(Task.objects.filter(pk__in=claimed).order_by('run_after', 'pk'))
+
+    def execute(self, task):
+        fn = get_task(task.name)
+        start = time.perf_counter()
+        try:
+            if fn is None:
+                raise LookupError(f'No task registered as {task.name!r}.')
+            fn(**task.kwargs)
+        except Exception:
+            logger.exception('Task %s failed (attempt %d of %d)', task, task.attempts, task.max_attempts)
+            self.failed(task, traceback.format_exc())
+        else:
+            Task.objects.filter(pk=task.pk).delete()
+            registry.count(STATS_NAME, 'done')
+        finally:
+            registry.observe(f'{STATS_NAME}.{task.name}', 'latency_ms', (time.perf_counter() - start) * 1000)
+
+    def failed(self, task, error):
+        if task.attempts >= task.max_attempts:
+            changes = {'status': Task.FAILED}
+            registry.count(STATS_NAME, 'failed')
+        else:
+            changes = {'status': Task.PENDING, 'run_after': task.retry_at(get_setting('RETRY_DELAY'))}
+            registry.count(STATS_NAME, 'retried')
+        Task.objects.filter(pk=task.pk).update(locked_until=None, last_error=error, **changes)
+
+    def run_once(self):
+        """Claim one batch and run it; returns how many tasks ran."""
+        tasks = self.claim()
+        for task in tasks:
+            if self.stopping:
+                # hand the rest back rather than sit on them until the lease runs out
+                Task.objects.filter(pk=task.pk).update(
+                    status=Task.PENDING, locked_until=None, attempts=F('attempts') - 1,
+                )
+                continue
+            self.execute(task)
+        return len(tasks)
+
+    def run(self, burst=False, poll_interval=None):
+        """Work until stopped, or in `burst` mode until nothing is due."""
+        poll_interval = get_setting('POLL_INTERVAL') if poll_interval is None else poll_interval
+        processed = 0
+        while not self.stopping:
+            close_old_connections()
+            ran = self.run_once()
+            processed += ran
+            if not ran:
+                if burst:
+                    break
+                time.sleep(poll_interval)
+        return processed
+
+    def stop(self, *args):
+        self.stopping = True
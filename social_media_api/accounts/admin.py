@@ -1,5 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User
+from .models import AuthToken, User
 
 admin.site.register(User, UserAdmin)
+
+
+@admin.register(AuthToken)
+class AuthTokenAdmin(admin.ModelAdmin):
+    list_display = ('prefix', 'user', 'device', 'created_at', 'expires_at')
+    list_select_related = ('user',)
+    search_fields = ('prefix', 'user__username', 'device')
+    readonly_fields = ('prefix', 'digest')
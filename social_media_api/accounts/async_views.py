@@ -0,0 +1,42 @@
+"""Async (ASGI-native) profile endpoint; see posts/async_views.py."""
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+
+from posts.async_views import api_view
+
+from .authentication import token_cache, verify
+from .models import AuthToken, User
+from .serializers import UserSerializer
+
+
+async def authenticate(request):
+    """
+    Async counterpart of the REST_FRAMEWORK authentication classes: a
+    `Token <key>` Authorization header (through the token cache), or else
+    the session. Returns the user, or None when the request is anonymous or
+    the token is invalid.
+    """
+    keyword, _, key = request.headers.get('Authorization', '').partition(' ')
+    key = key.strip()
+    if keyword.lower() == 'token' and key:
+        digest = AuthToken.digest_of(key)
+        token = await token_cache.aget(digest)
+        if token is None:
+            try:
+                token = verify([t async for t in AuthToken.objects.candidates(key)], digest)
+            except AuthenticationFailed:
+                return None
+            await token_cache.aset(token)
+        return token.user
+    user = await request.auser()
+    return user if user.is_authenticated else None
+
+
+@api_view
+async def profile(request):
+    user = await authenticate(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+    # the authenticated user may be a cached copy with stale counters
+    user = await User.objects.aget(pk=user.pk)
+    return JsonResponse(UserSerializer(user, context={'request': request}).data)
@@ -0,0 +1,174 @@
+"""
+Token authentication backed by a two-tier cache.
+
+Keys are checked against `AuthToken` (an indexed prefix probe plus a
+SHA-256 digest compare). `CachedTokenAuthentication` checks two cache
+tiers before it queries, both keyed by the key's digest:
+
+1. A bounded per-process LRU holding up to TOKEN_CACHE['LOCAL_SIZE']
+   entries, each kept for TOKEN_CACHE['LOCAL_TTL'] seconds.
+2. The default Django cache, shared by all workers, which keeps entries
+   for TOKEN_CACHE['SHARED_TTL'] seconds.
+
+An entry never outlives its token's `expires_at`. accounts/signals.py
+drops a token's entries when the token is deleted (logout, rotation,
+purge) and when its user is saved, which covers deactivation. Queryset
+`update()` calls send no signals and are only picked up when the entries
+expire. Another worker's LRU may serve a dropped token for up to
+LOCAL_TTL seconds.
+
+Hits and misses are counted in perfmon's registry under 'auth.token_cache'.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from perfmon.stats import registry
+
+from .models import AuthToken
+
+DEFAULTS = {
+    'LOCAL_SIZE': 10000,
+    'LOCAL_TTL': 30,
+    'SHARED_TTL': 300,
+}
+
+STATS_NAME = 'auth.token_cache'
+
+
+def get_setting(name):
+    return getattr(settings, 'TOKEN_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class TokenCache:
+    """Caches a stub `AuthToken` (pk, digest, expiry and user) per key digest."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = OrderedDict()
+
+    @staticmethod
+    def shared_key(digest):
+        return f'auth:token:{digest}'
+
+    def _get_local(self, digest):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._local.get(digest)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires <= now:
+                del self._local[digest]
+                return None
+            self._local.move_to_end(digest)
+        registry.count(STATS_NAME, 'local_hit')
+        return token
+
+    def _put_local(self, token, ttl):
+        with self._lock:
+            self._local[token.digest] = (token, time.monotonic() + min(ttl, get_setting('LOCAL_TTL')))
+            self._local.move_to_end(token.digest)
+            while len(self._local) > get_setting('LOCAL_SIZE'):
+                self._local.popitem(last=False)
+
+    def _found_shared(self, token):
+        if token is None:
+            registry.count(STATS_NAME, 'miss')
+            return None
+        registry.count(STATS_NAME, 'shared_hit')
+        self._put_local(token, self._ttl(token))
+        return token
+
+    @staticmethod
+    def _ttl(token):
+        return max(0, int((token.expires_at - timezone.now()).total_seconds()))
+
+    def _fresh(self, token):
+        # callers get their own copies so no two requests share a user object
+        if token is None or token.is_expired:
+            return None
+        token = copy.copy(token)
+        token.user = copy.copy(token.user)
+        return token
+
+    def _stub(self, token):
+        stub = AuthToken(pk=token.pk, user=copy.copy(token.user), device=token.device,
+                         prefix=token.prefix, digest=token.digest, expires_at=token.expires_at)
+        return stub, min(self._ttl(stub), get_setting('SHARED_TTL'))
+
+    def get(self, digest):
+        """Cached token for `digest` with its user, or None."""
+        token = self._get_local(digest)
+        if token is None:
+            token = self._found_shared(cache.get(self.shared_key(digest)))
+        return self._fresh(token)
+
+    async def aget(self, digest):
+        token = self._get_local(digest)
+        if token is None:
+            token = self._found_shared(await cache.aget(self.shared_key(digest)))
+        return self._fresh(token)
+
+    def set(self, token):
+        stub, ttl = self._stub(token)
+        if ttl:
+            cache.set(self.shared_key(stub.digest), stub, ttl)
+            self._put_local(stub, ttl)
+
+    async def aset(self, token):
+        stub, ttl = self._stub(token)
+        if ttl:
+            await cache.aset(self.shared_key(stub.digest), stub, ttl)
+            self._put_local(stub, ttl)
+
+    def invalidate(self, *digests):
+        with self._lock:
+            for digest in digests:
+                self._local.pop(digest, None)
+        cache.delete_many([self.shared_key(digest) for digest in digests])
+
+    def clear_local(self):
+        with self._lock:
+            self._local.clear()
+
+
+token_cache = TokenCache()
+
+
+def verify(candidates, digest):
+    """Pick the live token among `candidates` whose digest matches, or raise."""
+    for token in candidates:
+        if token.matches(digest):
+            break
+    else:
+        raise exceptions.AuthenticationFailed('Invalid token.')
+    if token.is_expired:
+        raise exceptions.AuthenticationFailed('Token has expired.')
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed('User inactive or deleted.')
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Authenticates `Authorization: Token <key>` against `AuthToken`,
+    consulting `token_cache` first. `request.auth` is the `AuthToken`
+    (possibly a cached copy), which is enough to delete it on logout.
+    """
+    model = AuthToken
+
+    def authenticate_credentials(self, key):
+        digest = AuthToken.digest_of(key)
+        token = token_cache.get(digest)
+        if token is None:
+            token = verify(AuthToken.objects.candidates(key), digest)
+            token_cache.set(token)
+        return token.user, token
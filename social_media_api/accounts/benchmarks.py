@@ -0,0 +1,41 @@
+"""Benchmark data: users wired into a power-law follower graph."""
+from io import StringIO
+from itertools import accumulate
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+
+from perfmon.bench import seeder
+
+from .models import User
+
+USERS = 500
+BATCH_SIZE = 5000
+
+
+@seeder
+def users(suite):
+    password = make_password('bench')
+    User.objects.bulk_create(
+        (User(username=f'bench{i}', password=password) for i in range(suite.size(USERS))),
+        batch_size=BATCH_SIZE,
+    )
+    ids = list(User.objects.order_by('pk').values_list('pk', flat=True))
+    suite.data['user_ids'] = ids
+
+    # Both popularity and activity are Pareto distributed: a few users are
+    # followed by a large share of everyone, and a few follow very many.
+    rng = suite.rng
+    popularity = list(accumulate(rng.paretovariate(1.1) for _ in ids))
+    Follow = User.followers.through
+    edges = set()
+    for follower in ids:
+        wanted = min(len(ids) - 1, int(rng.paretovariate(1.5) * 5))
+        for followee in rng.choices(ids, cum_weights=popularity, k=wanted):
+            if followee != follower:
+                edges.add((followee, follower))
+    Follow.objects.bulk_create(
+        (Follow(from_user_id=followee, to_user_id=follower) for followee, follower in edges),
+        batch_size=BATCH_SIZE,
+    )
+    call_command('recount_user_counters', stdout=StringIO())
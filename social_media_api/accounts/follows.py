@@ -0,0 +1,66 @@
+"""
+Follow graph queries.
+
+`User.followers` is stored in its auto-created through table, where
+`from_user` is the followed user and `to_user` the follower. Every helper
+here answers for a whole set of users in one query. Serializers get the
+answers through their context, not by asking about each user.
+"""
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import User
+
+Follow = User.followers.through
+
+
+def followers_of(user_id):
+    """Follow edges into `user_id`, newest first; `to_user` is the follower."""
+    return Follow.objects.filter(from_user_id=user_id).select_related('to_user').order_by('-id')
+
+
+def following_of(user_id):
+    """Follow edges out of `user_id`, newest first; `from_user` is the followed user."""
+    return Follow.objects.filter(to_user_id=user_id).select_related('from_user').order_by('-id')
+
+
+def relationships(user, ids):
+    """({ids `user` follows}, {ids following `user`}) among `ids`."""
+    following, followed_by = set(), set()
+    if not ids:
+        return following, followed_by
+    edges = Follow.objects.filter(
+        Q(to_user=user, from_user__in=ids) | Q(from_user=user, to_user__in=ids)
+    ).values_list('from_user_id', 'to_user_id')
+    for followed, follower in edges:
+        if follower == user.pk:
+            following.add(followed)
+        else:
+            followed_by.add(follower)
+    return following, followed_by
+
+
+def mutual_follower_counts(user, ids):
+    """{id: how many of the people `user` follows also follow it} for `ids`."""
+    if not ids:
+        return {}
+    followed = Follow.objects.filter(to_user=user).values('from_user')
+    counts = Follow.objects.filter(from_user__in=ids, to_user__in=followed).values('from_user').annotate(n=Count('pk'))
+    return {row['from_user']: row['n'] for row in counts}
+
+
+def mutual_followers(user, other_id):
+    """Users `user` follows who also follow `other_id`, as follow edges into `other_id`."""
+    followed = Follow.objects.filter(to_user=user).values('from_user')
+    return followers_of(other_id).filter(to_user__in=followed)
+
+
+def follow_many(user, ids):
+    """Make `user` follow every id in `ids`; returns the ids that were not followed before."""
+    ids = set(ids) - {user.pk}
+    with transaction.atomic():
+        new = ids - relationships(user, ids)[0]
+        if new:
+            # one m2m add: counters and timelines are updated set-wise by the signals
+            user.following.add(*new)
+    return new
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from accounts import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute who-to-follow suggestions for users affected by follows since the last run, '
+        'or for everyone with --full.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rescore every user (picks up unfollows too).')
+        parser.add_argument('--workers', type=int, help='Processes to score with (default FOLLOW_SUGGESTIONS["WORKERS"]).')
+
+    def handle(self, *args, full, workers, verbosity, **options):
+        def progress(done, total):
+            if verbosity > 1:
+                self.stdout.write(f'  {done}/{total} users')
+
+        run = recommendations.compute(full=full, workers=workers, progress=progress)
+        kind = 'full' if run.full else 'incremental'
+        self.stdout.write(f'Scored {run.users} users ({kind} run, edges up to #{run.edge_watermark}).')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from accounts.models import AuthToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired API tokens in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        # fix the cut-off so tokens expiring mid-run wait for the next run
+        now = timezone.now()
+        total = 0
+        while True:
+            ids = list(AuthToken.objects.expired(now).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                break
+            total += AuthToken.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(f'Deleted {total} expired tokens.')
@@ -0,0 +1,56 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from accounts.models import User
+
+COUNTERS = ('num_followers', 'num_following', 'num_posts', 'num_comments')
+
+
+def _count(queryset, column):
+    counted = queryset.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+class Command(BaseCommand):
+    help = "Recompute users' follower/following/post/comment counters and fix any that drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        Follow = User.followers.through
+        Post = apps.get_model('posts', 'Post')
+        Comment = apps.get_model('posts', 'Comment')
+        actual = {
+            'actual_followers': _count(Follow.objects.all(), 'from_user'),
+            'actual_following': _count(Follow.objects.all(), 'to_user'),
+            'actual_posts': _count(Post.objects.all(), 'author'),
+            'actual_comments': _count(Comment.objects.all(), 'author'),
+        }
+
+        fixed = scanned = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                User.objects.filter(pk__gt=last_pk).order_by('pk')
+                .annotate(**actual).only('pk', *COUNTERS)[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            drifted = [
+                user.pk for user in batch
+                if any(getattr(user, name) != getattr(user, 'actual_' + name[len('num_'):]) for name in COUNTERS)
+            ]
+            if drifted:
+                # recompute inside the UPDATE itself so concurrent F() bumps are not lost
+                User.objects.filter(pk__in=drifted).update(**{
+                    name: actual['actual_' + name[len('num_'):]] for name in COUNTERS
+                })
+                fixed += len(drifted)
+
+        self.stdout.write(self.style.SUCCESS(f'Scanned {scanned} users, fixed {fixed} drifted counters.'))
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:55
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def _count(queryset, column):
+    counted = queryset.filter(**{column: OuterRef('pk')}).order_by().values(column).annotate(n=Count('*')).values('n')
+    return Coalesce(Subquery(counted, output_field=IntegerField()), Value(0))
+
+
+def recount_counters(apps, schema_editor):
+    """Existing users start from their real counts, not zero."""
+    User = apps.get_model('accounts', 'User')
+    Follow = User.followers.through
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    User.objects.update(
+        num_followers=_count(Follow.objects.all(), 'from_user'),
+        num_following=_count(Follow.objects.all(), 'to_user'),
+        num_posts=_count(Post.objects.all(), 'author'),
+        num_comments=_count(Comment.objects.all(), 'author'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('posts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='num_comments',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_followers',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_following',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_posts',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(recount_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+BATCH_SIZE = 1000
+
+
+def hash_legacy_tokens(apps, schema_editor):
+    """Move plaintext rest_framework.authtoken keys into hashed AuthToken rows.
+    Clients keep working: a legacy key's prefix is its first characters."""
+    Token = apps.get_model('authtoken', 'Token')
+    AuthToken = apps.get_model('accounts', 'AuthToken')
+    expires_at = timezone.now() + timedelta(days=getattr(settings, 'AUTH_TOKEN_TTL_DAYS', 30))
+    while True:
+        batch = list(Token.objects.order_by('pk')[:BATCH_SIZE])
+        if not batch:
+            break
+        AuthToken.objects.bulk_create([
+            AuthToken(
+                user_id=token.user_id,
+                device='legacy',
+                prefix=token.key[:8],
+                digest=hashlib.sha256(token.key.encode()).hexdigest(),
+                expires_at=expires_at,
+            )
+            for token in batch
+        ])
+        Token.objects.filter(pk__in=[token.pk for token in batch]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_authtoken'),
+        ('authtoken', '0004_alter_tokenproxy_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(hash_legacy_tokens, migrations.RunPython.noop),
+    ]
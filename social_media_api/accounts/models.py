@@ -1,10 +1,23 @@
+import hashlib
+import hmac
+import secrets
+from datetime import timedelta
+
 from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 
 class User(AbstractUser):
     bio = models.TextField(blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', blank=True, null=True)
+    # {size: {extension: storage path}} of the resized copies avatars.py
+    # renders off the request path; empty until they exist
+    profile_picture_variants = models.JSONField(default=dict, blank=True, editable=False)
+    # posts and comments embed the author, so their ETags include this
+    updated_at = models.DateTimeField(auto_now=True)
     # followers: users who follow this user
     followers = models.ManyToManyField(
         'self',
@@ -13,11 +26,126 @@ class User(AbstractUser):
         blank=True
     )
 
+    # Denormalized counters, kept in step by accounts/signals.py and
+    # posts/signals.py with F() updates; `recount_user_counters` repairs drift.
+    num_followers = models.PositiveIntegerField(default=0, editable=False)
+    num_following = models.PositiveIntegerField(default=0, editable=False)
+    num_posts = models.PositiveIntegerField(default=0, editable=False)
+    num_comments = models.PositiveIntegerField(default=0, editable=False)
+
     def followers_count(self):
-        return self.followers.count()
+        return self.num_followers
 
     def following_count(self):
-        return self.following.count()
+        return self.num_following
 
     def __str__(self):
         return self.username
+
+
+def shifted(counter, delta):
+    """SQL for `counter` moved by `delta`, never below zero, for use in update()."""
+    # a counter that lags behind (drift, a row from before the counters) must
+    # not turn a delete into a CHECK constraint failure
+    return Greatest(F(counter) + delta, 0)
+
+
+def token_ttl():
+    return timedelta(days=getattr(settings, 'AUTH_TOKEN_TTL_DAYS', 30))
+
+
+class AuthTokenQuerySet(models.QuerySet):
+    def expired(self, now=None):
+        return self.filter(expires_at__lte=now or timezone.now())
+
+    def candidates(self, raw_key):
+        """Tokens sharing `raw_key`'s prefix: one probe of the prefix index."""
+        return self.filter(prefix=AuthToken.prefix_of(raw_key)).select_related('user')
+
+
+class AuthToken(models.Model):
+    """
+    An API token. Only a short prefix and a SHA-256 digest of the key are
+    stored, so a leaked table does not leak usable keys. Keys look like
+    `<prefix>.<secret>`; lookups probe the indexed prefix and compare
+    digests in constant time. Each user holds at most one token per device
+    name, so logging in again from a device replaces its token instead of
+    adding one. Expired rows are removed by `purge_expired_tokens`.
+    """
+    PREFIX_LENGTH = 8
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='auth_tokens')
+    device = models.CharField(max_length=64, blank=True)
+    prefix = models.CharField(max_length=PREFIX_LENGTH, db_index=True, editable=False)
+    digest = models.CharField(max_length=64, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    objects = AuthTokenQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'device'], name='unique_token_per_device'),
+        ]
+
+    def __str__(self):
+        return f'{self.prefix}… ({self.user}, {self.device or "default"})'
+
+    @classmethod
+    def prefix_of(cls, raw_key):
+        # keys migrated from rest_framework.authtoken have no separator
+        return raw_key.split('.', 1)[0][:cls.PREFIX_LENGTH]
+
+    @staticmethod
+    def digest_of(raw_key):
+        return hashlib.sha256(raw_key.encode()).hexdigest()
+
+    @classmethod
+    def issue(cls, user, device=''):
+        """Create (or replace) `user`'s token for `device`; returns (token, raw key)."""
+        raw_key = f'{secrets.token_hex(cls.PREFIX_LENGTH // 2)}.{secrets.token_urlsafe(32)}'
+        cls.objects.filter(user=user, device=device).delete()
+        token = cls.objects.create(
+            user=user,
+            device=device,
+            prefix=cls.prefix_of(raw_key),
+            digest=cls.digest_of(raw_key),
+            expires_at=timezone.now() + token_ttl(),
+        )
+        return token, raw_key
+
+    def matches(self, digest):
+        return hmac.compare_digest(self.digest, digest)
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class FollowSuggestions(models.Model):
+    """
+    Precomputed who-to-follow list for one user, written by
+    `compute_suggestions` (see accounts/recommendations.py). Serving it is
+    a primary-key lookup. `suggestions` holds `[user_id, score]` pairs,
+    best first; a score of 0 marks a popularity fallback.
+    """
+    user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True,
+                                related_name='follow_suggestions')
+    suggestions = models.JSONField(default=list)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'Suggestions for {self.user_id}'
+
+
+class SuggestionRun(models.Model):
+    """One `compute_suggestions` run. Incremental runs start from the last run's `edge_watermark`."""
+    full = models.BooleanField()
+    # highest follow edge id the run had seen; later edges trigger the next incremental run
+    edge_watermark = models.BigIntegerField()
+    users = models.PositiveIntegerField()
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{"Full" if self.full else "Incremental"} run at {self.finished_at:%Y-%m-%d %H:%M}'
@@ -0,0 +1,149 @@
+"""
+Who-to-follow suggestions.
+
+`compute` loads the follow graph into CSR arrays. `targets` lists every
+followed user id, grouped by follower. `offsets[u]` to `offsets[u + 1]`
+is the slice that user id `u` follows. Two `array('q')` buffers cost 8
+bytes per user id plus 8 bytes per edge.
+
+For each user it then scores friends of friends. Every user `v` they
+follow adds `1 / log(2 + following(v))` to each user `v` follows, so
+following someone who follows thousands of accounts says less than
+following a picky account. At most FOLLOW_SUGGESTIONS['MAX_EXPANSION']
+of `v`'s follows are expanded, a fixed random sample when `v` follows
+more. The top TOP_K scores are kept. When fewer remain, the list is
+filled from the POPULAR_POOL most-followed users, at score 0. Each list
+is stored in `FollowSuggestions`, one row per user. The scoring itself
+is in accounts/scoring.py.
+
+A full run loads every edge and scores every user, spread over WORKERS
+processes (0 means one per CPU). An incremental run only rescores users
+the follow edges added since the last run can have changed: the new
+followers and everyone who follows them. It loads only the edges those
+users' scores read, namely their own follows and the follows of the
+users they follow. Unfollows are only picked up by full runs. Serving
+drops users that are already followed, so a stale list never suggests
+them.
+"""
+import heapq
+import multiprocessing
+import os
+from array import array
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .follows import Follow
+from .models import FollowSuggestions, SuggestionRun, User
+from .scoring import Scorer, _init_worker, _suggest_chunk, shuffle_long_rows
+
+DEFAULTS = {
+    'TOP_K': 20,
+    'MAX_EXPANSION': 1000,
+    'POPULAR_POOL': 100,
+    'WORKERS': 0,
+}
+
+CHUNK_SIZE = 1000
+SAVE_BATCH_SIZE = 1000
+# followers per query when loading part of the graph
+LOAD_BATCH_SIZE = 500
+
+
+def get_setting(name):
+    return getattr(settings, 'FOLLOW_SUGGESTIONS', {}).get(name, DEFAULTS[name])
+
+
+def popular_ids(limit=None):
+    limit = limit or get_setting('POPULAR_POOL')
+    return list(User.objects.filter(is_active=True).order_by('-num_followers', 'pk').values_list('pk', flat=True)[:limit])
+
+
+def _edges(follower_ids=None):
+    """(follower, followed) pairs ordered by follower, for every follower or only `follower_ids`."""
+    edges = Follow.objects.order_by('to_user_id', 'from_user_id').values_list('to_user_id', 'from_user_id')
+    if follower_ids is None:
+        yield from edges.iterator(chunk_size=10000)
+        return
+    follower_ids = sorted(follower_ids)
+    for i in range(0, len(follower_ids), LOAD_BATCH_SIZE):
+        yield from edges.filter(to_user__in=follower_ids[i:i + LOAD_BATCH_SIZE])
+
+
+def load_graph(user_ids=None):
+    """
+    CSR arrays (offsets, targets) of who follows whom, indexed by user id.
+    With `user_ids`, only the edges scoring those users reads are loaded:
+    their follows and the follows of the users they follow.
+    """
+    max_id = User.objects.aggregate(Max('pk'))['pk__max'] or 0
+    offsets = array('q', bytes(8 * (max_id + 2)))
+    targets = array('q')
+    if user_ids is None:
+        edges = _edges()
+    else:
+        near = list(_edges(user_ids))
+        edges = heapq.merge(near, _edges({followed for _, followed in near} - set(user_ids)))
+    for follower, followed in edges:
+        targets.append(followed)
+        offsets[follower + 1] += 1
+    for i in range(1, len(offsets)):
+        offsets[i] += offsets[i - 1]
+    return offsets, targets
+
+
+def affected_users(after_edge_id):
+    """Users whose suggestions follow edges with ids above `after_edge_id` can have changed."""
+    new_followers = Follow.objects.filter(pk__gt=after_edge_id).values('to_user')
+    second_hop = Follow.objects.filter(from_user__in=new_followers).values_list('to_user', flat=True)
+    return set(new_followers.values_list('to_user', flat=True).distinct()) | set(second_hop.distinct())
+
+
+def save(results, now):
+    FollowSuggestions.objects.bulk_create(
+        [FollowSuggestions(user_id=user_id, suggestions=suggestions, computed_at=now) for user_id, suggestions in results],
+        batch_size=SAVE_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['user'],
+        update_fields=['suggestions', 'computed_at'],
+    )
+
+
+def compute(full=False, workers=None, progress=None):
+    """Score and store suggestions; returns the `SuggestionRun`."""
+    started = timezone.now()
+    last = SuggestionRun.objects.order_by('-pk').first()
+    # read first: edges added while this run works are picked up by the next one
+    watermark = Follow.objects.aggregate(Max('pk'))['pk__max'] or 0
+    full = full or last is None
+    if full:
+        user_ids = list(User.objects.filter(is_active=True).values_list('pk', flat=True))
+    else:
+        user_ids = sorted(affected_users(last.edge_watermark))
+
+    if user_ids:
+        offsets, targets = load_graph(None if full else user_ids)
+        max_expansion = get_setting('MAX_EXPANSION')
+        shuffle_long_rows(offsets, targets, max_expansion)
+        args = (offsets, targets, popular_ids(), get_setting('TOP_K'), max_expansion)
+        chunks = [user_ids[i:i + CHUNK_SIZE] for i in range(0, len(user_ids), CHUNK_SIZE)]
+        workers = workers or get_setting('WORKERS') or os.cpu_count() or 1
+        done = 0
+        if workers > 1 and len(chunks) > 1:
+            # workers only compute from the arrays; they never touch the database
+            with multiprocessing.Pool(workers, initializer=_init_worker, initargs=args) as pool:
+                for results in pool.imap_unordered(_suggest_chunk, chunks):
+                    save(results, started)
+                    done += len(results)
+                    if progress:
+                        progress(done, len(user_ids))
+        else:
+            scorer = Scorer(*args)
+            for chunk in chunks:
+                save(scorer.suggest_many(chunk), started)
+                done += len(chunk)
+                if progress:
+                    progress(done, len(user_ids))
+
+    return SuggestionRun.objects.create(full=full, edge_watermark=watermark, users=len(user_ids), started_at=started)
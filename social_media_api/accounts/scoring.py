@@ -0,0 +1,81 @@
+"""
+Friend-of-friend scoring over the CSR follow graph built by
+accounts/recommendations.py.
+
+This module imports no models. `compute` runs `_suggest_chunk` in
+`multiprocessing` workers, and under the spawn start method (the default
+on macOS and Windows) a worker imports the module holding its function
+before Django is set up. Model imports there would fail with
+AppRegistryNotReady.
+"""
+import heapq
+import math
+import random
+from array import array
+from collections import defaultdict
+
+
+def shuffle_long_rows(offsets, targets, limit):
+    """
+    Shuffle, in place, the follows of every user who follows more than
+    `limit` accounts. `Scorer` expands only the first `limit` of them, which
+    then form a uniform sample instead of the lowest ids. Each row is seeded
+    by its user id, so every run and every worker sees the same sample.
+    """
+    for user_id in range(len(offsets) - 1):
+        start, end = offsets[user_id], offsets[user_id + 1]
+        if end - start > limit:
+            row = list(targets[start:end])
+            random.Random(user_id).shuffle(row)
+            targets[start:end] = array(targets.typecode, row)
+
+
+class Scorer:
+    def __init__(self, offsets, targets, popular, top_k, max_expansion):
+        self.offsets = offsets
+        self.targets = targets
+        self.popular = popular
+        self.top_k = top_k
+        self.max_expansion = max_expansion
+
+    def following(self, user_id):
+        if user_id + 1 >= len(self.offsets):
+            return self.targets[0:0]  # joined after the graph was loaded
+        return self.targets[self.offsets[user_id]:self.offsets[user_id + 1]]
+
+    def suggest(self, user_id):
+        """[[user_id, score], ...] for `user_id`, best first."""
+        direct = self.following(user_id)
+        excluded = set(direct)
+        excluded.add(user_id)
+        scores = defaultdict(float)
+        for via in direct:
+            second = self.following(via)
+            if not second:
+                continue
+            weight = 1 / math.log(2 + len(second))
+            # rows longer than max_expansion were shuffled by shuffle_long_rows
+            for candidate in second[:self.max_expansion]:
+                if candidate not in excluded:
+                    scores[candidate] += weight
+        best = heapq.nlargest(self.top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        picked = [[candidate, round(score, 4)] for candidate, score in best]
+        if len(picked) < self.top_k:
+            excluded.update(scores)
+            picked.extend([candidate, 0] for candidate in self.popular if candidate not in excluded)
+        return picked[:self.top_k]
+
+    def suggest_many(self, user_ids):
+        return [(user_id, self.suggest(user_id)) for user_id in user_ids]
+
+
+_scorer = None
+
+
+def _init_worker(*args):
+    global _scorer
+    _scorer = Scorer(*args)
+
+
+def _suggest_chunk(user_ids):
+    return _scorer.suggest_many(user_ids)
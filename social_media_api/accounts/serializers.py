@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
-from rest_framework.authtoken.models import Token
+
+import avatars
 
 User = get_user_model()
 
@@ -23,9 +24,6 @@ class RegisterSerializer(serializers.ModelSerializer):
         user.bio = validated_data.get('bio', '')
         user.profile_picture = validated_data.get('profile_picture', None)
         user.save()
-
-        # ✅ Create token for the new user
-        Token.objects.create(user=user)
         return user
 
 
@@ -33,10 +31,90 @@ class LoginSerializer(serializers.Serializer):
     """Serializer for logging in a user."""
     username = serializers.CharField()
     password = serializers.CharField(write_only=True)
+    # name of the client device; logging in again from it replaces its token
+    device = serializers.CharField(required=False, default='', allow_blank=True, max_length=64)
+
+
+class AvatarField(serializers.ReadOnlyField):
+    """
+    URL of a user's profile picture resized for display: the WebP variant
+    nearest `size`, which clients may override with `?avatar_size=`. Until
+    a worker has rendered the variants, this is the uploaded picture.
+    """
+    def __init__(self, size=avatars.DEFAULT_SIZE, **kwargs):
+        self.size = size
+        super().__init__(source='*', **kwargs)
+
+    def requested_size(self):
+        request = self.context.get('request')
+        try:
+            return int(request.query_params['avatar_size'])
+        except (AttributeError, KeyError, ValueError):
+            return self.size
+
+    def to_representation(self, user):
+        picture = user.profile_picture
+        if not picture:
+            return None
+        path = avatars.pick(user.profile_picture_variants, self.requested_size())
+        url = picture.storage.url(path) if path else picture.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request is not None else url
 
 
 class UserSerializer(serializers.ModelSerializer):
     """Serializer for user profile (read/update)."""
+    avatar = AvatarField()
+    followers_count = serializers.IntegerField(source='num_followers', read_only=True)
+    following_count = serializers.IntegerField(source='num_following', read_only=True)
+    posts_count = serializers.IntegerField(source='num_posts', read_only=True)
+    comments_count = serializers.IntegerField(source='num_comments', read_only=True)
+
+    class Meta:
+        model = User
+        fields = [
+            'id', 'username', 'email', 'bio', 'profile_picture', 'avatar',
+            'followers_count', 'following_count', 'posts_count', 'comments_count',
+        ]
+
+
+class FollowUserSerializer(serializers.ModelSerializer):
+    """
+    A user in a follow list, with the requesting user's relationship to
+    them. Views work the relationships out for the whole page at once (see
+    accounts/follows.py) and pass them in `context['relationships']`.
+    """
+    avatar = AvatarField(size=64)
+    followers_count = serializers.IntegerField(source='num_followers', read_only=True)
+    following = serializers.SerializerMethodField()
+    followed_by = serializers.SerializerMethodField()
+    mutual_followers = serializers.SerializerMethodField()
+
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'bio', 'profile_picture']
+        fields = ['id', 'username', 'avatar', 'followers_count', 'following', 'followed_by', 'mutual_followers']
+
+    def relationships(self):
+        return self.context.get('relationships', {})
+
+    def get_following(self, user):
+        return user.pk in self.relationships().get('following', ())
+
+    def get_followed_by(self, user):
+        return user.pk in self.relationships().get('followed_by', ())
+
+    def get_mutual_followers(self, user):
+        return self.relationships().get('mutual_followers', {}).get(user.pk, 0)
+
+
+class BulkFollowSerializer(serializers.Serializer):
+    """Users to follow, by id and/or username (an imported contact list, say)."""
+    LIMIT = 1000
+
+    user_ids = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=LIMIT)
+    usernames = serializers.ListField(child=serializers.CharField(), required=False, max_length=LIMIT)
+
+    def validate(self, attrs):
+        if not attrs.get('user_ids') and not attrs.get('usernames'):
+            raise serializers.ValidationError('Pass user_ids or usernames.')
+        return attrs
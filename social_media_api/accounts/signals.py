@@ -0,0 +1,115 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+import avatars
+from blobstore import references
+
+from .authentication import token_cache
+from .models import AuthToken, User, shifted
+from .tasks import delete_files, process_profile_picture
+
+Follow = User.followers.through
+
+
+def _follow_partners(instance, reverse, pk_set=None):
+    """Ids on the other side of `instance`'s follow edges that actually exist."""
+    if reverse:
+        edges = Follow.objects.filter(to_user=instance)
+        partner = 'from_user_id'
+    else:
+        edges = Follow.objects.filter(from_user=instance)
+        partner = 'to_user_id'
+    if pk_set is not None:
+        edges = edges.filter(**{f'{partner}__in': pk_set})
+    return set(edges.values_list(partner, flat=True))
+
+
+def _shift_counters(instance, reverse, pk_set, delta):
+    """
+    Apply `delta` per edge between `instance` and `pk_set`.
+
+    `user.followers.add(...)` has reverse=False: `instance` gains followers
+    and each id in `pk_set` follows one more user. `user.following.add(...)`
+    has reverse=True and the roles swap.
+    """
+    if not pk_set:
+        return
+    own, others = ('num_following', 'num_followers') if reverse else ('num_followers', 'num_following')
+    User.objects.filter(pk=instance.pk).update(**{own: shifted(own, delta * len(pk_set))})
+    User.objects.filter(pk__in=pk_set).update(**{others: shifted(others, delta)})
+    instance.refresh_from_db(fields=[own])
+
+
+@receiver(m2m_changed, sender=Follow)
+def update_follow_counters(sender, instance, action, reverse, pk_set, **kwargs):
+    # pk_set on remove holds whatever the caller passed, and clear() sends
+    # none at all, so resolve the edges that really go away beforehand.
+    if action in ('pre_remove', 'pre_clear'):
+        instance._removed_follow_ids = _follow_partners(instance, reverse, pk_set)
+    elif action in ('post_remove', 'post_clear'):
+        _shift_counters(instance, reverse, instance.__dict__.pop('_removed_follow_ids', set()), -1)
+    elif action == 'post_add':
+        # Django has already dropped ids that were related before the add
+        _shift_counters(instance, reverse, pk_set, 1)
+
+
+@receiver(pre_delete, sender=User)
+def release_follow_counters(sender, instance, **kwargs):
+    """Cascade deletes of follow rows send no m2m_changed; settle counters here."""
+    User.objects.filter(pk__in=_follow_partners(instance, reverse=False)).update(num_following=shifted('num_following', -1))
+    User.objects.filter(pk__in=_follow_partners(instance, reverse=True)).update(num_followers=shifted('num_followers', -1))
+
+
+@receiver(post_delete, sender=AuthToken)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Logout, token rotation and the purge job delete the AuthToken row."""
+    token_cache.invalidate(instance.digest)
+
+
+@receiver(post_save, sender=User)
+def forget_user_tokens(sender, instance, created, **kwargs):
+    """Cached users must not outlive a change to the user, deactivation above all."""
+    if not created:
+        token_cache.invalidate(*AuthToken.objects.filter(user=instance).values_list('digest', flat=True))
+
+
+
+@receiver(pre_save, sender=User)
+def reset_profile_picture_variants(sender, instance, update_fields=None, **kwargs):
+    """A new upload (or a cleared picture) makes the rendered variants stale."""
+    if 'profile_picture' not in instance.__dict__ or (update_fields and 'profile_picture' not in update_fields):
+        return
+    picture = instance.profile_picture
+    # the field writes uploads to storage after this signal, so new ones are still uncommitted
+    instance._new_profile_picture = bool(picture) and not picture._committed
+    if picture and not instance._new_profile_picture:
+        return
+    stale = instance.profile_picture_variants
+    if instance._new_profile_picture and instance.pk:
+        # the instance may predate the last render; the row has the variants to drop
+        stale = User.objects.filter(pk=instance.pk).values_list('profile_picture_variants', flat=True).first()
+    instance.profile_picture_variants = {}
+    if stale:
+        delete_files.enqueue(paths=avatars.variant_paths(stale))
+        if update_fields:
+            User.objects.filter(pk=instance.pk).update(profile_picture_variants={})
+
+
+@receiver(post_save, sender=User)
+def queue_profile_picture(sender, instance, **kwargs):
+    """New uploads get their variants rendered by a worker once this transaction commits."""
+    if instance.__dict__.pop('_new_profile_picture', False):
+        process_profile_picture.enqueue(user_id=instance.pk, name=instance.profile_picture.name)
+
+
+@receiver(post_delete, sender=User)
+def release_profile_picture_variants(sender, instance, **kwargs):
+    if instance.profile_picture_variants:
+        delete_files.enqueue(paths=avatars.variant_paths(instance.profile_picture_variants))
+
+
+@references.register
+def profile_picture_variant_names():
+    variants = User.objects.exclude(profile_picture_variants={}).values_list('profile_picture_variants', flat=True)
+    for by_size in variants.iterator():
+        yield from avatars.variant_paths(by_size)
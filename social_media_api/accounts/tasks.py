@@ -0,0 +1,30 @@
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+import avatars
+from taskqueue.registry import task
+
+from .models import User
+
+
+@task
+def process_profile_picture(user_id, name):
+    """Swap the upload `name` for a stripped, resized copy and record its variants."""
+    user = User.objects.filter(pk=user_id).only('profile_picture', 'profile_picture_variants').first()
+    if user is None or user.profile_picture.name != name:
+        return  # the user or picture is gone, or a newer upload has its own task
+    original, variants = avatars.render(user.profile_picture)
+    # update() sends no post_save, so this does not queue another run
+    updated = User.objects.filter(pk=user_id, profile_picture=name).update(
+        profile_picture=original, profile_picture_variants=variants, updated_at=timezone.now(),
+    )
+    if updated:
+        delete_files([name, *avatars.variant_paths(user.profile_picture_variants)])
+    else:
+        delete_files([original, *avatars.variant_paths(variants)])
+
+
+@task
+def delete_files(paths):
+    for path in paths:
+        default_storage.delete(path)
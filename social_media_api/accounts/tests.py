@@ -1,3 +1,485 @@
-from django.test import TestCase
+import multiprocessing
+import shutil
+import tempfile
+from array import array
+import threading
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+
+import avatars
+from perfmon.stats import registry
+from posts.models import Post, Comment
+from blobstore.models import Blob
+from posts.serializers import UserSimpleSerializer
+from taskqueue.models import Task
+from taskqueue.worker import Worker
+
+from .authentication import token_cache
+from . import recommendations, scoring
+from .models import AuthToken, FollowSuggestions
+from .serializers import UserSerializer
+from .throttling import HashPool, LoginBusy
+
+User = get_user_model()
+
+
+class UserCounterTests(TestCase):
+    def setUp(self):
+        self.alice = User.objects.create_user(username='alice', password='p')
+        self.bob = User.objects.create_user(username='bob', password='p')
+        self.carol = User.objects.create_user(username='carol', password='p')
+
+    def counters(self, user):
+        user.refresh_from_db()
+        return user.num_followers, user.num_following, user.num_posts, user.num_comments
+
+    def test_follow_counters_both_directions(self):
+        self.alice.followers.add(self.bob, self.carol)
+        self.carol.following.add(self.bob)
+        self.alice.followers.add(self.bob)  # already following: no double count
+        self.assertEqual(self.counters(self.alice)[:2], (2, 0))
+        self.assertEqual(self.counters(self.bob)[:2], (1, 1))
+        self.assertEqual(self.counters(self.carol)[:2], (0, 2))
+
+        self.alice.followers.remove(self.bob, self.bob)
+        self.assertEqual(self.counters(self.alice)[:2], (1, 0))
+        self.carol.following.clear()
+        self.assertEqual(self.counters(self.alice)[:2], (0, 0))
+        self.assertEqual(self.counters(self.bob)[:2], (0, 0))
+        self.assertEqual(self.counters(self.carol)[:2], (0, 0))
+
+    def test_deleting_user_releases_counters(self):
+        self.alice.followers.add(self.bob)
+        self.bob.delete()
+        self.assertEqual(self.counters(self.alice)[0], 0)
+
+    def test_post_and_comment_counters(self):
+        post = Post.objects.create(author=self.alice, title='t', content='c')
+        Comment.objects.create(post=post, author=self.bob, content='x')
+        self.assertEqual(self.counters(self.alice)[2], 1)
+        self.assertEqual(self.counters(self.bob)[3], 1)
+        post.delete()
+        self.assertEqual(self.counters(self.alice)[2], 0)
+        self.assertEqual(self.counters(self.bob)[3], 0)
+
+    def test_decrements_stop_at_zero(self):
+        self.alice.followers.add(self.bob)
+        Post.objects.create(author=self.alice, title='t', content='c')
+        # as for rows that predate the counters
+        User.objects.update(num_followers=0, num_following=0, num_posts=0)
+        self.alice.followers.remove(self.bob)
+        Post.objects.get().delete()
+        self.assertEqual(self.counters(self.alice), (0, 0, 0, 0))
+        self.assertEqual(self.counters(self.bob), (0, 0, 0, 0))
+
+    def test_recount_repairs_drift(self):
+        self.alice.followers.add(self.bob)
+        Post.objects.create(author=self.alice, title='t', content='c')
+        User.objects.update(num_followers=7, num_posts=0)
+        out = StringIO()
+        call_command('recount_user_counters', batch_size=2, stdout=out)
+        self.assertEqual(self.counters(self.alice), (1, 0, 1, 0))
+        self.assertEqual(self.counters(self.bob), (0, 1, 0, 0))
+        self.assertIn('fixed 3', out.getvalue())
+
+
+class AsyncProfileTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', password='p')
+        _, self.key = AuthToken.issue(self.user)
+
+    async def test_token_auth(self):
+        headers = {'Authorization': f'Token {self.key}'}
+        resp = await self.async_client.get('/api/accounts/async/profile/', headers=headers)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['username'], 'u')
+
+    async def test_rejects_anonymous_and_bad_token(self):
+        self.assertEqual((await self.async_client.get('/api/accounts/async/profile/')).status_code, 401)
+        resp = await self.async_client.get('/api/accounts/async/profile/', headers={'Authorization': 'Token nope'})
+        self.assertEqual(resp.status_code, 401)
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        token_cache.clear_local()
+        registry.reset()
+        self.user = User.objects.create_user(username='u', password='p')
+        _, key = AuthToken.issue(self.user)
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {key}'}
+
+    def test_repeat_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get('/api/feed/', **self.auth).status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get('/api/feed/', **self.auth).status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if 'accounts_authtoken' in q['sql']])
+        token_cache.clear_local()
+        self.client.get('/api/feed/', **self.auth)
+        self.assertEqual(registry.counters()['auth.token_cache'], {'miss': 1, 'local_hit': 1, 'shared_hit': 1})
+
+    def test_logout_and_rotation_revoke_cached_tokens(self):
+        self.client.get('/api/feed/', **self.auth)
+        self.assertEqual(self.client.post('/api/accounts/logout/', **self.auth).status_code, 204)
+        self.assertEqual(self.client.get('/api/feed/', **self.auth).status_code, 401)
+
+        _, key = AuthToken.issue(self.user, device='phone')
+        auth = {'HTTP_AUTHORIZATION': f'Token {key}'}
+        new_key = self.client.post('/api/accounts/token/rotate/', **auth).json()['token']
+        self.assertEqual(self.client.get('/api/feed/', **auth).status_code, 401)
+        self.assertEqual(self.client.get('/api/feed/', HTTP_AUTHORIZATION=f'Token {new_key}').status_code, 200)
+
+    def test_deactivation_revokes_cached_tokens(self):
+        self.client.get('/api/feed/', **self.auth)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/feed/', **self.auth).status_code, 401)
+
+
+class AuthTokenTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='u', password='p')
+
+    def login(self, device=''):
+        return self.client.post('/api/accounts/login/', {'username': 'u', 'password': 'p', 'device': device})
+
+    def test_only_prefix_and_digest_are_stored(self):
+        key = self.login().json()['token']
+        token = AuthToken.objects.get()
+        self.assertEqual(token.prefix, key[:8])
+        self.assertNotIn(key, [token.prefix, token.digest])
+        self.assertEqual(self.client.get('/api/feed/', HTTP_AUTHORIZATION=f'Token {key}').status_code, 200)
+
+    def test_one_token_per_device(self):
+        first = self.login('phone').json()['token']
+        self.login('laptop')
+        second = self.login('phone').json()['token']
+        self.assertEqual(sorted(self.user.auth_tokens.values_list('device', flat=True)), ['laptop', 'phone'])
+        self.assertEqual(self.client.get('/api/feed/', HTTP_AUTHORIZATION=f'Token {first}').status_code, 401)
+        self.assertEqual(self.client.get('/api/feed/', HTTP_AUTHORIZATION=f'Token {second}').status_code, 200)
+
+    def test_expired_tokens_are_rejected_and_purged(self):
+        token, key = AuthToken.issue(self.user, device='old')
+        AuthToken.issue(self.user, device='new')
+        AuthToken.objects.filter(pk=token.pk).update(expires_at=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(self.client.get('/api/feed/', HTTP_AUTHORIZATION=f'Token {key}').status_code, 401)
+        call_command('purge_expired_tokens', stdout=StringIO())
+        self.assertEqual(list(AuthToken.objects.values_list('device', flat=True)), ['new'])
+
+    def test_migrated_legacy_key_still_works(self):
+        legacy = 'a' * 40
+        AuthToken.objects.create(user=self.user, device='legacy', prefix=AuthToken.prefix_of(legacy),
+                                 digest=AuthToken.digest_of(legacy), expires_at=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.client.get('/api/feed/', HTTP_AUTHORIZATION=f'Token {legacy}').status_code, 200)
+
+
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+        User.objects.create_user(username='u', password='p')
+
+    def login(self, username, password='wrong', ip='10.0.0.1'):
+        return self.client.post('/api/accounts/login/', {'username': username, 'password': password}, REMOTE_ADDR=ip)
+
+    @override_settings(LOGIN_THROTTLE={'USERNAME_CAPACITY': 3})
+    def test_username_bucket_rejects_before_hashing(self):
+        for ip in ('10.0.0.1', '10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.login('U', ip=ip).status_code, 401)
+        resp = self.login('u', password='p', ip='10.0.0.4')
+        self.assertEqual(resp.status_code, 429)
+        self.assertIn('Retry-After', resp)
+        self.assertEqual(registry.counters()['auth.login'], {'rejected_username': 1})
+        self.assertEqual(registry.snapshot()['auth.password_hash']['latency_ms']['count'], 3)
+
+    @override_settings(LOGIN_THROTTLE={'IP_CAPACITY': 2})
+    def test_ip_bucket(self):
+        self.login('a')
+        self.login('b')
+        self.assertEqual(self.login('c').status_code, 429)
+        self.assertEqual(self.login('c', ip='10.0.0.9').status_code, 401)
+
+    def test_hash_pool_sheds_load_when_full(self):
+        pool = HashPool(workers=1, queue_limit=0)
+        started, release = threading.Event(), threading.Event()
+
+        def hash_slowly():
+            started.set()
+            release.wait()
+
+        worker = threading.Thread(target=pool.run, args=(hash_slowly,))
+        worker.start()
+        started.wait()
+        try:
+            with self.assertRaises(LoginBusy):
+                pool.run(lambda: None)
+        finally:
+            release.set()
+            worker.join()
+        self.assertIsNone(pool.run(lambda: None))
+        self.assertEqual(registry.counters()['auth.login'], {'rejected_busy': 1})
+
+
+def camera_jpeg(size=(2000, 1500), color='teal'):
+    image = Image.new('RGB', size, color)
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera Maker'
+    exif[0x0112] = 6  # orientation: rotate 90 degrees clockwise to display
+    buffer = BytesIO()
+    image.save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class ProfilePictureTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.user = User.objects.create_user(username='alice', password='p')
+
+    def upload(self, **kwargs):
+        self.user.profile_picture = camera_jpeg(**kwargs)
+        self.user.save()
+        return self.user.profile_picture.name
+
+    def refs(self, *names):
+        return [Blob.objects.get(name=name).refs for name in names]
+
+    def test_upload_is_processed_off_the_request(self):
+        upload = self.upload()
+        self.assertEqual(Task.objects.get().kwargs, {'user_id': self.user.pk, 'name': upload})
+        Worker().run(burst=True)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.refs(upload), [0])
+        with default_storage.open(self.user.profile_picture.name) as fh:
+            original = Image.open(fh)
+            # the EXIF rotation is applied, then dropped with the rest of the metadata
+            self.assertEqual(original.size, (768, 1024))
+            self.assertFalse(original.getexif())
+        self.assertEqual(sorted(self.user.profile_picture_variants), ['256', '64'])
+        with default_storage.open(self.user.profile_picture_variants['64']['webp']) as fh:
+            thumbnail = Image.open(fh)
+            self.assertEqual((thumbnail.format, thumbnail.size), ('WEBP', (64, 64)))
+
+    def test_serializers_pick_a_size(self):
+        upload = self.upload()
+        self.assertTrue(UserSimpleSerializer(self.user).data['avatar'].endswith(upload))
+        Worker().run(burst=True)
+        self.user.refresh_from_db()
+        small, large = (default_storage.url(self.user.profile_picture_variants[s]['webp']) for s in ('64', '256'))
+        self.assertEqual(UserSimpleSerializer(self.user).data['avatar'], small)
+        self.assertEqual(UserSerializer(self.user).data['avatar'], large)
+
+        self.client.force_login(self.user)
+        response = self.client.get('/api/accounts/profile/', {'avatar_size': 100})
+        self.assertTrue(response.json()['avatar'].endswith(large))
+
+    def test_replacing_the_picture_releases_old_variants(self):
+        self.upload()
+        Worker().run(burst=True)
+        self.user.refresh_from_db()
+        old = avatars.variant_paths(self.user.profile_picture_variants)
+        self.upload(color='navy')
+        self.assertEqual(User.objects.get(pk=self.user.pk).profile_picture_variants, {})
+        Worker().run(burst=True)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.refs(*old), [0] * 4)
+        self.assertEqual(self.refs(*avatars.variant_paths(self.user.profile_picture_variants)), [1] * 4)
+
+    def test_identical_uploads_share_files(self):
+        self.upload()
+        bob = User.objects.create_user(username='bob', password='p', profile_picture=camera_jpeg())
+        Worker().run(burst=True)
+        self.user.refresh_from_db()
+        bob.refresh_from_db()
+        self.assertEqual(bob.profile_picture_variants, self.user.profile_picture_variants)
+        self.assertEqual(self.refs(bob.profile_picture.name), [2])
+
+    def test_saves_without_a_new_picture_queue_nothing(self):
+        self.upload()
+        Worker().run(burst=True)
+        self.user.refresh_from_db()
+        self.user.bio = 'hello'
+        self.user.save()
+        self.assertFalse(Task.objects.exists())
+
+
+class FollowAPITests(TestCase):
+    def setUp(self):
+        self.me = User.objects.create_user(username='me', password='p')
+        self.users = User.objects.bulk_create([User(username=f'user{i}') for i in range(25)])
+        self.client.force_login(self.me)
+
+    def test_follow_and_unfollow(self):
+        target = self.users[0]
+        Post.objects.create(author=target, title='t', content='c')
+        url = f'/api/accounts/users/{target.pk}/follow/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.client.post(url).status_code, 200)
+        target.refresh_from_db()
+        self.assertEqual(target.num_followers, 1)
+        self.assertEqual(self.me.timeline.count(), 1)
+
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(self.me.following.exists())
+        self.assertEqual(self.me.timeline.count(), 0)
+        self.assertEqual(self.client.post(f'/api/accounts/users/{self.me.pk}/follow/').status_code, 400)
+        self.assertEqual(self.client.post('/api/accounts/users/0/follow/').status_code, 404)
+
+    def test_bulk_follow_costs_the_same_for_any_number_of_users(self):
+        for user in self.users:
+            Post.objects.create(author=user, title='t', content='c')
+        self.me.following.add(self.users[0])
+
+        def bulk(users):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post('/api/accounts/follow/bulk/', {
+                    'user_ids': [u.pk for u in users] + [0],
+                    'usernames': ['nobody', self.me.username],
+                }, content_type='application/json')
+            return response.json(), len(queries)
+
+        data, few = bulk(self.users[:3])
+        self.assertEqual(data['followed'], [self.users[1].pk, self.users[2].pk])
+        self.assertEqual(data['already_following'], [self.users[0].pk])
+        self.assertEqual(data['not_found'], {'user_ids': [0], 'usernames': ['nobody']})
+        _, many = bulk(self.users[3:])
+        self.assertEqual(few, many)
+        self.assertEqual(self.me.following.count(), 25)
+        self.assertEqual(self.me.timeline.count(), 25)
+
+    def test_follower_pages_are_keyset_paginated_with_relationships(self):
+        target, newest = self.users[0], self.users[24]
+        target.followers.add(*self.users[1:])
+        self.me.following.add(target, newest)
+        self.me.followers.add(newest)
+        url = f'/api/accounts/users/{target.pk}/followers/'
+
+        # session, user, existence check, page, relationships, mutual counts
+        with self.assertNumQueries(6):
+            first = self.client.get(url).json()
+        self.assertEqual([row['id'] for row in first['results'][:2]], [self.me.pk, newest.pk])
+        self.assertEqual(
+            {k: first['results'][1][k] for k in ('following', 'followed_by', 'mutual_followers')},
+            {'following': True, 'followed_by': True, 'mutual_followers': 0},
+        )
+        self.assertFalse(first['results'][2]['following'])
+
+        second = self.client.get(first['next']).json()
+        self.assertIsNone(second['next'])
+        seen = [row['id'] for row in first['results'] + second['results']]
+        self.assertEqual((len(first['results']), len(set(seen))), (20, 25))
+
+    def test_mutual_followers(self):
+        target = self.users[0]
+        self.me.following.add(self.users[1], self.users[2])
+        target.followers.add(self.users[1], self.users[2], self.users[3])
+
+        response = self.client.get(f'/api/accounts/users/{target.pk}/mutual-followers/').json()
+        self.assertEqual({row['id'] for row in response['results']}, {self.users[1].pk, self.users[2].pk})
+
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/accounts/relationships/', {'ids': f'{target.pk},{self.users[1].pk}'})
+        self.assertEqual(response.json()['results'], [
+            {'id': target.pk, 'following': False, 'followed_by': False, 'mutual_followers': 2},
+            {'id': self.users[1].pk, 'following': True, 'followed_by': False, 'mutual_followers': 0},
+        ])
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        names = ['me', 'a', 'b', 'c', 'd', 'star', 'x']
+        self.u = {name: user for name, user in zip(names, User.objects.bulk_create([User(username=n) for n in names]))}
+        u = self.u
+        u['me'].following.add(u['a'], u['b'])
+        u['a'].following.add(u['c'], u['d'], u['me'])
+        u['b'].following.add(u['c'])
+        u['star'].followers.add(u['a'], u['b'], u['c'], u['d'])
+
+    def suggested(self, name):
+        return [pk for pk, _ in FollowSuggestions.objects.get(user=self.u[name]).suggestions]
+
+    def test_friends_of_friends_rank_first_then_popular(self):
+        run = recommendations.compute()
+        self.assertTrue(run.full)
+        u = self.u
+        # c and star are followed by both a and b; b follows fewer people, so it counts more
+        self.assertEqual(self.suggested('me'), [u['c'].pk, u['star'].pk, u['d'].pk, u['x'].pk])
+        scores = dict(FollowSuggestions.objects.get(user=u['me']).suggestions)
+        self.assertGreater(scores[u['c'].pk], scores[u['d'].pk])
+        self.assertEqual(scores[u['x'].pk], 0)
+
+    def test_incremental_runs_rescore_affected_users_only(self):
+        recommendations.compute()
+        u = self.u
+        u['b'].following.add(u['x'])
+        run = recommendations.compute()
+        self.assertFalse(run.full)
+        # b follows someone new: b and b's followers (me) are rescored
+        self.assertEqual(run.users, 2)
+        self.assertEqual(recommendations.compute().users, 0)
+
+    def test_parallel_full_run_matches_serial(self):
+        recommendations.compute(workers=1)
+        serial = dict(FollowSuggestions.objects.values_list('user', 'suggestions'))
+        with mock.patch.object(recommendations, 'CHUNK_SIZE', 2):
+            recommendations.compute(full=True, workers=2)
+        self.assertEqual(dict(FollowSuggestions.objects.values_list('user', 'suggestions')), serial)
+
+    def test_parallel_run_under_spawn(self):
+        # spawned workers import the scoring module before Django is set up
+        recommendations.compute(workers=1)
+        serial = dict(FollowSuggestions.objects.values_list('user', 'suggestions'))
+        spawn = multiprocessing.get_context('spawn')
+        with mock.patch.object(recommendations.multiprocessing, 'Pool', spawn.Pool), \
+                mock.patch.object(recommendations, 'CHUNK_SIZE', 2):
+            recommendations.compute(full=True, workers=2)
+        self.assertEqual(dict(FollowSuggestions.objects.values_list('user', 'suggestions')), serial)
+
+    def test_partial_graph_holds_the_two_hop_neighbourhood(self):
+        u = self.u
+        offsets, targets = recommendations.load_graph([u['me'].pk])
+        scorer = scoring.Scorer(offsets, targets, [], 10, 10)
+        self.assertEqual(set(scorer.following(u['a'].pk)), {u['c'].pk, u['d'].pk, u['me'].pk, u['star'].pk})
+        self.assertEqual(list(scorer.following(u['c'].pk)), [])
+        self.assertEqual(scorer.suggest(u['me'].pk), scoring.Scorer(*recommendations.load_graph(), [], 10, 10).suggest(u['me'].pk))
+
+    def test_long_rows_are_sampled_not_truncated(self):
+        offsets, targets = array('q', [0, 0, 100]), array('q', range(100))
+        scoring.shuffle_long_rows(offsets, targets, 10)
+        self.assertEqual(sorted(targets), list(range(100)))
+        self.assertNotEqual(list(targets[:10]), list(range(10)))
+        again = array('q', range(100))
+        scoring.shuffle_long_rows(offsets, again, 10)
+        self.assertEqual(again, targets)
+
+    def test_endpoint_skips_users_followed_since(self):
+        recommendations.compute()
+        u = self.u
+        u['me'].following.add(u['c'])
+        self.client.force_login(u['me'])
+        results = self.client.get('/api/accounts/suggestions/').json()['results']
+        self.assertEqual([row['id'] for row in results], [u['star'].pk, u['d'].pk, u['x'].pk])
+        self.assertEqual(results[0]['reason'], 'followed_by_people_you_follow')
+        self.assertEqual(results[0]['mutual_followers'], 3)  # a, b and now c
+
+        self.client.force_login(u['x'])
+        results = self.client.get('/api/accounts/suggestions/').json()['results']
+        self.assertEqual(results[0], {**results[0], 'id': u['star'].pk, 'reason': 'popular'})
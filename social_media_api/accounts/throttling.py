@@ -0,0 +1,180 @@
+"""
+Login protection.
+
+Each credential check costs a full password hash, so a credential-stuffing
+burst would otherwise eat every worker. Two layers keep it contained:
+
+- `LoginIPThrottle` and `LoginUsernameThrottle` are token buckets kept in
+  the default cache. DRF checks them before the view runs, so rejected
+  attempts never reach the hasher. Buckets are read and written without a
+  lock, so concurrent workers may let a few extra attempts through.
+- `check_credentials` optionally runs `authenticate()` on a small, bounded
+  thread pool (LOGIN_THROTTLE['HASH_WORKERS'] > 0). That caps how much CPU
+  hashing can take at any moment. When HASH_QUEUE_LIMIT attempts are
+  already waiting, new ones are refused with 503 instead of piling up.
+
+Rejections are counted in perfmon's registry under 'auth.login', and
+credential-check latency is recorded as 'auth.password_hash'.
+"""
+import hashlib
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth import authenticate
+from django.core.cache import cache
+from django.db import close_old_connections
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import BaseThrottle
+
+from perfmon.stats import registry
+
+DEFAULTS = {
+    'IP_CAPACITY': 20,
+    'IP_REFILL_PER_MINUTE': 10,
+    'USERNAME_CAPACITY': 5,
+    'USERNAME_REFILL_PER_MINUTE': 1,
+    'HASH_WORKERS': 0,
+    'HASH_QUEUE_LIMIT': 16,
+    'HASH_TIMEOUT': 10,
+}
+
+STATS_NAME = 'auth.login'
+
+
+def get_setting(name):
+    return getattr(settings, 'LOGIN_THROTTLE', {}).get(name, DEFAULTS[name])
+
+
+class LoginBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many logins in progress, try again shortly.'
+    default_code = 'login_busy'
+
+
+class TokenBucket:
+    def __init__(self, scope, capacity, refill_per_minute):
+        self.scope = scope
+        self.capacity = capacity
+        self.rate = refill_per_minute / 60
+
+    def key(self, ident):
+        return f'throttle:{self.scope}:' + hashlib.sha256(ident.encode()).hexdigest()
+
+    def consume(self, ident, now=None):
+        """Take one token; return 0 if allowed, else seconds until one is available."""
+        now = time.time() if now is None else now
+        key = self.key(ident)
+        tokens, stamp = cache.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - stamp) * self.rate)
+        if tokens < 1:
+            return (1 - tokens) / self.rate
+        # once full again the bucket is indistinguishable from a missing key
+        cache.set(key, (tokens - 1, now), math.ceil(self.capacity / self.rate))
+        return 0
+
+
+class BucketThrottle(BaseThrottle):
+    scope = None
+
+    def get_bucket(self):
+        scope = self.scope.upper()
+        return TokenBucket(
+            f'login_{self.scope}', get_setting(f'{scope}_CAPACITY'), get_setting(f'{scope}_REFILL_PER_MINUTE')
+        )
+
+    def get_bucket_ident(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.wait_seconds = None
+        ident = self.get_bucket_ident(request)
+        if not ident:
+            return True
+        wait = self.get_bucket().consume(ident)
+        if wait:
+            self.wait_seconds = wait
+            registry.count(STATS_NAME, f'rejected_{self.scope}')
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class LoginIPThrottle(BucketThrottle):
+    scope = 'ip'
+
+    def get_bucket_ident(self, request):
+        return self.get_ident(request)
+
+
+class LoginUsernameThrottle(BucketThrottle):
+    scope = 'username'
+
+    def get_bucket_ident(self, request):
+        username = request.data.get('username') if hasattr(request.data, 'get') else None
+        return username.strip().lower() if isinstance(username, str) else None
+
+
+class HashPool:
+    """A thread pool that refuses work once `workers + queue_limit` tasks are in flight."""
+
+    def __init__(self, workers, queue_limit):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+
+    def run(self, fn, *args, timeout=None):
+        if not self._slots.acquire(blocking=False):
+            registry.count(STATS_NAME, 'rejected_busy')
+            raise LoginBusy()
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout)
+        except FutureTimeout:
+            registry.count(STATS_NAME, 'timed_out')
+            raise LoginBusy()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hash_pool():
+    """The shared pool, or None when LOGIN_THROTTLE['HASH_WORKERS'] is 0."""
+    global _pool
+    workers = get_setting('HASH_WORKERS')
+    if not workers:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = HashPool(workers, get_setting('HASH_QUEUE_LIMIT'))
+    return _pool
+
+
+def _authenticate_in_worker(request, username, password):
+    try:
+        return authenticate(request, username=username, password=password)
+    finally:
+        close_old_connections()
+
+
+def check_credentials(request, username, password):
+    """`authenticate()`, on the hash pool when one is configured, timed."""
+    start = time.perf_counter()
+    try:
+        pool = get_hash_pool()
+        if pool is None:
+            return authenticate(request, username=username, password=password)
+        return pool.run(_authenticate_in_worker, request, username, password, timeout=get_setting('HASH_TIMEOUT'))
+    finally:
+        registry.observe('auth.password_hash', 'latency_ms', (time.perf_counter() - start) * 1000)
@@ -1,8 +1,23 @@
 from django.urls import path
-from .views import RegisterAPIView, LoginAPIView, ProfileAPIView
+from .views import (
+    BulkFollowAPIView, FollowAPIView, FollowersAPIView, FollowingAPIView, LoginAPIView, LogoutAPIView,
+    MutualFollowersAPIView, ProfileAPIView, RegisterAPIView, RelationshipsAPIView, RotateTokenAPIView,
+    SuggestionsAPIView,
+)
+from . import async_views
 
 urlpatterns = [
     path('register/', RegisterAPIView.as_view(), name='register'),
     path('login/', LoginAPIView.as_view(), name='login'),
+    path('logout/', LogoutAPIView.as_view(), name='logout'),
+    path('token/rotate/', RotateTokenAPIView.as_view(), name='rotate-token'),
     path('profile/', ProfileAPIView.as_view(), name='profile'),
+    path('async/profile/', async_views.profile, name='async-profile'),
+    path('users/<int:pk>/follow/', FollowAPIView.as_view(), name='follow'),
+    path('users/<int:pk>/followers/', FollowersAPIView.as_view(), name='followers'),
+    path('users/<int:pk>/following/', FollowingAPIView.as_view(), name='following'),
+    path('users/<int:pk>/mutual-followers/', MutualFollowersAPIView.as_view(), name='mutual-followers'),
+    path('follow/bulk/', BulkFollowAPIView.as_view(), name='bulk-follow'),
+    path('relationships/', RelationshipsAPIView.as_view(), name='relationships'),
+    path('suggestions/', SuggestionsAPIView.as_view(), name='suggestions'),
 ]
@@ -1,10 +1,18 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.contrib.auth import authenticate, get_user_model
-from rest_framework.authtoken.models import Token
-from rest_framework.generics import RetrieveUpdateAPIView
-from .serializers import RegisterSerializer, UserSerializer, LoginSerializer
+from django.contrib.auth import get_user_model, logout
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.generics import ListAPIView, RetrieveUpdateAPIView
+from posts.pagination import KeysetPagination
+from . import follows, recommendations
+from .models import AuthToken, FollowSuggestions
+from .serializers import (
+    BulkFollowSerializer, FollowUserSerializer, LoginSerializer, RegisterSerializer, UserSerializer,
+)
+from .throttling import LoginIPThrottle, LoginUsernameThrottle, check_credentials
 
 User = get_user_model()
 
@@ -17,9 +25,10 @@ class RegisterAPIView(APIView):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-            token, _ = Token.objects.get_or_create(user=user)  # ✅ FIXED
+            token, key = AuthToken.issue(user)
             return Response({
-                'token': token.key,
+                'token': key,
+                'expires_at': token.expires_at,
                 'user': UserSerializer(user, context={'request': request}).data
             }, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -28,6 +37,8 @@ class RegisterAPIView(APIView):
 class LoginAPIView(APIView):
     """Handles user login and token retrieval."""
     permission_classes = [permissions.AllowAny]
+    # rejected attempts are turned away before any password hashing
+    throttle_classes = [LoginIPThrottle, LoginUsernameThrottle]
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
@@ -35,13 +46,14 @@ class LoginAPIView(APIView):
         username = serializer.validated_data['username']
         password = serializer.validated_data['password']
 
-        user = authenticate(request, username=username, password=password)
+        user = check_credentials(request, username, password)
         if not user:
             return Response({'detail': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
 
-        token, _ = Token.objects.get_or_create(user=user)
+        token, key = AuthToken.issue(user, device=serializer.validated_data['device'])
         return Response({
-            'token': token.key,
+            'token': key,
+            'expires_at': token.expires_at,
             'user': UserSerializer(user, context={'request': request}).data
         })
 
@@ -52,4 +64,179 @@ class ProfileAPIView(RetrieveUpdateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
-        return self.request.user
+        # request.user may come from the token cache, with stale counters
+        return User.objects.get(pk=self.request.user.pk)
+
+
+class LogoutAPIView(APIView):
+    """Deletes the token the request was made with and ends the session."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        if isinstance(request.auth, AuthToken):
+            request.auth.delete()
+        logout(request)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class RotateTokenAPIView(APIView):
+    """Replaces the token the request was made with by a new one for the same device."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        device = request.auth.device if isinstance(request.auth, AuthToken) else ''
+        token, key = AuthToken.issue(request.user, device=device)
+        return Response({'token': key, 'expires_at': token.expires_at})
+
+
+def relationship_context(user, ids):
+    """Everything `FollowUserSerializer` shows about `ids`, in two queries."""
+    following, followed_by = follows.relationships(user, ids)
+    return {
+        'following': following,
+        'followed_by': followed_by,
+        'mutual_followers': follows.mutual_follower_counts(user, ids),
+    }
+
+
+class FollowAPIView(APIView):
+    """POST follows the user, DELETE unfollows them."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk):
+        target = get_object_or_404(User.objects.only('pk'), pk=pk)
+        if target.pk == request.user.pk:
+            raise ValidationError({'detail': 'You cannot follow yourself.'})
+        created = bool(follows.follow_many(request.user, [target.pk]))
+        return Response({'following': True}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def delete(self, request, pk):
+        request.user.following.remove(pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class BulkFollowAPIView(APIView):
+    """Follows up to 1000 users at once, given by id and/or username."""
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkFollowSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = set(serializer.validated_data.get('user_ids', []))
+        usernames = set(serializer.validated_data.get('usernames', []))
+
+        found = dict(User.objects.filter(Q(pk__in=ids) | Q(username__in=usernames)).values_list('pk', 'username'))
+        new = follows.follow_many(request.user, found)
+        return Response({
+            'followed': sorted(new),
+            'already_following': sorted(set(found) - new - {request.user.pk}),
+            'not_found': {
+                'user_ids': sorted(ids - set(found)),
+                'usernames': sorted(usernames - set(found.values())),
+            },
+        })
+
+
+class FollowPagination(KeysetPagination):
+    page_size = 20
+
+
+class FollowListAPIView(ListAPIView):
+    """
+    A keyset-paginated list of users related to user `pk`, most recent
+    follow first. Costs four queries per page however long the list is.
+    """
+    serializer_class = FollowUserSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FollowPagination
+    # attribute of each follow edge that holds the listed user
+    user_field = None
+
+    def get_edges(self, user_id):
+        raise NotImplementedError
+
+    def get_queryset(self):
+        if not User.objects.filter(pk=self.kwargs['pk']).exists():
+            raise NotFound('No such user.')
+        return self.get_edges(self.kwargs['pk'])
+
+    def list(self, request, *args, **kwargs):
+        edges = self.paginate_queryset(self.get_queryset())
+        users = [getattr(edge, self.user_field) for edge in edges]
+        context = self.get_serializer_context()
+        context['relationships'] = relationship_context(request.user, [user.pk for user in users])
+        return self.get_paginated_response(FollowUserSerializer(users, many=True, context=context).data)
+
+
+class FollowersAPIView(FollowListAPIView):
+    user_field = 'to_user'
+
+    def get_edges(self, user_id):
+        return follows.followers_of(user_id)
+
+
+class FollowingAPIView(FollowListAPIView):
+    user_field = 'from_user'
+
+    def get_edges(self, user_id):
+        return follows.following_of(user_id)
+
+
+class MutualFollowersAPIView(FollowListAPIView):
+    """Users the requesting user follows who also follow user `pk`."""
+    user_field = 'to_user'
+
+    def get_edges(self, user_id):
+        return follows.mutual_followers(self.request.user, user_id)
+
+
+class RelationshipsAPIView(APIView):
+    """The requesting user's relationship to each of `?ids=1,2,3` (up to 100), in two queries."""
+    permission_classes = [permissions.IsAuthenticated]
+    max_ids = 100
+
+    def get(self, request):
+        try:
+            ids = [int(pk) for pk in request.query_params.get('ids', '').split(',') if pk.strip()]
+        except ValueError:
+            raise ValidationError({'ids': 'Pass a comma-separated list of user ids.'})
+        if len(ids) > self.max_ids:
+            raise ValidationError({'ids': f'At most {self.max_ids} ids at a time.'})
+        context = relationship_context(request.user, ids)
+        return Response({'results': [
+            {
+                'id': pk,
+                'following': pk in context['following'],
+                'followed_by': pk in context['followed_by'],
+                'mutual_followers': context['mutual_followers'].get(pk, 0),
+            }
+            for pk in dict.fromkeys(ids)
+        ]})
+
+
+class SuggestionsAPIView(APIView):
+    """
+    Who to follow: the list `compute_suggestions` stored for the requesting
+    user, minus anyone followed since. Users the job has not reached yet get
+    the most followed users instead.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        stored = FollowSuggestions.objects.filter(user=request.user).values_list('suggestions', flat=True).first()
+        entries = stored if stored is not None else [[pk, 0] for pk in recommendations.popular_ids()]
+        scores = {pk: score for pk, score in entries if pk != request.user.pk}
+
+        context = self.get_serializer_context(request, list(scores))
+        users = User.objects.filter(is_active=True).in_bulk(list(scores))
+        results = []
+        for pk, score in scores.items():
+            if pk in users and pk not in context['relationships']['following']:
+                row = FollowUserSerializer(users[pk], context=context).data
+                row['score'] = score
+                row['reason'] = 'followed_by_people_you_follow' if score else 'popular'
+                results.append(row)
+        return Response({'results': results[:recommendations.get_setting('TOP_K')]})
+
+    def get_serializer_context(self, request, ids):
+        return {'request': request, 'relationships': relationship_context(request.user, ids)}
@@ -0,0 +1,87 @@
+"""
+Async (ASGI-native) versions of the hot read endpoints.
+
+Under ASGI, DRF's synchronous views run whole, serialization included, on
+the thread that `sync_to_async` reserves for sync code, so requests queue
+behind each other there. These views only leave the event loop for the
+queries themselves (`acount`, `aiterator`, `aget`). Serialization runs on
+objects that are already fully loaded, so the DRF serializers never touch
+the database from async code.
+
+Requests are wrapped in a DRF `Request` and go through the same filterset,
+pagination and serializers as the DRF endpoints. Responses have the same
+shape, `?avatar_size=` included, and bad parameters get the same 400 or
+404. Filtering by an id checks that the row exists, which takes one hop
+to the sync thread. Search, ordering and cursors stay on the sync
+endpoints.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views.decorators.http import require_safe
+from django_filters import utils as filter_utils
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+
+from .models import Comment, Post
+from .pagination import StandardResultsSetPagination
+from .serializers import CommentSerializer, PostSerializer
+from .views import CommentViewSet, PostViewSet
+
+
+def api_view(view):
+    """Allow only GET/HEAD, hand the view a DRF `Request` and render API errors as DRF does."""
+    @require_safe
+    @wraps(view)
+    async def wrapped(request, *args, **kwargs):
+        try:
+            return await view(Request(request), *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+            return JsonResponse(data, status=exc.status_code, safe=False)
+    return wrapped
+
+
+async def _filter(request, queryset, viewset):
+    """Apply `viewset`'s filterset fields, raising the 400 DjangoFilterBackend would."""
+    filterset = DjangoFilterBackend().get_filterset(request, queryset, viewset)
+    if any(name in request.query_params for name in filterset.filters):
+        # model choice filters look the id up
+        valid = await sync_to_async(filterset.is_valid)()
+    else:
+        valid = filterset.is_valid()
+    if not valid:
+        raise filter_utils.translate_validation(filterset.errors)
+    return filterset.qs
+
+
+async def _paginated(request, queryset, serializer_class):
+    pagination = StandardResultsSetPagination()
+    objs = await pagination.apaginate_queryset(queryset, request)
+    data = serializer_class(objs, many=True, context={'request': request}).data
+    return JsonResponse(pagination.get_paginated_response(data).data)
+
+
+@api_view
+async def post_list(request):
+    posts = Post.objects.select_related('author').with_comments(limit=PostViewSet.comments_per_post)
+    posts = (await _filter(request, posts, PostViewSet)).order_by('-created_at', '-id')
+    return await _paginated(request, posts, PostSerializer)
+
+
+@api_view
+async def post_detail(request, pk):
+    try:
+        post = await Post.objects.select_related('author').with_comments().aget(pk=pk)
+    except Post.DoesNotExist:
+        raise NotFound()
+    return JsonResponse(PostSerializer(post, context={'request': request}).data)
+
+
+@api_view
+async def comment_list(request):
+    comments = Comment.objects.select_related('author')
+    comments = (await _filter(request, comments, CommentViewSet)).order_by('created_at', 'id')
+    return await _paginated(request, comments, CommentSerializer)
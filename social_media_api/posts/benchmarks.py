@@ -0,0 +1,78 @@
+"""Benchmark data and endpoints: posts, comments and home feeds."""
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from accounts.models import User
+from perfmon.bench import benchmark, explicit_timestamps, seeder
+
+from .feed import fanout_limit
+from .models import Comment, Post, TimelineEntry
+
+POSTS = 4000
+COMMENTS = 10000
+BATCH_SIZE = 5000
+
+
+@seeder
+def posts(suite):
+    rng = suite.rng
+    user_ids = suite.data['user_ids']
+    start = timezone.now() - timedelta(days=365)
+
+    n_posts = suite.size(POSTS)
+    step = timedelta(days=365) / n_posts
+    with explicit_timestamps(Post, 'created_at', 'updated_at'):
+        Post.objects.bulk_create(
+            (
+                Post(author_id=rng.choice(user_ids), title=f'Post {i}', content=f'Benchmark post number {i}. ' * 5,
+                     created_at=start + i * step, updated_at=start + i * step)
+                for i in range(n_posts)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    span = Post.objects.aggregate(first=Min('pk'), last=Max('pk'))
+
+    n_comments = suite.size(COMMENTS)
+    step = timedelta(days=365) / n_comments
+    with explicit_timestamps(Comment, 'created_at', 'updated_at'):
+        Comment.objects.bulk_create(
+            (
+                Comment(post_id=rng.randint(span['first'], span['last']), author_id=rng.choice(user_ids),
+                        content=f'Comment {i}', created_at=start + i * step, updated_at=start + i * step)
+                for i in range(n_comments)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    call_command('recount_user_counters', stdout=StringIO())
+
+    # Read the feed as the user following the most people. Their timeline
+    # holds what fan-out-on-write would have produced: their own posts and
+    # those of every followed author below the fan-out limit.
+    reader = User.objects.order_by('-num_following', 'pk').first()
+    pushed_authors = list(reader.following.filter(num_followers__lte=fanout_limit()).values_list('pk', flat=True))
+    timeline = Post.objects.filter(author_id__in=pushed_authors + [reader.pk]).values_list('pk', 'created_at')
+    TimelineEntry.objects.bulk_create(
+        (TimelineEntry(user=reader, post_id=pk, created_at=created_at)
+         for pk, created_at in timeline.iterator(chunk_size=BATCH_SIZE)),
+        batch_size=BATCH_SIZE,
+    )
+    suite.data['reader'] = reader
+
+
+@benchmark('post_list')
+def post_list(client, suite):
+    return client.get('/api/posts/')
+
+
+@benchmark('post_list_cursor')
+def post_list_cursor(client, suite):
+    return client.get('/api/posts/', {'cursor': ''})
+
+
+@benchmark('feed', user='reader')
+def feed(client, suite):
+    return client.get('/api/feed/')
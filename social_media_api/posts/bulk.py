@@ -0,0 +1,176 @@
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from .permissions import IsOwnerOrReadOnly
+
+ATOMIC, PARTIAL = 'atomic', 'partial'
+
+
+class BulkModelMixin:
+    """
+    `/bulk/` endpoint on a ModelViewSet:
+
+    - POST   a list of objects          -> one bulk_create
+    - PATCH  a list of objects with id  -> one bulk_update
+    - DELETE {"ids": [...]}             -> one DELETE ... WHERE id IN (...)
+
+    Every item is validated on its own and errors are reported with the
+    item's index. With `?mode=atomic` (the default) any error rejects the
+    whole request. With `?mode=partial` the valid items are applied and
+    the response is 207 listing the rest. Ownership is checked for all ids
+    with a single query through `IsOwnerOrReadOnly.denied_ids`.
+
+    Subclasses set `bulk_preload` to {serializer field: model} so related
+    ids in the payload are resolved with one `in_bulk` query, and implement
+    `bulk_created(objs)` for side effects normally driven by post_save.
+    `bulk_delete(queryset)` may be overridden to batch what post_delete
+    receivers do per row.
+    """
+    bulk_max_items = 500
+    bulk_preload = {}
+
+    def bulk_created(self, objs):
+        pass
+
+    def bulk_delete(self, queryset):
+        queryset.delete()
+
+    def get_bulk_mode(self):
+        mode = self.request.query_params.get('mode', ATOMIC)
+        if mode not in (ATOMIC, PARTIAL):
+            raise ValidationError({'mode': f'Must be "{ATOMIC}" or "{PARTIAL}".'})
+        return mode
+
+    def get_bulk_items(self):
+        items = self.request.data
+        if not isinstance(items, list):
+            raise ValidationError({'non_field_errors': ['Expected a list of items.']})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError({'non_field_errors': [f'At most {self.bulk_max_items} items per request.']})
+        return items
+
+    def get_bulk_context(self, items):
+        context = self.get_serializer_context()
+        preloaded = {}
+        for field, model in self.bulk_preload.items():
+            ids = {item.get(field) for item in items if isinstance(item, dict)}
+            ids = {pk for pk in ids if isinstance(pk, int) or (isinstance(pk, str) and pk.isdigit())}
+            preloaded[field] = model.objects.in_bulk({int(pk) for pk in ids})
+        context['preloaded'] = preloaded
+        return context
+
+    def get_owner_permission(self):
+        for permission in self.get_permissions():
+            if isinstance(permission, IsOwnerOrReadOnly):
+                return permission
+        return None
+
+    def denied_ids(self, queryset):
+        permission = self.get_owner_permission()
+        if permission is None:
+            return set()
+        return permission.denied_ids(self.request, queryset)
+
+    def bulk_response(self, mode, errors, payload, success_status=status.HTTP_200_OK):
+        if errors and mode == ATOMIC:
+            return Response({'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+        body = dict(payload, errors=errors)
+        return Response(body, status=status.HTTP_207_MULTI_STATUS if errors else success_status)
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request, *args, **kwargs):
+        handler = {'POST': self.bulk_create, 'PATCH': self.bulk_update, 'DELETE': self.bulk_destroy}
+        return handler[request.method](request)
+
+    def bulk_create(self, request):
+        mode = self.get_bulk_mode()
+        items = self.get_bulk_items()
+        context = self.get_bulk_context(items)
+        model = self.get_queryset().model
+
+        objs, errors = [], []
+        for index, item in enumerate(items):
+            serializer = self.get_serializer_class()(data=item, context=context)
+            if serializer.is_valid():
+                objs.append(model(**serializer.validated_data, author=request.user))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+        if errors and mode == ATOMIC:
+            return self.bulk_response(mode, errors, {})
+
+        with transaction.atomic():
+            created = model.objects.bulk_create(objs)
+            self.bulk_created(created)
+        results = self.get_queryset().filter(pk__in=[obj.pk for obj in created]).order_by('pk')
+        data = self.get_serializer(results, many=True).data
+        return self.bulk_response(mode, errors, {'created': data}, status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        mode = self.get_bulk_mode()
+        items = self.get_bulk_items()
+        context = self.get_bulk_context(items)
+        model = self.get_queryset().model
+
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        ids = [pk for pk in ids if isinstance(pk, int)]
+        instances = model.objects.in_bulk(ids)
+        denied = self.denied_ids(model.objects.filter(pk__in=ids))
+
+        objs, fields, errors = [], {'updated_at'}, []
+        now = timezone.now()
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            if pk not in instances:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+                continue
+            if pk in denied:
+                errors.append({'index': index, 'errors': {'detail': IsOwnerOrReadOnly.message}})
+                continue
+            instance = instances[pk]
+            serializer = self.get_serializer_class()(instance, data=item, partial=True, context=context)
+            if not serializer.is_valid():
+                errors.append({'index': index, 'errors': serializer.errors})
+                continue
+            for attr, value in serializer.validated_data.items():
+                setattr(instance, attr, value)
+                fields.add(attr)
+            instance.updated_at = now
+            objs.append(instance)
+        if errors and mode == ATOMIC:
+            return self.bulk_response(mode, errors, {})
+
+        if objs:
+            model.objects.bulk_update(objs, sorted(fields))
+        results = self.get_queryset().filter(pk__in=[obj.pk for obj in objs]).order_by('pk')
+        return self.bulk_response(mode, errors, {'updated': self.get_serializer(results, many=True).data})
+
+    def bulk_destroy(self, request):
+        mode = self.get_bulk_mode()
+        ids = request.data.get('ids') if isinstance(request.data, dict) else None
+        if not isinstance(ids, list) or not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({'ids': ['Expected a list of integer ids.']})
+        if len(ids) > self.bulk_max_items:
+            raise ValidationError({'ids': [f'At most {self.bulk_max_items} ids per request.']})
+
+        model = self.get_queryset().model
+        targets = model.objects.filter(pk__in=ids)
+        existing = set(targets.values_list('pk', flat=True))
+        denied = self.denied_ids(targets)
+
+        errors = []
+        for index, pk in enumerate(ids):
+            if pk not in existing:
+                errors.append({'index': index, 'errors': {'id': ['Not found.']}})
+            elif pk in denied:
+                errors.append({'index': index, 'errors': {'detail': IsOwnerOrReadOnly.message}})
+        if errors and mode == ATOMIC:
+            return self.bulk_response(mode, errors, {})
+
+        allowed = existing - denied
+        with transaction.atomic():
+            self.bulk_delete(model.objects.filter(pk__in=allowed))
+        return self.bulk_response(mode, errors, {'deleted': sorted(allowed)})
@@ -0,0 +1,103 @@
+"""
+Concurrency ceilings of WSGI and ASGI deployments.
+
+The project is driven in-process, so no server or network is involved:
+
+- ``wsgi``: N threads, each with its own test `Client`, like a threaded
+  WSGI server with N worker threads.
+- ``asgi``: N coroutines sharing one `AsyncClient` on one event loop, like
+  a single ASGI worker. Sync views run on asgiref's one thread for sync
+  code; async views only leave the loop for their queries.
+
+Each (mode, concurrency) run reports throughput and p50/p99 latency. The
+ceiling is the lowest concurrency past which throughput grows by less
+than `GAIN`.
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.test import AsyncClient, Client
+
+from perfmon.bench import BenchmarkError, percentile
+
+MODES = ('wsgi', 'asgi')
+# relative throughput gain below which more concurrency no longer helps
+GAIN = 0.10
+
+
+def _summary(latencies, elapsed):
+    return {
+        'rps': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+    }
+
+
+def _check(path, response):
+    if response.status_code != 200:
+        raise BenchmarkError(f'{path} returned {response.status_code}')
+
+
+def run_wsgi(path, concurrency, requests):
+    local = threading.local()
+
+    def hit(_):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        start = time.perf_counter()
+        response = local.client.get(path)
+        elapsed = (time.perf_counter() - start) * 1000
+        _check(path, response)
+        return elapsed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(hit, range(requests)))
+    return _summary(latencies, time.perf_counter() - start)
+
+
+async def _run_asgi(path, concurrency, requests):
+    client = AsyncClient()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def hit():
+        async with slots:
+            start = time.perf_counter()
+            response = await client.get(path)
+            elapsed = (time.perf_counter() - start) * 1000
+        _check(path, response)
+        return elapsed
+
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(hit() for _ in range(requests)))
+    return _summary(latencies, time.perf_counter() - start)
+
+
+def run_asgi(path, concurrency, requests):
+    return asyncio.run(_run_asgi(path, concurrency, requests))
+
+
+RUNNERS = {'wsgi': run_wsgi, 'asgi': run_asgi}
+
+
+def ceiling(rows):
+    """Concurrency level where throughput stops improving, from rows sorted by level."""
+    best = rows[0]
+    for row in rows[1:]:
+        if row['rps'] < best['rps'] * (1 + GAIN):
+            break
+        best = row
+    return best['concurrency']
+
+
+def sweep(path, levels, requests, modes=MODES):
+    """Run `path` at each concurrency level in each mode."""
+    report = {}
+    for mode in modes:
+        rows = []
+        for level in sorted(levels):
+            rows.append(dict(concurrency=level, **RUNNERS[mode](path, level, requests)))
+        report[mode] = {'ceiling': ceiling(rows), 'runs': rows}
+    return report
@@ -0,0 +1,86 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+
+class ConditionalGetMixin:
+    """
+    ETag / Last-Modified support for `list` and `retrieve`.
+
+    Validators cover only the rows a response shows: the page of ids (with
+    the total row count when paginated), each row's `updated_at` and that of
+    the relations in `conditional_embedded`, plus one aggregate over the
+    reverse relation named by `conditional_related` for those ids. Its rows
+    are taken to embed the same relations. A matching If-None-Match or
+    If-Modified-Since gets a 304 before any serializer runs. The ids and
+    counts are part of the ETag so deletes change it too; Last-Modified
+    alone cannot see deletes, so clients should prefer ETags.
+    """
+    conditional_related = None
+    # forward relations serialized inline; their `updated_at` counts too
+    conditional_embedded = ('author',)
+
+    def get_validators(self, queryset, paginate=False):
+        stamps = ['updated_at', *(f'{name}__updated_at' for name in self.conditional_embedded)]
+        rows = queryset.prefetch_related(None).values_list('pk', *stamps)
+        page = self.paginate_queryset(rows) if paginate else None
+        rows = list(rows if page is None else page)
+        ids = [row[0] for row in rows]
+        modified = [stamp for row in rows for stamp in row[1:] if stamp]
+        stats = {'ids': ids}
+        if page is not None:
+            stats['page'] = self.page_state()
+        if self.conditional_related and ids:
+            relation = queryset.model._meta.get_field(self.conditional_related)
+            related = relation.related_model.objects.filter(**{f'{relation.field.name}__in': ids})
+            stats['related'] = related.order_by().aggregate(
+                count=Count('pk'), **{stamp: Max(stamp) for stamp in stamps},
+            )
+            modified += [stamp for key, stamp in stats['related'].items() if key != 'count' and stamp]
+
+        last_modified = max(modified) if modified else None
+        fingerprint = '|'.join([
+            self.request.get_full_path(),
+            self.request.headers.get('Accept', ''),
+            *(str(stats[key]) for key in sorted(stats)),
+        ])
+        etag = '"%s"' % hashlib.md5(fingerprint.encode()).hexdigest()
+        return len(ids), etag, last_modified
+
+    def page_state(self):
+        """What the pagination envelope shows besides the rows: neighbour flags or the row count."""
+        paginator = getattr(self.paginator, 'keyset', None) or self.paginator
+        if hasattr(paginator, 'has_next'):
+            return paginator.has_next, paginator.has_previous
+        return paginator.page.paginator.count
+
+    def conditional_response(self, queryset, respond, *args, paginate=False, **kwargs):
+        count, etag, last_modified = self.get_validators(queryset, paginate)
+        if self.detail and not count:
+            # let the regular path raise the 404
+            return respond(self.request, *args, **kwargs)
+
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+        not_modified = get_conditional_response(self.request, etag=etag, last_modified=timestamp)
+        if not_modified is not None:
+            return not_modified
+
+        response = respond(self.request, *args, **kwargs)
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(queryset, super().list, *args, paginate=True, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional_response(queryset, super().retrieve, *args, **kwargs)
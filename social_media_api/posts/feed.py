@@ -0,0 +1,163 @@
+"""
+Home feed built with fan-out-on-write.
+
+When a post is created a `TimelineEntry` row is written for each follower of
+the author, so reading a feed page is one index range scan sized by the page.
+Authors with more than `FEED_FANOUT_LIMIT` followers are skipped on write;
+their posts are pulled at read time instead (fan-out-on-read) and merged with
+the precomputed timeline.
+"""
+import heapq
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import Post, TimelineEntry
+
+User = get_user_model()
+# `from_user` is the followed user, `to_user` the follower
+Follow = User.followers.through
+
+FANOUT_BATCH_SIZE = 1000
+
+
+def fanout_limit():
+    return getattr(settings, 'FEED_FANOUT_LIMIT', 1000)
+
+
+def is_high_fanout(user_id):
+    """True when `user_id` has too many followers to fan out on write."""
+    # read from the row: an in-memory author (request.user) may predate recent follows
+    followers = User.objects.filter(pk=user_id).values_list('num_followers', flat=True).first()
+    return (followers or 0) > fanout_limit()
+
+
+def pulled_author_ids(user):
+    """Ids of followed authors whose posts are merged in at read time."""
+    return list(user.following.filter(num_followers__gt=fanout_limit()).values_list('pk', flat=True))
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(entries, batch_size=FANOUT_BATCH_SIZE, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Write `post` into the author's own timeline and, unless the author is
+    high-fanout, into every follower's timeline."""
+    entries = [TimelineEntry(user_id=post.author_id, post=post, created_at=post.created_at)]
+    if not is_high_fanout(post.author_id):
+        follower_ids = Follow.objects.filter(from_user=post.author_id).values_list('to_user', flat=True)
+        entries.extend(
+            TimelineEntry(user_id=follower_id, post=post, created_at=post.created_at)
+            for follower_id in follower_ids.iterator(chunk_size=FANOUT_BATCH_SIZE)
+        )
+    _bulk_insert(entries)
+
+
+def backfill_timeline(user_ids, author_ids, limit=None):
+    """
+    Copy the most recent posts of each author into each user's timeline
+    after follows. One query reads the posts, ranked per author with a
+    window function, however many follows were added at once.
+    """
+    limit = limit or getattr(settings, 'FEED_BACKFILL_SIZE', 20)
+    authors = User.objects.filter(pk__in=author_ids, num_followers__lte=fanout_limit()).values('pk')
+    _bulk_insert([
+        TimelineEntry(user_id=user_id, post_id=pk, created_at=created_at)
+        for _, pk, created_at in _recent_posts(Q(author__in=authors), limit)
+        for user_id in user_ids
+    ])
+
+
+def _recent_posts(authors, limit):
+    """(author_id, post_id, created_at) of each author's `limit` newest posts, in one query."""
+    return Post.objects.filter(authors).annotate(
+        rank=Window(RowNumber(), partition_by=F('author'), order_by=[F('created_at').desc(), F('id').desc()]),
+    ).filter(rank__lte=limit).values_list('author_id', 'pk', 'created_at')
+
+
+def backfill_all(batch_size=FANOUT_BATCH_SIZE, limit=None, progress=None):
+    """
+    Fill every user's timeline from the follows and posts already in the
+    database: their own recent posts and those of the authors they follow
+    that are not high-fanout. Safe to re-run; existing entries are kept.
+    Returns the number of users processed.
+    """
+    limit = limit or getattr(settings, 'FEED_BACKFILL_SIZE', 20)
+    users = User.objects.order_by('pk').values_list('pk', flat=True)
+    last, done = 0, 0
+    while batch := list(users.filter(pk__gt=last)[:batch_size]):
+        last = batch[-1]
+        follows = {user_id: {user_id} for user_id in batch}
+        edges = Follow.objects.filter(to_user__in=batch, from_user__num_followers__lte=fanout_limit())
+        for follower, author in edges.values_list('to_user_id', 'from_user_id'):
+            follows[follower].add(author)
+        by_author = {}
+        # the authors go in as a subquery, however many the batch follows
+        authors = Q(author__in=batch) | Q(author__in=edges.values('from_user'))
+        for author, pk, created_at in _recent_posts(authors, limit):
+            by_author.setdefault(author, []).append((pk, created_at))
+        _bulk_insert([
+            TimelineEntry(user_id=user_id, post_id=pk, created_at=created_at)
+            for user_id, authors in follows.items()
+            for author in authors
+            for pk, created_at in by_author.get(author, ())
+        ])
+        done += len(batch)
+        if progress:
+            progress(done)
+    return done
+
+
+def purge_timeline(user_ids, author_ids):
+    """Drop the authors' posts from the users' timelines after unfollows."""
+    TimelineEntry.objects.filter(user__in=user_ids, post__author__in=author_ids).delete()
+
+
+def purge_all(user, reverse):
+    """Handle `followers.clear()` (reverse=False: nobody follows `user` any
+    more) and `following.clear()` (reverse=True: `user` follows nobody)."""
+    if reverse:
+        TimelineEntry.objects.filter(user=user).exclude(post__author=user).delete()
+    else:
+        TimelineEntry.objects.filter(post__author=user).exclude(user=user).delete()
+
+
+def _before(created_at, pk, field='post'):
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, **{f'{field}__lt': pk})
+
+
+def feed_page(user, limit, before=None, comments_per_post=None):
+    """
+    Return up to `limit` posts for `user`'s home feed, newest first, plus a
+    flag telling whether more posts exist. `before` is the
+    (created_at, post_id) keyset position of the last post already seen.
+    `comments_per_post` caps the comments prefetched for each post.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    if before is not None:
+        entries = entries.filter(_before(*before))
+    pushed = entries.order_by('-created_at', '-post').values_list('created_at', 'post_id')[:limit + 1]
+
+    streams = [list(pushed)]
+    author_ids = pulled_author_ids(user)
+    if author_ids:
+        posts = Post.objects.filter(author_id__in=author_ids)
+        if before is not None:
+            posts = posts.filter(_before(*before, field='id'))
+        streams.append(list(posts.order_by('-created_at', '-id').values_list('created_at', 'id')[:limit + 1]))
+
+    # a post can sit in both streams if its author crossed the fan-out limit
+    page_ids = []
+    for _, pk in heapq.merge(*streams, reverse=True):
+        if pk not in page_ids:
+            page_ids.append(pk)
+        if len(page_ids) > limit:
+            break
+
+    has_more = len(page_ids) > limit
+    page_ids = page_ids[:limit]
+    by_id = Post.objects.select_related('author').with_comments(comments_per_post).in_bulk(page_ids)
+    return [by_id[pk] for pk in page_ids if pk in by_id], has_more
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts import feed
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill home feed timelines from existing follows and posts, e.g. after the feed is first '
+        'deployed. Existing entries are kept, so it is safe to re-run.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=feed.FANOUT_BATCH_SIZE)
+        parser.add_argument('--per-author', type=int, help='Posts copied per author (default FEED_BACKFILL_SIZE).')
+
+    def handle(self, *args, batch_size, per_author, **options):
+        done = feed.backfill_all(batch_size, per_author, progress=lambda n: self.stderr.write(f'{n} users done'))
+        self.stdout.write(f'Backfilled the timelines of {done} users.')
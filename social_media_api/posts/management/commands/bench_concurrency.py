@@ -0,0 +1,49 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from perfmon import bench
+from posts import concurrency
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a throwaway test database like `bench`, then load each URL path at rising '
+        'concurrency under WSGI-style threads and an ASGI event loop and report the ceilings.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='URL paths to load, e.g. /api/posts/ /api/async/posts/')
+        parser.add_argument('--levels', type=int, nargs='+', default=[1, 4, 16, 64])
+        parser.add_argument('--requests', type=int, default=200, help='Requests per run.')
+        parser.add_argument('--modes', nargs='+', choices=concurrency.MODES, default=list(concurrency.MODES))
+        parser.add_argument('--scale', type=float, default=1)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Also write the results to this file as JSON.')
+
+    def handle(self, *args, paths, levels, requests, modes, scale, seed, output, verbosity, **options):
+        bench.autodiscover()
+        suite = bench.Suite(scale=scale, seed=seed)
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+        try:
+            self.stdout.write(f'Seeding at scale {scale}...')
+            bench.seed(suite)
+            report = {path: concurrency.sweep(path, levels, requests, modes) for path in paths}
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+            teardown_test_environment()
+
+        for path, by_mode in report.items():
+            for mode, result in by_mode.items():
+                self.stdout.write(f"{path} [{mode}] ceiling at concurrency {result['ceiling']}")
+                for row in result['runs']:
+                    self.stdout.write(
+                        f"  {row['concurrency']:5d}  {row['rps']:9.1f} req/s  "
+                        f"p50 {row['p50_ms']:9.2f} ms  p99 {row['p99_ms']:9.2f} ms"
+                    )
+        if output:
+            Path(output).write_text(json.dumps(report, indent=2) + '\n')
@@ -1,6 +1,28 @@
 from django.db import models
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.conf import settings
 
+
+class PostQuerySet(models.QuerySet):
+    def with_comments(self, limit=None):
+        """
+        Prefetch comments (with their authors) in one extra query. With
+        `limit`, only the `limit` most recent comments of each post are
+        loaded, picked with a ROW_NUMBER() window partitioned by post.
+        """
+        comments = Comment.objects.select_related('author')
+        if limit:
+            comments = comments.annotate(
+                recency=Window(
+                    RowNumber(),
+                    partition_by=F('post_id'),
+                    order_by=[F('created_at').desc(), F('id').desc()],
+                )
+            ).filter(recency__lte=limit)
+        return self.prefetch_related(Prefetch('comments', queryset=comments.order_by('created_at', 'id')))
+
+
 class Post(models.Model):
     author = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='posts')
     title = models.CharField(max_length=255)
@@ -8,8 +30,18 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # keyset pagination seeks on (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='post_recent_idx'),
+            # serves fan-out-on-read for high-follower authors in the feed
+            models.Index(fields=['author', '-created_at', '-id'], name='post_author_recent_idx'),
+            # incremental exports and conditional GET scan by updated_at
+            models.Index(fields=['updated_at', 'id'], name='post_updated_idx'),
+        ]
 
     def __str__(self):
         return self.title
@@ -24,6 +56,34 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='comment_created_idx'),
+            models.Index(fields=['post', 'created_at', 'id'], name='comment_post_created_idx'),
+            models.Index(fields=['updated_at', 'id'], name='comment_updated_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.author} on {self.post}'
+
+
+class TimelineEntry(models.Model):
+    """
+    A precomputed row of a user's home feed, written when a post is created
+    (fan-out-on-write). `created_at` is copied from the post so a feed page
+    is a single index range scan on (user, created_at, post).
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-created_at', '-post']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'], name='unique_timeline_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-post'], name='timeline_user_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} in feed of {self.user}'
@@ -1,6 +1,197 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def encode_cursor(values):
+    """Pack a list of JSON-serialisable keyset values into an opaque token."""
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Inverse of `encode_cursor`. Raises ValueError on malformed input."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (TypeError, ValueError, UnicodeError) as exc:
+        raise ValueError('Invalid cursor') from exc
+    if not isinstance(values, list):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination over the queryset's ordering plus `id` as a
+    tie-breaker. Pages are addressed by an opaque cursor holding the sort key
+    of the last row seen, so page N costs the same as page 1 and no COUNT(*)
+    is issued. Works with `OrderingFilter` as long as the ordering uses
+    concrete fields of the model.
+    """
+    page_size = 10
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """Return [(field, descending), ...] ending with the primary key."""
+        terms = queryset.query.order_by or queryset.model._meta.ordering
+        opts = queryset.model._meta
+        ordering = []
+        pk_descending = False
+        for term in terms:
+            if not isinstance(term, str) or term == '?':
+                continue
+            name = term.lstrip('-')
+            try:
+                field = opts.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.primary_key:
+                pk_descending = term.startswith('-')
+                continue
+            if not field.concrete or field.is_relation:
+                continue
+            ordering.append((field, term.startswith('-')))
+        descending = ordering[0][1] if ordering else pk_descending
+        ordering.append((opts.pk, descending))
+        return ordering
+
+    def decode(self, cursor):
+        try:
+            reverse, *raw = decode_cursor(cursor)
+            if len(raw) != len(self.ordering):
+                raise ValueError(self.invalid_cursor_message)
+            values = [field.to_python(value) for (field, _), value in zip(self.ordering, raw)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), values
+
+    def encode(self, obj, reverse):
+        values = [field.value_to_string(obj) for field, _ in self.ordering]
+        return encode_cursor([int(reverse)] + values)
+
+    def seek_filter(self, values, reverse):
+        """Rows strictly after `values` in ordering direction (before, if reversed)."""
+        condition = Q()
+        for i, (field, descending) in enumerate(self.ordering):
+            lookup = 'lt' if descending != reverse else 'gt'
+            prefix = {f.attname: v for (f, _), v in zip(self.ordering[:i], values[:i])}
+            condition |= Q(**prefix, **{f'{field.attname}__{lookup}': values[i]})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        reverse, values = self.decode(cursor) if cursor else (False, None)
+
+        order_by = [('-' if descending != reverse else '') + field.attname for field, descending in self.ordering]
+        queryset = queryset.order_by(*order_by)
+        if values is not None:
+            queryset = queryset.filter(self.seek_filter(values, reverse))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, values is not None
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode(self.page[-1], reverse=False))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode(self.page[0], reverse=True))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
 
 class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Page-number pagination by default; switches to `KeysetPagination` when
+    the request carries a `cursor` parameter (pass `?cursor=` to start), so
+    deep scrolling costs the same as the first page.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            self.keyset.page_size = self.page_size
+            self.keyset.page_size_query_param = self.page_size_query_param
+            self.keyset.max_page_size = self.max_page_size
+            self.display_page_controls = False
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """
+        The page-number path of `paginate_queryset` for async views: the
+        same page size, page number and error handling, with the count and
+        the rows fetched without blocking the event loop.
+        """
+        self.keyset = None
+        self.request = request
+        paginator = self.django_paginator_class(queryset, self.get_page_size(request))
+        # page() and num_pages read the count; fetch it here instead
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message=str(exc)))
+        return [obj async for obj in self.page.object_list.aiterator(chunk_size=paginator.per_page)]
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
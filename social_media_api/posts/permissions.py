@@ -10,3 +10,12 @@ class IsOwnerOrReadOnly(BasePermission):
         if request.method in SAFE_METHODS:
             return True
         return getattr(obj, 'author', None) == request.user
+
+    def denied_ids(self, request, queryset):
+        """
+        Set-based form of `has_object_permission` for bulk writes: the pks in
+        `queryset` that the user may not modify, found with one query.
+        """
+        if request.method in SAFE_METHODS:
+            return set()
+        return set(queryset.exclude(author=request.user).values_list('pk', flat=True))
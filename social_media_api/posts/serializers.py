@@ -1,16 +1,39 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError as DjangoValidationError
+from accounts.serializers import AvatarField
 from .models import Post, Comment
 
 User = get_user_model()
 
 class UserSimpleSerializer(serializers.ModelSerializer):
+    avatar = AvatarField(size=64)
+
     class Meta:
         model = User
-        fields = ('id', 'username')
+        fields = ('id', 'username', 'avatar')
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Resolves ids from a `{pk: instance}` map that bulk endpoints put in
+    `context['preloaded'][field_name]`, so validating N items costs one
+    query instead of N. Falls back to the normal lookup otherwise.
+    """
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.field_name)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            return preloaded[self.get_queryset().model._meta.pk.to_python(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
 
 class CommentSerializer(serializers.ModelSerializer):
     author = UserSimpleSerializer(read_only=True)
+    post = PreloadedPrimaryKeyRelatedField(queryset=Post.objects.all())
 
     class Meta:
         model = Comment
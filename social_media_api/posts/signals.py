@@ -0,0 +1,117 @@
+import contextvars
+from collections import Counter
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db.models import Case, Value, When
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from accounts.models import shifted
+
+from . import feed
+from .models import Post, Comment
+
+User = get_user_model()
+
+
+# authors per UPDATE ... CASE; keeps the statement under SQLite's variable limit
+SHIFT_BATCH_SIZE = 500
+
+# {counter: Counter(author id -> delta)} while `deferred_counters` is active
+_deferred = contextvars.ContextVar('posts_deferred_counters', default=None)
+
+
+def _shift(counter, deltas):
+    """Move `counter` by `deltas[author_id]` on each author, in one UPDATE ... CASE."""
+    deltas = [(author_id, n) for author_id, n in deltas.items() if n]
+    for start in range(0, len(deltas), SHIFT_BATCH_SIZE):
+        batch = dict(deltas[start:start + SHIFT_BATCH_SIZE])
+        if len(batch) == 1:
+            delta = next(iter(batch.values()))
+        else:
+            delta = Case(*(When(pk=author_id, then=Value(n)) for author_id, n in batch.items()), default=Value(0))
+        User.objects.filter(pk__in=batch).update(**{counter: shifted(counter, delta)})
+
+
+def _bump(objs, counter, sign):
+    """Shift `counter` on each author by `sign` per object."""
+    deltas = Counter()
+    for obj in objs:
+        deltas[obj.author_id] += sign
+    pending = _deferred.get()
+    if pending is not None:
+        pending.setdefault(counter, Counter()).update(deltas)
+    else:
+        _shift(counter, deltas)
+
+
+@contextmanager
+def deferred_counters():
+    """
+    Collect the counter shifts of the saves and deletes inside the block and
+    apply them on exit, one UPDATE per counter. Queryset deletes send
+    post_delete per row, cascaded comments included; without this each
+    would update its author on its own.
+    """
+    pending = {}
+    token = _deferred.set(pending)
+    try:
+        yield
+    finally:
+        _deferred.reset(token)
+    for counter, deltas in pending.items():
+        _shift(counter, deltas)
+
+
+def posts_created(posts):
+    """Side effects of new posts; also called by bulk_create paths, which send no signals."""
+    _bump(posts, 'num_posts', 1)
+    for post in posts:
+        feed.fan_out_post(post)
+
+
+def comments_created(comments):
+    _bump(comments, 'num_comments', 1)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        posts_created([instance])
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    _bump([instance], 'num_posts', -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        comments_created([instance])
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    _bump([instance], 'num_comments', -1)
+
+
+@receiver(m2m_changed, sender=User.followers.through)
+def sync_timeline_on_follow(sender, instance, action, reverse, pk_set, **kwargs):
+    """Backfill or purge timelines when follow edges are added or removed.
+
+    `author.followers.add(follower)` arrives with reverse=False and the
+    follower ids in `pk_set`; `follower.following.add(author)` arrives with
+    reverse=True and the author ids in `pk_set`.
+    """
+    if action == 'post_clear':
+        feed.purge_all(instance, reverse)
+        return
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    followers, authors = (pk_set, [instance.pk]) if not reverse else ([instance.pk], pk_set)
+    if action == 'post_add':
+        feed.backfill_timeline(followers, authors)
+    else:
+        feed.purge_timeline(followers, authors)
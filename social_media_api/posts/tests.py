@@ -1,6 +1,17 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import sync_to_async
 from rest_framework.test import APITestCase
 from django.urls import reverse
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.dateparse import parse_datetime
+from .models import Post, Comment, TimelineEntry
 
 User = get_user_model()
 
@@ -22,3 +33,356 @@ class PostCommentTests(APITestCase):
         resp = self.client.post('/api/comments/', {'post':post_id,'content':'A'}, format='json')
         self.assertEqual(resp.status_code, 201)
         self.assertEqual(resp.data['content'], 'A')
+
+
+class FeedTests(APITestCase):
+    def setUp(self):
+        self.reader = User.objects.create_user(username='reader', password='p')
+        self.alice = User.objects.create_user(username='alice', password='p')
+        self.bob = User.objects.create_user(username='bob', password='p')
+        self.alice.followers.add(self.reader)
+        self.client.force_authenticate(self.reader)
+
+    def titles(self, resp):
+        return [p['title'] for p in resp.data['results']]
+
+    def test_feed_contains_followed_authors_only(self):
+        Post.objects.create(author=self.alice, title='from alice', content='c')
+        Post.objects.create(author=self.bob, title='from bob', content='c')
+        resp = self.client.get('/api/feed/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.titles(resp), ['from alice'])
+
+    def test_feed_cursor_pages(self):
+        for i in range(5):
+            Post.objects.create(author=self.alice, title=f'p{i}', content='c')
+        first = self.client.get('/api/feed/?page_size=3')
+        self.assertEqual(self.titles(first), ['p4', 'p3', 'p2'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.titles(second), ['p1', 'p0'])
+        self.assertIsNone(second.data['next'])
+
+    def test_high_fanout_author_is_pulled_on_read(self):
+        with self.settings(FEED_FANOUT_LIMIT=0):
+            post = Post.objects.create(author=self.alice, title='pulled', content='c')
+            self.assertFalse(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+            resp = self.client.get('/api/feed/')
+        self.assertEqual(self.titles(resp), ['pulled'])
+
+    def test_follow_backfills_and_unfollow_purges(self):
+        Post.objects.create(author=self.bob, title='old bob', content='c')
+        self.reader.following.add(self.bob)
+        self.assertEqual(self.titles(self.client.get('/api/feed/')), ['old bob'])
+        self.reader.following.remove(self.bob)
+        self.assertEqual(self.titles(self.client.get('/api/feed/')), [])
+
+    def test_backfill_command_rebuilds_timelines(self):
+        Post.objects.create(author=self.alice, title='from alice', content='c')
+        Post.objects.create(author=self.reader, title='own', content='c')
+        Post.objects.create(author=self.bob, title='from bob', content='c')
+        TimelineEntry.objects.all().delete()  # as on a database from before the feed
+        out = StringIO()
+        call_command('backfill_timelines', batch_size=2, stdout=out, stderr=StringIO())
+        self.assertIn('Backfilled the timelines of 3 users.', out.getvalue())
+        self.assertEqual(self.titles(self.client.get('/api/feed/')), ['own', 'from alice'])
+        call_command('backfill_timelines', stdout=StringIO(), stderr=StringIO())
+        # each author's own post, plus alice's in the reader's feed
+        self.assertEqual(TimelineEntry.objects.count(), 4)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', password='p')
+        for i in range(7):
+            Post.objects.create(author=self.user, title=f't{i}', content='c')
+
+    def titles(self, resp):
+        return [p['title'] for p in resp.data['results']]
+
+    def test_walks_forward_and_back_without_count(self):
+        first = self.client.get('/api/posts/?cursor=&page_size=3')
+        self.assertNotIn('count', first.data)
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(self.titles(first), ['t6', 't5', 't4'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.titles(second), ['t3', 't2', 't1'])
+        back = self.client.get(second.data['previous'])
+        self.assertEqual(self.titles(back), ['t6', 't5', 't4'])
+        last = self.client.get(second.data['next'])
+        self.assertEqual(self.titles(last), ['t0'])
+        self.assertIsNone(last.data['next'])
+
+    def test_respects_ordering_filter(self):
+        first = self.client.get('/api/posts/?cursor=&page_size=4&ordering=title')
+        self.assertEqual(self.titles(first), ['t0', 't1', 't2', 't3'])
+        second = self.client.get(first.data['next'])
+        self.assertEqual(self.titles(second), ['t4', 't5', 't6'])
+
+    def test_invalid_cursor(self):
+        resp = self.client.get('/api/posts/?cursor=garbage')
+        self.assertEqual(resp.status_code, 404)
+
+    def test_page_number_mode_unchanged(self):
+        resp = self.client.get('/api/posts/?page=2&page_size=5')
+        self.assertEqual(resp.data['count'], 7)
+        self.assertEqual(len(resp.data['results']), 2)
+
+
+class PostListQueryCountTests(APITestCase):
+    def setUp(self):
+        self.authors = [User.objects.create_user(username=f'a{i}', password='p') for i in range(3)]
+        for i in range(10):
+            post = Post.objects.create(author=self.authors[i % 3], title=f't{i}', content='c')
+            for j in range(8):
+                Comment.objects.create(post=post, author=self.authors[j % 3], content=f'c{j}')
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx), resp
+
+    def test_query_count_independent_of_page_size(self):
+        small, _ = self.count_queries('/api/posts/?page_size=2')
+        large, _ = self.count_queries('/api/posts/?page_size=10')
+        self.assertEqual(small, large)
+        keyset, _ = self.count_queries('/api/posts/?cursor=&page_size=10')
+        self.assertLessEqual(keyset, large)
+
+    def test_list_embeds_most_recent_comments_only(self):
+        _, resp = self.count_queries('/api/posts/?page_size=1')
+        comments = resp.data['results'][0]['comments']
+        self.assertEqual([c['content'] for c in comments], ['c3', 'c4', 'c5', 'c6', 'c7'])
+
+    def test_detail_embeds_all_comments(self):
+        post = Post.objects.first()
+        resp = self.client.get(f'/api/posts/{post.pk}/')
+        self.assertEqual(len(resp.data['comments']), 8)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', password='p')
+        self.post = Post.objects.create(author=self.user, title='t', content='c')
+        self.comment = Comment.objects.create(post=self.post, author=self.user, content='x')
+
+    def test_list_etag_round_trip(self):
+        first = self.client.get('/api/posts/')
+        self.assertIn('ETag', first)
+        self.assertIn('Last-Modified', first)
+        # the row count, the page's ids and stamps, and its comments' aggregate
+        with self.assertNumQueries(3):
+            again = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_author_change_changes_etag(self):
+        first = self.client.get(f'/api/posts/{self.post.pk}/')
+        self.user.username = 'renamed'
+        self.user.save()
+        again = self.client.get(f'/api/posts/{self.post.pk}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data['author']['username'], 'renamed')
+
+    def test_commenter_change_changes_list_etag(self):
+        commenter = User.objects.create_user(username='c', password='p')
+        Comment.objects.create(post=self.post, author=commenter, content='y')
+        first = self.client.get('/api/posts/')
+        commenter.username = 'renamed'
+        commenter.save()
+        again = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+    def test_list_etag_ignores_other_pages(self):
+        for i in range(10):
+            Post.objects.create(author=self.user, title=f'newer {i}', content='c')
+        first = self.client.get('/api/posts/?page=2')
+        newest = Post.objects.order_by('-created_at').first()
+        newest.title = 'edited'
+        newest.save()
+        self.assertEqual(self.client.get('/api/posts/?page=2', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+    def test_keyset_pages_get_etags(self):
+        first = self.client.get('/api/posts/?cursor=')
+        again = self.client.get('/api/posts/?cursor=', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 304)
+
+    def test_embedded_comment_change_changes_etag(self):
+        first = self.client.get('/api/posts/')
+        self.comment.content = 'edited'
+        self.comment.save()
+        again = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+        self.assertNotEqual(again['ETag'], first['ETag'])
+
+    def test_delete_changes_list_etag(self):
+        Post.objects.create(author=self.user, title='t2', content='c')
+        first = self.client.get('/api/posts/')
+        Post.objects.filter(title='t2').delete()
+        again = self.client.get('/api/posts/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+    def test_detail_if_modified_since(self):
+        first = self.client.get(f'/api/comments/{self.comment.pk}/')
+        again = self.client.get(f'/api/comments/{self.comment.pk}/', HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(self.client.get('/api/comments/999/').status_code, 404)
+
+
+class BulkEndpointTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', password='p')
+        self.other = User.objects.create_user(username='o', password='p')
+        self.client.force_authenticate(self.user)
+
+    def test_bulk_create_atomic_rejects_all_on_error(self):
+        resp = self.client.post('/api/posts/bulk/', [{'title': 'a', 'content': 'c'}, {'content': 'no title'}], format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['errors'][0]['index'], 1)
+        self.assertFalse(Post.objects.exists())
+
+    def test_bulk_create_partial_and_side_effects(self):
+        self.user.followers.add(self.other)
+        resp = self.client.post(
+            '/api/posts/bulk/?mode=partial',
+            [{'title': 'a', 'content': 'c'}, {'content': 'no title'}, {'title': 'b', 'content': 'c'}],
+            format='json',
+        )
+        self.assertEqual(resp.status_code, 207)
+        self.assertEqual([p['title'] for p in resp.data['created']], ['a', 'b'])
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.num_posts, 2)
+        self.assertEqual(TimelineEntry.objects.filter(user=self.other).count(), 2)
+
+    def test_bulk_create_comments_preloads_posts(self):
+        post = Post.objects.create(author=self.other, title='t', content='c')
+        items = [{'post': post.pk, 'content': str(i)} for i in range(20)]
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post('/api/comments/bulk/', items, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(post.comments.count(), 20)
+        self.assertLess(len(ctx), 20)
+        bad = self.client.post('/api/comments/bulk/', [{'post': 999, 'content': 'x'}], format='json')
+        self.assertEqual(bad.status_code, 400)
+
+    def test_bulk_update_checks_ownership_in_one_go(self):
+        mine = Post.objects.create(author=self.user, title='mine', content='c')
+        theirs = Post.objects.create(author=self.other, title='theirs', content='c')
+        payload = [{'id': mine.pk, 'title': 'edited'}, {'id': theirs.pk, 'title': 'hijacked'}]
+        resp = self.client.patch('/api/posts/bulk/', payload, format='json')
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.patch('/api/posts/bulk/?mode=partial', payload, format='json')
+        self.assertEqual(resp.status_code, 207)
+        self.assertEqual(resp.data['updated'][0]['title'], 'edited')
+        theirs.refresh_from_db()
+        self.assertEqual(theirs.title, 'theirs')
+
+    def test_bulk_delete(self):
+        mine = [Post.objects.create(author=self.user, title=f'm{i}', content='c') for i in range(3)]
+        theirs = Post.objects.create(author=self.other, title='theirs', content='c')
+        ids = [p.pk for p in mine] + [theirs.pk]
+        self.assertEqual(self.client.delete('/api/posts/bulk/', {'ids': ids}, format='json').status_code, 400)
+        resp = self.client.delete('/api/posts/bulk/?mode=partial', {'ids': ids}, format='json')
+        self.assertEqual(resp.data['deleted'], sorted(p.pk for p in mine))
+        self.assertEqual(list(Post.objects.values_list('title', flat=True)), ['theirs'])
+
+    def test_bulk_delete_updates_counters_once_per_counter(self):
+        posts = [Post.objects.create(author=self.user, title=f'm{i}', content='c') for i in range(3)]
+        for post in posts:
+            Comment.objects.create(post=post, author=self.user, content='x')
+            Comment.objects.create(post=post, author=self.other, content='y')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.delete('/api/posts/bulk/', {'ids': [p.pk for p in posts]}, format='json')
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "accounts_user"')]
+        self.assertEqual(len(updates), 2)
+        self.user.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.user.num_posts, self.user.num_comments), (0, 0))
+        self.assertEqual(self.other.num_comments, 0)
+
+
+@override_settings(EXPORT={'SAFETY_WINDOW': 0})
+class ExportTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', password='p')
+        self.client.force_authenticate(self.user)
+        self.post = Post.objects.create(author=self.user, title='first', content='c')
+        Comment.objects.create(post=self.post, author=self.user, content='nice')
+
+    def body(self, resp):
+        return b''.join(resp.streaming_content).decode()
+
+    def test_ndjson_export(self):
+        resp = self.client.get('/api/export/posts.ndjson', HTTP_ACCEPT='application/x-ndjson')
+        self.assertEqual(resp.status_code, 200)
+        rows = [json.loads(line) for line in self.body(resp).splitlines()]
+        self.assertEqual(rows[0]['title'], 'first')
+        self.assertEqual(rows[0]['author__username'], 'u')
+
+    def test_csv_export(self):
+        resp = self.client.get('/api/export/comments.csv')
+        lines = self.body(resp).splitlines()
+        self.assertEqual(lines[0], 'id,post_id,author_id,author__username,content,created_at,updated_at')
+        self.assertEqual(len(lines), 2)
+
+    def test_watermark_makes_exports_incremental(self):
+        first = self.client.get('/api/export/posts.ndjson')
+        self.body(first)
+        since = first['X-Export-Watermark']
+        again = self.client.get('/api/export/posts.ndjson', {'since': since})
+        self.assertEqual(self.body(again), '')
+        Post.objects.create(author=self.user, title='second', content='c')
+        later = self.client.get('/api/export/posts.ndjson', {'since': since})
+        self.assertEqual([json.loads(line)['title'] for line in self.body(later).splitlines()], ['second'])
+
+    def test_recent_rows_wait_for_the_next_export(self):
+        with self.settings(EXPORT={'SAFETY_WINDOW': 60}):
+            first = self.client.get('/api/export/posts.ndjson')
+        self.assertEqual(self.body(first), '')
+        watermark = parse_datetime(first['X-Export-Watermark'])
+        # stamped before that export started, committed after it
+        late = Post.objects.create(author=self.user, title='late', content='c')
+        Post.objects.filter(pk=late.pk).update(updated_at=watermark + timedelta(seconds=1))
+        later = self.client.get('/api/export/posts.ndjson', {'since': first['X-Export-Watermark']})
+        self.assertEqual([json.loads(line)['title'] for line in self.body(later).splitlines()], ['late', 'first'])
+
+
+class AsyncReadTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='u', password='p')
+        self.post = Post.objects.create(author=self.user, title='first', content='c')
+        Comment.objects.create(post=self.post, author=self.user, content='nice')
+
+    async def test_post_list_matches_sync_endpoint(self):
+        resp = await self.async_client.get('/api/async/posts/')
+        self.assertEqual(resp.status_code, 200)
+        sync = await sync_to_async(self.client.get)('/api/posts/')
+        self.assertEqual(resp.json(), json.loads(sync.content))
+
+    async def test_post_detail_and_missing_post(self):
+        resp = await self.async_client.get(f'/api/async/posts/{self.post.pk}/')
+        self.assertEqual(resp.json()['comments'][0]['content'], 'nice')
+        missing = await self.async_client.get('/api/async/posts/999/')
+        self.assertEqual(missing.status_code, 404)
+        self.assertEqual(missing.json(), {'detail': 'Not found.'})
+
+    async def test_comment_list_filters_by_post(self):
+        resp = await self.async_client.get('/api/async/comments/', {'post': self.post.pk})
+        self.assertEqual(resp.json()['count'], 1)
+        resp = await self.async_client.get('/api/async/comments/', {'post': 999})
+        self.assertEqual(resp.status_code, 400)
+
+    async def test_avatar_size_matches_sync_endpoint(self):
+        await User.objects.filter(pk=self.user.pk).aupdate(
+            profile_picture='profile_pics/u.png',
+            profile_picture_variants={'64': {'webp': 'u_64.webp'}, '256': {'webp': 'u_256.webp'}},
+        )
+        resp = await self.async_client.get('/api/async/posts/', {'avatar_size': 200})
+        self.assertTrue(resp.json()['results'][0]['author']['avatar'].endswith('u_256.webp'))
+        sync = await sync_to_async(self.client.get)('/api/posts/', {'avatar_size': 200})
+        self.assertEqual(resp.json(), json.loads(sync.content))
+
+    async def test_bad_parameters_match_sync_endpoint(self):
+        for params in ({'author': 'x'}, {'author': 999}, {'page': 'x'}, {'page': 5}, {'page_size': 'x'}):
+            resp = await self.async_client.get('/api/async/posts/', params)
+            sync = await sync_to_async(self.client.get)('/api/posts/', params)
+            self.assertEqual((resp.status_code, resp.json()), (sync.status_code, json.loads(sync.content)), params)
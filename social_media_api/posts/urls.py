@@ -1,8 +1,16 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
-from .views import PostViewSet, CommentViewSet
+from .views import PostViewSet, CommentViewSet, FeedAPIView, ExportAPIView
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'posts', PostViewSet, basename='post')
 router.register(r'comments', CommentViewSet, basename='comment')
 
-urlpatterns = router.urls
+urlpatterns = [
+    path('feed/', FeedAPIView.as_view(), name='feed'),
+    path('export/<slug:kind>.<slug:output_format>', ExportAPIView.as_view(), name='export'),
+    path('async/posts/', async_views.post_list, name='async-post-list'),
+    path('async/posts/<int:pk>/', async_views.post_detail, name='async-post-detail'),
+    path('async/comments/', async_views.comment_list, name='async-comment-list'),
+] + router.urls
@@ -1,11 +1,21 @@
 from rest_framework import viewsets, permissions, filters
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
+from django.http import StreamingHttpResponse
+from django.utils.dateparse import parse_datetime
 from .models import Post, Comment
 from .serializers import PostSerializer, CommentSerializer
 from .permissions import IsOwnerOrReadOnly
-from .pagination import StandardResultsSetPagination
+from .conditional import ConditionalGetMixin
+from .bulk import BulkModelMixin
+from .signals import posts_created, comments_created, deferred_counters
+from .pagination import StandardResultsSetPagination, KeysetPagination, encode_cursor, decode_cursor
+from . import export, feed
 
-class PostViewSet(viewsets.ModelViewSet):
+class PostViewSet(ConditionalGetMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Post.objects.all().select_related('author')
     serializer_class = PostSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
@@ -14,12 +24,28 @@ class PostViewSet(viewsets.ModelViewSet):
     search_fields = ['title', 'content', 'author__username']
     ordering_fields = ['created_at', 'updated_at', 'title']
     pagination_class = StandardResultsSetPagination
+    # list responses embed only this many of the most recent comments per post
+    comments_per_post = 5
+    conditional_related = 'comments'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset.with_comments(limit=self.comments_per_post)
+        return queryset.with_comments()
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def bulk_created(self, objs):
+        posts_created(objs)
+
+    def bulk_delete(self, queryset):
+        with deferred_counters():
+            queryset.delete()
 
-class CommentViewSet(viewsets.ModelViewSet):
+
+class CommentViewSet(ConditionalGetMixin, BulkModelMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all().select_related('author', 'post')
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsOwnerOrReadOnly]
@@ -27,6 +53,82 @@ class CommentViewSet(viewsets.ModelViewSet):
     filterset_fields = ['post', 'author']
     search_fields = ['content', 'author__username']
     ordering_fields = ['created_at']
+    pagination_class = StandardResultsSetPagination
+    bulk_preload = {'post': Post}
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
+
+    def bulk_created(self, objs):
+        comments_created(objs)
+
+    def bulk_delete(self, queryset):
+        with deferred_counters():
+            queryset.delete()
+
+
+class FeedAPIView(APIView):
+    """
+    Home feed of the authenticated user: their own posts and posts of the
+    users they follow, newest first. Pages are addressed with an opaque
+    `cursor` so each page costs the same regardless of depth.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_position(self, request):
+        cursor = request.query_params.get('cursor')
+        if not cursor:
+            return None
+        try:
+            created_at, pk = decode_cursor(cursor)
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        if created_at is None:
+            raise NotFound('Invalid cursor')
+        return created_at, pk
+
+    def get(self, request):
+        size = self.pagination_class().get_page_size(request)
+        posts, has_more = feed.feed_page(
+            request.user, size, before=self.get_position(request), comments_per_post=PostViewSet.comments_per_post
+        )
+
+        next_url = None
+        if has_more and posts:
+            last = posts[-1]
+            cursor = encode_cursor([last.created_at.isoformat(), last.pk])
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', cursor)
+        serializer = PostSerializer(posts, many=True, context={'request': request})
+        return Response({'next': next_url, 'results': serializer.data})
+
+
+class ExportAPIView(APIView):
+    """
+    Stream every post or comment as NDJSON or CSV, oldest change first.
+    Pass `?since=<timestamp>` to get only rows updated after it; the
+    `X-Export-Watermark` response header is the `since` for the next run.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def perform_content_negotiation(self, request, force=False):
+        # the body is written here, not by a renderer, so any Accept header will do
+        return super().perform_content_negotiation(request, force=True)
+
+    def get(self, request, kind, output_format):
+        if kind not in export.EXPORTS or output_format not in export.FORMATS:
+            raise NotFound()
+        since = request.query_params.get('since')
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                raise ValidationError({'since': ['Expected an ISO 8601 timestamp.']})
+        lines, watermark = export.export_lines(kind, output_format, since or None)
+
+        response = StreamingHttpResponse(lines, content_type=export.FORMATS[output_format])
+        response['Content-Disposition'] = f'attachment; filename="{kind}.{output_format}"'
+        if watermark is not None:
+            response['X-Export-Watermark'] = watermark.isoformat()
+        return response
@@ -6,10 +6,17 @@ Generated by 'django-admin startproject' using Django 5.2.7.
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+# Apps and modules shared by the projects in this repository (perfmon,
+# taskqueue, blobstore, avatars) live in shared/ at the repository root.
+SHARED_APPS_DIR = BASE_DIR.parent / 'shared'
+if str(SHARED_APPS_DIR) not in sys.path:
+    sys.path.append(str(SHARED_APPS_DIR))
+
 # Quick-start development settings - unsuitable for production
 SECRET_KEY = 'django-insecure-3(+8^+63f5e7d)a&2htx2vvb4d&$dnoo-d&9ak0)7k762(!i(j'
 DEBUG = True
@@ -27,15 +34,19 @@ INSTALLED_APPS = [
 
     # Third-party apps
     'rest_framework',
-    'rest_framework.authtoken',
+    'rest_framework.authtoken',  # only for migrating legacy keys to accounts.AuthToken
 
     # Local apps
     'accounts',
     'django_filters',
     'posts',
+    'perfmon',
+    'taskqueue',
+    'blobstore',
 ]
 
 MIDDLEWARE = [
+    'perfmon.middleware.PerfMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -102,7 +113,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # Django REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'accounts.authentication.CachedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',  # optional for browsable API
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -118,3 +129,86 @@ REST_FRAMEWORK.setdefault('DEFAULT_FILTER_BACKENDS', [
     'rest_framework.filters.OrderingFilter',
 ])
 
+# Home feed: authors with more followers than this are not fanned out on
+# write; their posts are merged into followers' feeds at read time instead.
+FEED_FANOUT_LIMIT = 1000
+# Number of recent posts copied into a timeline when a follow is added.
+FEED_BACKFILL_SIZE = 20
+
+
+# Request instrumentation (perfmon app)
+# Requests over these budgets are logged to the 'perfmon' logger; per-URL
+# histograms are served at /__perf__/ (staff only when DEBUG is off).
+PERFMON = {
+    'QUERY_BUDGET': 50,
+    'LATENCY_BUDGET_MS': 500,
+    'SERVER_TIMING': True,
+}
+
+# API tokens (accounts.AuthToken) expire this many days after they are issued;
+# run `python manage.py purge_expired_tokens` periodically to delete them.
+AUTH_TOKEN_TTL_DAYS = 30
+
+# Token authentication cache (accounts.authentication.CachedTokenAuthentication):
+# a per-process LRU in front of the default cache. Point CACHES at a shared
+# backend (Redis, Memcached) so workers share the second tier. A revoked token
+# can stay valid in other workers for up to LOCAL_TTL seconds.
+TOKEN_CACHE = {
+    'LOCAL_SIZE': 10000,
+    'LOCAL_TTL': 30,
+    'SHARED_TTL': 300,
+}
+
+# Login protection (accounts.throttling): per-IP and per-username token buckets
+# checked before any password hashing. Set HASH_WORKERS above 0 to run password
+# checks on a bounded pool; logins beyond HASH_QUEUE_LIMIT waiting get a 503.
+LOGIN_THROTTLE = {
+    'IP_CAPACITY': 20,
+    'IP_REFILL_PER_MINUTE': 10,
+    'USERNAME_CAPACITY': 5,
+    'USERNAME_REFILL_PER_MINUTE': 1,
+    'HASH_WORKERS': 0,
+    'HASH_QUEUE_LIMIT': 16,
+    'HASH_TIMEOUT': 10,
+}
+
+# Background tasks (taskqueue app): queued in the database, run by
+# `python manage.py run_tasks` workers. A task whose worker dies is retried
+# after LEASE_SECONDS; failures back off from RETRY_DELAY seconds.
+TASKQUEUE = {
+    'LEASE_SECONDS': 300,
+    'POLL_INTERVAL': 1,
+    'BATCH_SIZE': 10,
+    'MAX_ATTEMPTS': 3,
+    'RETRY_DELAY': 30,
+}
+
+# Uploads are stored once per distinct content (blobstore app) and reference
+# counted. Run `python manage.py gc_blobs` periodically (with --recount now and
+# then) to delete files that stayed unreferenced for GC_GRACE_HOURS.
+STORAGES = {
+    'default': {'BACKEND': 'blobstore.storage.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'},
+}
+BLOBSTORE = {
+    'DIRECTORY': 'blobs',
+    'GC_GRACE_HOURS': 24,
+}
+
+# Who-to-follow suggestions (accounts.recommendations), refreshed by
+# `python manage.py compute_suggestions` (incremental) and `--full` now and
+# then. WORKERS is the number of processes for scoring; 0 uses every CPU.
+FOLLOW_SUGGESTIONS = {
+    'TOP_K': 20,
+    'MAX_EXPANSION': 1000,
+    'POPULAR_POOL': 100,
+    'WORKERS': 0,
+}
+
+# Incremental exports (posts.export): rows updated within the last
+# SAFETY_WINDOW seconds are left to the next export, so rows whose
+# transaction commits late are not skipped. Keep it above the longest write
+# transaction.
+EXPORT = {
+    'SAFETY_WINDOW': 60,
+}